@@ -42,7 +42,8 @@ const INITIAL_STATE: GameState = {
   evidence: [],
   logs: [],
   sentence: null,
-  timer: 0
+  timer: 0,
+  deadline: null
 };
 
 interface AuthData {
@@ -83,6 +84,10 @@ function App() {
   const [speakingUsers, setSpeakingUsers] = useState<Set<string>>(new Set());
 
   const ws = useRef<WebSocket | null>(null);
+  const stateVersion = useRef(0);
+  const resumeToken = useRef<string | null>(null); // From the server's `session` message; lets a reconnect resume
+  const clockOffset = useRef(0); // server clock - local clock (ms)
+  const [secondsLeft, setSecondsLeft] = useState(0);
 
   // --- AUTHENTICATION ---
   useEffect(() => {
@@ -183,38 +188,105 @@ function App() {
     wsUrl = wsUrl.endsWith('/') ? wsUrl.slice(0, -1) : wsUrl;
     const instanceId = discordSdk?.instanceId || 'default';
     const channelId = discordSdk?.channelId;
+    Analytics.setContext({ user_id: auth.user.id, instance_id: instanceId });
+    const guildId = discordSdk?.guildId;
     
-    let url = `${wsUrl}/ws?user_id=${auth.user.id}&instance_id=${instanceId}`;
-    if (channelId) url += `&channel_id=${channelId}`;
-    
-    const socket = new WebSocket(url);
-
-    socket.onopen = () => {};
-    socket.onerror = (e) => ErrorHandler.handleWebSocketError(e);
-
-    socket.onmessage = (event) => {
-      const message = JSON.parse(event.data);
-      if (message.type === "update") {
-        setGameState((prev: GameState) => PerformanceService.getOptimizedGameState(prev, message.data));
-        if (message.data.verdict) {
-          Analytics.trackEvent('verdict_delivered', { verdict: message.data.verdict });
+    let baseUrl = `${wsUrl}/ws?user_id=${auth.user.id}&instance_id=${instanceId}`;
+    if (channelId) baseUrl += `&channel_id=${channelId}`;
+    if (guildId) baseUrl += `&guild_id=${guildId}`; // Karma ledger: per-guild leaderboards
+
+    let closed = false;
+    let retries = 0;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+
+    const open = () => {
+      // Reconnects resume the session: the server replays only the patches after our version
+      const url = resumeToken.current
+        ? `${baseUrl}&resume=${encodeURIComponent(resumeToken.current)}&since=${stateVersion.current}`
+        : baseUrl;
+      const socket = new WebSocket(url);
+      let syncPending = false; // One snapshot request at a time, however many patches arrive out of order
+
+      socket.onopen = () => { retries = 0; };
+      socket.onerror = (e) => ErrorHandler.handleWebSocketError(e);
+      socket.onclose = () => {
+        if (closed) return;
+        // Network blip (common on mobile): come back quickly, inside the server's grace window
+        const delay = Math.min(500 * 2 ** retries, 5000);
+        retries += 1;
+        retryTimer = setTimeout(open, delay);
+      };
+
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.server_time) clockOffset.current = message.server_time * 1000 - Date.now();
+        if (message.type === "session") resumeToken.current = message.token;
+        if (message.type === "update") {
+          syncPending = false;
+          stateVersion.current = message.version ?? 0;
+          setGameState((prev: GameState) => PerformanceService.getOptimizedGameState(prev, message.data));
+          if (message.data.verdict) {
+            Analytics.trackEvent('verdict_delivered', { verdict: message.data.verdict });
+          }
         }
-      }
-      if (message.type === "sound") playSound(message.sound);
-      if (message.type === "error") {
-        showToast(message.message, 'error');
-      }
-      if (message.type === "objection_event") {
-        Analytics.trackEvent('objection_called', { user: message.username });
-        triggerObjectionEffect(message.username);
-        showToast(`OBJECTION by ${message.username}`, 'warning');
-      }
+        if (message.type === "patch") {
+          // Missed a patch: drop it and ask the server for a full snapshot.
+          // Merged patches (sent to clients that fell behind) carry the version they build on in `base`.
+          const base = message.base ?? message.version - 1;
+          if (base !== stateVersion.current) {
+            if (!syncPending) socket.send(JSON.stringify({ type: 'sync' }));
+            syncPending = true;
+            return;
+          }
+          stateVersion.current = message.version;
+          setGameState((prev: GameState) => PerformanceService.applyPatch(prev, message.data, message.logs));
+          if (message.data.verdict) {
+            Analytics.trackEvent('verdict_delivered', { verdict: message.data.verdict });
+          }
+        }
+        // Audience mode: state that is only about this client (e.g. you_voted), outside the versioned patches
+        if (message.type === "personal") {
+          setGameState((prev: GameState) => ({ ...prev, ...message.data }));
+        }
+        if (message.type === "sound") playSound(message.sound);
+        if (message.type === "error") {
+          showToast(message.message, 'error');
+        }
+        if (message.type === "objection_event") {
+          Analytics.trackEvent('objection_called', { user: message.username });
+          triggerObjectionEffect(message.username);
+          showToast(`OBJECTION by ${message.username}`, 'warning');
+        }
+      };
+
+      ws.current = socket;
     };
 
-    ws.current = socket;
-    return () => socket.close();
+    open();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      ws.current?.close();
+    };
   }, [auth, showToast]);
 
+  // --- LOCAL COUNTDOWN ---
+  // The server only sends the absolute deadline; the seconds are counted down here.
+  useEffect(() => {
+    const deadline = gameState.deadline;
+    if (!deadline) {
+      setSecondsLeft(0);
+      return;
+    }
+    const tick = () => {
+      const remaining = (deadline * 1000 - (Date.now() + clockOffset.current)) / 1000;
+      setSecondsLeft(Math.max(0, Math.ceil(remaining)));
+    };
+    tick();
+    const interval = setInterval(tick, 250);
+    return () => clearInterval(interval);
+  }, [gameState.deadline]);
+
   const playSound = (soundName: string) => {
     const audio = new Audio(`/sounds/${soundName}.mp3`);
     audio.volume = 0.5;
@@ -260,7 +332,7 @@ function App() {
       <Courtroom 
         currentUser={auth.user}
         discordSdk={discordSdk!}
-        gameState={gameState}
+        gameState={{ ...gameState, timer: secondsLeft }}
         isShaking={isShaking}
         showObjection={showObjection}
         speakingUsers={speakingUsers}
@@ -204,13 +204,15 @@ export default function Courtroom({
   const [myVote, setMyVote] = useState<'guilty' | 'innocent' | null>(null);
 
   // If voters is empty, reset my local vote visually
+  // (big rooms run in audience mode: a voter count and our own flag instead of the voters list)
   const isUnknown = gameState.accused.username === "Unknown";
-  const hasVoted = (gameState.voters || []).includes(currentUser.id) || (gameState.voters.length > 0 && myVote !== null);
+  const voterCount = gameState.voter_count ?? (gameState.voters || []).length;
+  const hasVoted = gameState.you_voted ?? ((gameState.voters || []).includes(currentUser.id) || (voterCount > 0 && myVote !== null));
   
   // Clean up myVote state when a new round starts
   useEffect(() => {
-    setMyVote(prev => gameState.voters.length === 0 ? null : prev);
-  }, [gameState.voters.length]);
+    setMyVote(prev => voterCount === 0 ? null : prev);
+  }, [voterCount]);
 
   const handleVote = (type: 'guilty' | 'innocent') => {
     onVote(type);
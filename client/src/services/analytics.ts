@@ -1,17 +1,70 @@
 type EventType = 'game_start' | 'vote_cast' | 'objection_called' | 'evidence_added' | 'verdict_delivered';
 
+interface QueuedEvent {
+  event: EventType;
+  ts: number; // Epoch seconds
+  props: Record<string, unknown>;
+}
+
+const FLUSH_INTERVAL_MS = 10_000;
+const MAX_BATCH = 50;     // Flush early once this many are waiting
+const MAX_BUFFER = 500;   // Oldest events are dropped past this (e.g. while the backend is unreachable)
+const MAX_SEND = 200;     // Events per request (the server's limit)
+
+const backendBase = import.meta.env.VITE_BACKEND_URL || '';
+const ENDPOINT = backendBase ? `${backendBase}/api/analytics` : '/api/analytics';
+
 export class Analytics {
+  private static queue: QueuedEvent[] = [];
+  private static context: { user_id?: string; instance_id?: string } = {};
+  private static timer: ReturnType<typeof setInterval> | null = null;
+
+  /** Who the events belong to; sent once per batch rather than with every event. */
+  static setContext(context: { user_id?: string; instance_id?: string }) {
+    Analytics.context = { ...Analytics.context, ...context };
+  }
+
   static trackEvent(event: EventType, metadata: Record<string, unknown> = {}) {
-    // Log to console in dev mode
-    console.log(`[ANALYTICS] Event: ${event}`, metadata);
+    if (!import.meta.env.PROD) console.log(`[ANALYTICS] Event: ${event}`, metadata);
 
-    // Placeholder for production analytics integration (e.g. Google Analytics / PostHog)
-    if (import.meta.env.PROD) {
-      // Example: window.gtag('event', event, metadata);
-    }
+    Analytics.queue.push({ event, ts: Date.now() / 1000, props: metadata });
+    if (Analytics.queue.length > MAX_BUFFER) Analytics.queue.splice(0, Analytics.queue.length - MAX_BUFFER);
+    Analytics.start();
+    if (Analytics.queue.length >= MAX_BATCH) void Analytics.flush();
   }
 
   static trackError(error: unknown, context: string) {
     console.error(`[ANALYTICS ERROR] Context: ${context}`, error);
   }
-}
\ No newline at end of file
+
+  /** Sends up to MAX_SEND queued events in one POST, gzipped when the browser can. */
+  static async flush(unloading = false) {
+    if (!Analytics.queue.length) return;
+    const events = Analytics.queue.splice(0, MAX_SEND);
+    const body = JSON.stringify({ ...Analytics.context, events });
+    try {
+      // The page is going away: no time to compress, keepalive lets the request outlive it
+      if (unloading || typeof CompressionStream === 'undefined') {
+        await fetch(ENDPOINT, { method: 'POST', body, headers: { 'Content-Type': 'application/json' }, keepalive: true });
+        return;
+      }
+      const gzipped = await new Response(new Blob([body]).stream().pipeThrough(new CompressionStream('gzip'))).blob();
+      await fetch(ENDPOINT, {
+        method: 'POST',
+        body: gzipped,
+        headers: { 'Content-Type': 'application/json', 'Content-Encoding': 'gzip' },
+      });
+    } catch {
+      // Best effort: analytics never gets in the way of the game
+    }
+  }
+
+  private static start() {
+    if (Analytics.timer !== null) return;
+    Analytics.timer = setInterval(() => void Analytics.flush(), FLUSH_INTERVAL_MS);
+    window.addEventListener('pagehide', () => void Analytics.flush(true));
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') void Analytics.flush(true);
+    });
+  }
+}
@@ -1,5 +1,8 @@
 import { useRef, useEffect } from 'react';
-import type { GameState } from '../types/game';
+import type { GameState, LogEntry } from '../types/game';
+
+// Mirrors the server-side cap on the court record
+const MAX_LOGS = 50;
 
 // Custom Hook for render counting
 export const useRenderCount = (componentName: string) => {
@@ -18,4 +21,11 @@ export class PerformanceService {
     if (JSON.stringify(prev) === JSON.stringify(next)) return prev;
     return next;
   }
+
+  // Merge a delta patch (changed keys + appended log entries) into the current state
+  static applyPatch(prev: GameState, data: Partial<GameState>, logs?: LogEntry[]): GameState {
+    const next = { ...prev, ...data };
+    if (logs && logs.length) next.logs = [...prev.logs, ...logs].slice(-MAX_LOGS);
+    return next;
+  }
 }
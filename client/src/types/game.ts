@@ -49,8 +49,12 @@ export interface VoteCount {
 export interface GameState {
   /** Current vote counts for Guilty vs Innocent. */
   votes: VoteCount;
-  /** List of user IDs who have already voted. */
+  /** List of user IDs who have already voted (empty in audience mode, see voter_count). */
   voters: string[];
+  /** Audience mode (big rooms): how many have voted, sent instead of the voters list. */
+  voter_count?: number;
+  /** Audience mode: whether this client has voted in the current case. */
+  you_voted?: boolean;
   /** The specific accusation or 'crime' being judged. */
   crime: string;
   /** The final outcome of the trial. */
@@ -63,8 +67,10 @@ export interface GameState {
   accused: { username: string; avatar: string | null };
   /** Details of the witness currently on the stand. */
   witness: { username: string | null; avatar: string | null };
-  /** Time remaining for the current phase (in seconds). */
+  /** Time remaining for the current phase (in seconds). Counted down locally from `deadline`. */
   timer: number;
+  /** Epoch seconds (server clock) when voting closes, or null when no timer is running. */
+  deadline: number | null;
   /** List of active evidence cards. */
   evidence: Evidence[];
   /** History of court actions for the terminal log. */
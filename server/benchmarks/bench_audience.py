@@ -0,0 +1,86 @@
+"""
+Audience mode benchmark: one vote wave in a big room, classic fan-out vs audience mode.
+
+Connects N in-process clients (sockets that only count what they are sent) to one
+GameManager, opens a case and has every client vote, spread evenly over --wave seconds the
+way a real wave arrives. Reports frames and bytes sent to clients and the server CPU used,
+with audience mode off (every client gets the voters list on every vote) and on.
+
+Usage:
+    python benchmarks/bench_audience.py --clients 1000 --wave 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main
+
+
+class CountingSocket:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self): pass
+    async def close(self, code=1000): pass
+
+    async def send_text(self, text):
+        self.frames += 1
+        self.bytes += len(text.encode())
+
+    async def send_bytes(self, data):
+        self.frames += 1
+        self.bytes += len(data)
+
+
+async def vote_wave(clients: int, wave: float, audience: bool) -> dict:
+    main.AUDIENCE_THRESHOLD = 1 if audience else 0
+    game = main.GameManager(f"bench-{audience}")
+    sockets = [CountingSocket() for _ in range(clients)]
+    for i, ws in enumerate(sockets): await game.connect(ws, str(i))
+    await game.receive(sockets[0], "0", json.dumps({"type": "accuse_user", "user": {"id": "accused", "username": "Defendant"}}))
+    await asyncio.sleep(0.6) # Let joins and the accusation drain before counting
+    for ws in sockets: ws.frames = ws.bytes = 0
+
+    gap = wave / clients
+    cpu, started = time.process_time(), time.perf_counter()
+    for i, ws in enumerate(sockets):
+        await game.receive(ws, str(i), '{"type": "vote", "vote": "guilty"}')
+        delay = started + (i + 1) * gap - time.perf_counter()
+        await asyncio.sleep(max(0.0, delay))
+    await asyncio.sleep(1.0) # Last audience window + writers
+    cpu = time.process_time() - cpu
+    for ws in sockets: await game.disconnect(ws, server_restart=True)
+    return {
+        "mode": "audience" if audience else "classic",
+        "frames": sum(ws.frames for ws in sockets),
+        "mb_sent": round(sum(ws.bytes for ws in sockets) / 1e6, 2),
+        "server_cpu_s": round(cpu, 2),
+        "slowest_wave_s": round(time.perf_counter() - started - 1.0, 2), # > --wave when the loop fell behind
+    }
+
+
+async def run(clients: int, wave: float):
+    return [await vote_wave(clients, wave, audience) for audience in (False, True)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--wave", type=float, default=3.0, help="Seconds over which the votes arrive")
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    results = asyncio.run(run(args.clients, args.wave))
+    if args.json: print(json.dumps({"benchmark": "audience", "clients": args.clients, "wave_s": args.wave, "results": results}))
+    else:
+        print(f"{args.clients} clients voting over {args.wave} s")
+        for r in results:
+            print(f"{r['mode']:>9}: {r['frames']:>8} frames, {r['mb_sent']:>8} MB, server CPU {r['server_cpu_s']} s, wave took {r['slowest_wave_s']} s")
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for POST /api/interactions.
+
+Signs PING and /accuse payloads with a throwaway Ed25519 key, drives the FastAPI app
+in-process over ASGI (no network) and reports requests per second for each payload.
+Pass --json for machine-readable output to compare runs between commits.
+
+Usage:
+    python benchmarks/bench_interactions.py --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from nacl.signing import SigningKey
+
+SIGNING_KEY = SigningKey.generate()
+os.environ["DISCORD_PUBLIC_KEY"] = SIGNING_KEY.verify_key.encode().hex() # Must be set before importing main
+
+import httpx
+import main
+
+logging.getLogger("httpx").setLevel(logging.WARNING) # One INFO line per request would dominate the timing
+
+PAYLOADS = {
+    "ping": {"type": 1},
+    "accuse": {
+        "type": 2,
+        "channel_id": "100000000000000001",
+        "data": {
+            "name": "accuse",
+            "options": [{"name": "user", "value": "200000000000000002"}, {"name": "reason", "value": "Stealing the last kill"}],
+            "resolved": {"users": {"200000000000000002": {"username": "suspect", "avatar": None}}},
+        },
+    },
+}
+
+
+def signed(payload: dict):
+    body = json.dumps(payload).encode()
+    timestamp = str(int(time.time()))
+    signature = SIGNING_KEY.sign(timestamp.encode() + body).signature.hex()
+    return body, {"X-Signature-Ed25519": signature, "X-Signature-Timestamp": timestamp, "Content-Type": "application/json"}
+
+
+async def measure(client: httpx.AsyncClient, name: str, requests: int) -> dict:
+    body, headers = signed(PAYLOADS[name])
+    for _ in range(min(200, requests)): # Warm-up
+        await client.post("/api/interactions", content=body, headers=headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        r = await client.post("/api/interactions", content=body, headers=headers)
+        assert r.status_code == 200, r.text
+    elapsed = time.perf_counter() - started
+    return {"payload": name, "requests": requests, "rps": round(requests / elapsed, 1), "us_per_request": round(elapsed / requests * 1e6, 1)}
+
+
+async def run(requests: int):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return [await measure(client, name, requests) for name in PAYLOADS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests))
+    if args.json: print(json.dumps({"benchmark": "interactions", "results": results}))
+    else:
+        for r in results: print(f"{r['payload']:>8}: {r['rps']:>9} req/s  ({r['us_per_request']} us/req)")
@@ -0,0 +1,270 @@
+"""
+Load harness for the /ws game protocol.
+
+Starts the app on localhost in a subprocess (with DiscordBot stubbed: embeds are built but
+never sent) and drives N rooms x M players over real WebSockets. Every room plays scripted
+trials: accuse_user -> vote burst -> add_evidence -> objection -> call_verdict -> next_case.
+
+Reports action-to-broadcast latency (p50/p99/max: from sending an action until each player
+sees the patch that reflects it), messages per second, server event-loop lag and server RSS.
+Pass --json to compare runs between commits, or --url to target a server started elsewhere
+(loop lag/RSS are then only reported if it was started with --serve).
+
+Usage:
+    python benchmarks/bench_load.py --rooms 50 --players 8 --rounds 3 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+try:
+    import msgpack
+except ImportError: # Only needed for --encoding msgpack
+    msgpack = None
+
+LAG_INTERVAL = 0.01      # Seconds between event-loop lag probes on the server
+OBJECTION_COOLDOWN = 10  # Mirrors the server's per-room objection limit
+
+
+# --- SERVER SIDE (--serve) ---
+def rss_mb() -> dict:
+    usage = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS", "VmHWM")): usage[line.split(":")[0]] = int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        usage["VmHWM"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"rss_mb": round(usage.get("VmRSS", 0), 1), "peak_rss_mb": round(usage.get("VmHWM", 0), 1)}
+
+
+def serve(port: int):
+    os.environ.setdefault("DISCORD_BOT_TOKEN", "bench") # Build the embeds, like production does
+    import uvicorn
+    import main
+    from fastapi.routing import APIRoute
+    from utils.discord_bot import bot_client
+
+    stubbed = {"embeds": 0}
+    def fake_post(url, embed, channel_id, urgent=False): stubbed["embeds"] += 1
+    bot_client._post = fake_post
+
+    lag = {"samples": [], "task": None}
+    async def monitor():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            lag["samples"].append(time.perf_counter() - started - LAG_INTERVAL)
+
+    async def bench_stats(reset: bool = False):
+        if lag["task"] is None: lag["task"] = asyncio.create_task(monitor())
+        samples = sorted(lag["samples"])
+        stats = {"loop_lag_ms": summarize(samples), **rss_mb(), "embeds_stubbed": stubbed["embeds"]}
+        if reset: lag["samples"].clear()
+        return stats
+
+    main.app.router.routes.insert(0, APIRoute("/__bench/stats", bench_stats)) # Ahead of the static mount
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# --- CLIENT SIDE ---
+def summarize(samples) -> dict:
+    if not samples: return {"p50": None, "p99": None, "max": None}
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3, 2)
+    return {"p50": pick(0.50), "p99": pick(0.99), "max": round(samples[-1] * 1e3, 2)}
+
+
+class Player:
+    def __init__(self, websocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.version = -1
+        self.frames = 0
+        self._waiters = [] # (predicate, future)
+        self.task = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for frame in self.websocket:
+                self.frames += 1
+                message = msgpack.unpackb(frame) if isinstance(frame, bytes) else json.loads(frame)
+                if message.get("type") in ("update", "patch"): self.version = message["version"]
+                if not self._waiters: continue
+                now = time.perf_counter()
+                for waiter in [w for w in self._waiters if w[0](message)]:
+                    self._waiters.remove(waiter)
+                    if not waiter[1].done(): waiter[1].set_result(now)
+        except Exception: pass
+
+    def wait_for(self, predicate) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((predicate, future))
+        return future
+
+    def next_patch(self) -> asyncio.Future:
+        version = self.version
+        return self.wait_for(lambda m: m.get("type") == "patch" and m["version"] > version)
+
+    async def send(self, message: dict):
+        await self.websocket.send(json.dumps(message))
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.actions = 0
+        self.timeouts = 0
+
+    async def collect(self, started: float, futures, timeout: float):
+        self.actions += 1
+        done, pending = await asyncio.wait(futures, timeout=timeout)
+        self.timeouts += len(pending)
+        self.latencies.extend(f.result() - started for f in done)
+        for f in pending: f.cancel()
+
+
+async def play_room(url: str, room: int, players: int, rounds: int, think: float, encoding: str, results: Results, timeout: float):
+    import websockets
+    room_players = []
+    for i in range(players): # Sequential, so player 0 becomes the judge
+        user_id = f"{room:05d}{i:04d}"
+        ws = await websockets.connect(f"{url}/ws?instance_id=bench-{room}&user_id={user_id}&channel_id=bench-{room}&encoding={encoding}",
+                                      max_size=None, open_timeout=30)
+        room_players.append(Player(ws, user_id))
+    judge = room_players[0]
+    await asyncio.sleep(think)
+
+    async def act(sender: Player, message: dict):
+        futures = [p.next_patch() for p in room_players]
+        started = time.perf_counter()
+        await sender.send(message)
+        await results.collect(started, futures, timeout)
+        await asyncio.sleep(think)
+
+    last_objection = float("-inf")
+    try:
+        for round_ in range(rounds):
+            accused = room_players[-1]
+            await act(judge, {"type": "accuse_user", "user": {"id": accused.user_id, "username": f"Player{accused.user_id}", "avatar": None}})
+
+            # Vote burst: everyone at once; each voter waits until its own vote is visible
+            async def vote(p: Player, choice: str):
+                future = p.wait_for(lambda m: m.get("type") == "patch" and p.user_id in m["data"].get("voters", ()))
+                started = time.perf_counter()
+                await p.send({"type": "vote", "vote": choice})
+                await results.collect(started, [future], timeout)
+            await asyncio.gather(*(vote(p, "guilty" if i % 3 else "innocent") for i, p in enumerate(room_players)))
+            await asyncio.sleep(think)
+
+            for p in room_players[1:3]:
+                await act(p, {"type": "add_evidence", "text": "Screenshot of the ready check timing out", "username": p.user_id})
+            # Objections are limited to one per 10 s per room; extra ones are sent but get no broadcast
+            objection = {"type": "objection", "username": room_players[1].user_id}
+            if time.monotonic() - last_objection >= OBJECTION_COOLDOWN:
+                last_objection = time.monotonic()
+                await act(room_players[1], objection)
+            else: await room_players[1].send(objection)
+            await act(judge, {"type": "call_verdict"})
+            await act(judge, {"type": "next_case"})
+            if round_ < rounds - 1: await asyncio.sleep(3.0) # Evidence cooldown before the next round
+    finally:
+        for p in room_players:
+            await p.websocket.close()
+            p.task.cancel()
+    return sum(p.frames for p in room_players)
+
+
+async def fetch_stats(http_url: str, reset: bool = False):
+    import httpx
+    try:
+        async with httpx.AsyncClient() as client:
+            r = await client.get(f"{http_url}/__bench/stats", params={"reset": reset})
+            return r.json() if r.status_code == 200 else None
+    except httpx.HTTPError:
+        return None
+
+
+async def run_load(url: str, rooms: int, players: int, rounds: int, think: float, encoding: str, timeout: float) -> dict:
+    http_url = url.replace("ws://", "http://", 1)
+    await fetch_stats(http_url, reset=True)
+    results = Results()
+    started = time.perf_counter()
+    frames = await asyncio.gather(*(play_room(url, r, players, rounds, think, encoding, results, timeout) for r in range(rooms)))
+    elapsed = time.perf_counter() - started
+    server = await fetch_stats(http_url)
+    return {
+        "benchmark": "load",
+        "commit": git_commit(),
+        "rooms": rooms, "players": players, "rounds": rounds, "encoding": encoding,
+        "duration_s": round(elapsed, 2),
+        "actions": results.actions,
+        "timeouts": results.timeouts,
+        "latency_ms": summarize(results.latencies),
+        "msgs_per_s": round(sum(frames) / elapsed, 1),
+        "actions_per_s": round(results.actions / elapsed, 1),
+        "server": server,
+    }
+
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError): return None
+
+
+async def wait_until_up(http_url: str, process: subprocess.Popen):
+    for _ in range(100):
+        if process.poll() is not None: raise RuntimeError("server exited during startup")
+        if await fetch_stats(http_url) is not None: return
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def main(args):
+    if args.url: return await run_load(args.url, args.rooms, args.players, args.rounds, args.think, args.encoding, args.timeout)
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)],
+                               cwd=os.path.join(os.path.dirname(__file__), ".."), stdout=subprocess.DEVNULL)
+    try:
+        await wait_until_up(f"http://127.0.0.1:{args.port}", process)
+        return await run_load(f"ws://127.0.0.1:{args.port}", args.rooms, args.players, args.rounds, args.think, args.encoding, args.timeout)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--think", type=float, default=0.05, help="Seconds between scripted actions in a room")
+    parser.add_argument("--encoding", default="json", choices=("json", "orjson", "msgpack"))
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait for an action's broadcast")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--url", help="ws://host:port of an already running server")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a summary")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        sys.exit(0)
+
+    report = asyncio.run(main(args))
+    if args.json: print(json.dumps(report))
+    else:
+        server = report["server"] or {}
+        print(f"{report['rooms']} rooms x {report['players']} players, {report['rounds']} rounds in {report['duration_s']} s "
+              f"({report['actions']} actions, {report['timeouts']} timeouts)")
+        print(f"  latency   p50 {report['latency_ms']['p50']} ms | p99 {report['latency_ms']['p99']} ms | max {report['latency_ms']['max']} ms")
+        print(f"  throughput {report['msgs_per_s']} msgs/s, {report['actions_per_s']} actions/s")
+        if server:
+            print(f"  server loop lag p50 {server['loop_lag_ms']['p50']} ms | p99 {server['loop_lag_ms']['p99']} ms | "
+                  f"max {server['loop_lag_ms']['max']} ms, RSS {server['rss_mb']} MB (peak {server['peak_rss_mb']} MB)")
@@ -0,0 +1,151 @@
+"""
+Metrics overhead benchmark.
+
+1. Primitive costs: Counter.inc, Histogram.observe and the prebuilt-child lookup used on
+   the hot path, in nanoseconds per call, and what they add up to per handled message.
+2. End to end: GameManager.receive() for an `update_crime` message broadcast to a room of
+   8 sockets, with the instrumented receive/broadcast vs copies of them without metrics.
+   Outbound queues are replaced by no-op sinks so socket writers don't add scheduling noise;
+   what is left is parse + handle + patch + encode + fan-out, i.e. the work metrics wrap.
+   A difference of ~1 µs is within run-to-run noise on a busy machine, which is why the
+   fastest run is reported next to the median and the per-message estimate from (1).
+
+Usage:
+    python benchmarks/bench_metrics.py --messages 20000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main
+from main import GameManager, handle_error
+from utils import inbound
+from utils.metrics import Counter, Histogram, LATENCY_BUCKETS
+
+SOCKETS = 8
+
+
+class NullSocket:
+    async def accept(self): pass
+    async def send_text(self, text): pass
+    async def send_bytes(self, data): pass
+    async def close(self, code=1000): pass
+
+
+class NullQueue:
+    def __init__(self, codec):
+        self.codec = codec
+
+    def put(self, payload, message): pass
+
+
+class UninstrumentedGame(GameManager):
+    """receive/broadcast as they were before the metrics were added."""
+    __slots__ = ()
+
+    async def broadcast(self, message: dict):
+        if not self.active_connections: return
+        encoded = {}
+        for ws in self.active_connections:
+            queue = self.queues[ws]
+            payload = encoded.get(queue.codec.name)
+            if payload is None: payload = encoded[queue.codec.name] = queue.codec.encode(message)
+            queue.put(payload, message)
+
+    async def receive(self, websocket, user_id: str, data: str):
+        bucket = self.inbound.get(websocket)
+        if bucket is not None and not bucket.take(): return
+        message, reason = inbound.parse(data)
+        if message is not None and message["type"] in inbound.JUDGE_ONLY and user_id != self.state.judge_id: reason = "not_judge"
+        if reason is not None: return
+        try:
+            if message["type"] == "sync": await self.send_snapshot(websocket)
+            else: await self.handle_message(message, user_id, websocket)
+        except Exception as e: handle_error(e, "handle_message")
+
+
+def ns_per_call(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls): fn()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def primitives(calls: int) -> dict:
+    counter, histogram = Counter(), Histogram(LATENCY_BUCKETS)
+    timers = {t: histogram for t in main.MESSAGE_TYPES}
+    baseline = ns_per_call(lambda: None, calls)
+    inc = ns_per_call(counter.inc, calls) - baseline
+    observe = ns_per_call(lambda: histogram.observe(0.0003), calls) - baseline
+    lookup_and_observe = ns_per_call(lambda: timers.get("vote", histogram).observe(0.0003), calls) - baseline
+    clock = ns_per_call(time.perf_counter, calls) - baseline
+    # What one handled message pays: receive() times itself; its broadcast counts frames, times itself
+    # (always while the slow-callback check is on) and, 1 in BROADCAST_SAMPLE_EVERY, records time and size
+    broadcast_clock = 2 * clock if main.WATCH_SLOW_BROADCASTS else 2 * clock / main.BROADCAST_SAMPLE_EVERY
+    per_message = 2 * clock + lookup_and_observe + inc + broadcast_clock + 2 * observe / main.BROADCAST_SAMPLE_EVERY
+    return {
+        "counter_inc_ns": round(inc, 1),
+        "histogram_observe_ns": round(observe, 1),
+        "lookup_and_observe_ns": round(lookup_and_observe, 1),
+        "perf_counter_ns": round(clock, 1),
+        "per_message_ns": round(per_message, 1),
+    }
+
+
+async def us_per_message(cls, messages: int) -> float:
+    game = cls("bench")
+    sockets = [NullSocket() for _ in range(SOCKETS)]
+    for i, ws in enumerate(sockets): await game.connect(ws, f"user{i}")
+    for ws in sockets:
+        queue = game.queues[ws]
+        queue.close()
+        game.queues[ws] = NullQueue(queue.codec)
+    game.inbound.clear() # The judge would be rate limited after a burst; this measures handling, not the limiter
+    await asyncio.sleep(0) # Let the real writers finish cancelling
+    judge = sockets[0]
+    frames = [json.dumps({"type": "update_crime", "crime": f"Stealing the last kill #{i}"}) for i in range(messages)]
+    started = time.perf_counter()
+    for frame in frames: await game.receive(judge, "user0", frame)
+    elapsed = time.perf_counter() - started
+    return elapsed / messages * 1e6
+
+
+async def end_to_end(messages: int, rounds: int) -> dict:
+    # Interleaved in shuffled order with the GC off, so neither side is favoured by position or a collection.
+    # Both the fastest and the median run are reported: on a noisy machine the median alone moves by ~1 µs.
+    runs = {UninstrumentedGame: [], GameManager: []}
+    for _ in range(rounds):
+        for cls in random.sample(list(runs), len(runs)):
+            gc.collect()
+            gc.disable()
+            try: runs[cls].append(await us_per_message(cls, messages))
+            finally: gc.enable()
+    result = {}
+    for stat, pick in (("best", min), ("median", statistics.median)):
+        bare, instrumented = pick(runs[UninstrumentedGame]), pick(runs[GameManager])
+        result.update({f"{stat}_uninstrumented_us_per_msg": round(bare, 2), f"{stat}_instrumented_us_per_msg": round(instrumented, 2),
+                       f"{stat}_overhead_us_per_msg": round(instrumented - bare, 2), f"{stat}_overhead_pct": round((instrumented - bare) / bare * 100, 1)})
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=15, help="Runs per variant")
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    results = {"primitives": primitives(1_000_000), "receive": asyncio.run(end_to_end(args.messages, args.rounds))}
+    if args.json: print(json.dumps({"benchmark": "metrics", **results}))
+    else:
+        for section, values in results.items():
+            print(f"{section}: " + ", ".join(f"{k}={v}" for k, v in values.items()))
@@ -0,0 +1,85 @@
+"""
+Moderation benchmark: the old per-word `re.search` loop vs the compiled WordMatcher.
+
+Generates synthetic word lists of 10, 1k and 10k terms and checks a batch of
+evidence-sized (<=100 chars) texts against each, reporting build time and
+microseconds per `is_clean` call.
+
+Usage:
+    python benchmarks/bench_moderation.py --texts 2000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.moderation import WordMatcher
+
+SIZES = (10, 1_000, 10_000)
+
+
+def legacy_is_clean(words, text: str) -> bool:
+    """The original SecurityService.is_clean."""
+    text_lower = text.lower()
+    for word in words:
+        if re.search(rf"\b{word}\b", text_lower):
+            return False
+    return True
+
+
+def random_words(count: int, rng: random.Random):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def random_texts(count: int, rng: random.Random):
+    vocab = ["the", "judge", "stole", "my", "kill", "again", "evidence", "shows", "he", "was", "afk", "during", "ready", "check", "lol"]
+    return [" ".join(rng.choice(vocab) for _ in range(rng.randint(5, 18)))[:100] for _ in range(count)]
+
+
+def timed(fn, texts) -> float:
+    started = time.perf_counter()
+    for text in texts: fn(text)
+    return (time.perf_counter() - started) / len(texts) * 1e6
+
+
+def run(texts_count: int):
+    rng = random.Random(42)
+    texts = random_texts(texts_count, rng)
+    results = []
+    for size in SIZES:
+        words = random_words(size, rng)
+        started = time.perf_counter()
+        matcher = WordMatcher(words)
+        build_ms = (time.perf_counter() - started) * 1e3
+        # The legacy loop is O(words) per call, so it gets a smaller sample at large sizes
+        legacy_texts = texts[: max(20, texts_count * 10 // size)] if size > 100 else texts
+        results.append({
+            "terms": size,
+            "legacy_us_per_check": round(timed(lambda t: legacy_is_clean(words, t), legacy_texts), 1),
+            "matcher_us_per_check": round(timed(lambda t: matcher.search(t) is None, texts), 1),
+            "matcher_build_ms": round(build_ms, 1),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    results = run(args.texts)
+    if args.json: print(json.dumps({"benchmark": "moderation", "results": results}))
+    else:
+        for r in results:
+            print(f"{r['terms']:>6} terms: legacy {r['legacy_us_per_check']:>10} us/check | "
+                  f"matcher {r['matcher_us_per_check']:>7} us/check (built in {r['matcher_build_ms']} ms)")
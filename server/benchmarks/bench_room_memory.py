@@ -0,0 +1,122 @@
+"""
+Room memory benchmark: the old dict-based GameManager state vs the slotted RoomState.
+
+Builds N rooms of each kind under tracemalloc and reports bytes per room, both idle and
+with 100 voters and a full log. User id strings are created up front and shared, so the
+numbers cover the room structures themselves.
+
+Exits with status 1 when an idle room is over --idle-budget-bytes, so a new per-room
+structure that is allocated eagerly shows up in CI.
+
+Usage:
+    python benchmarks/bench_room_memory.py --rooms 2000
+    python benchmarks/bench_room_memory.py --idle-budget-bytes 2153 --json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DISCORD_BOT_TOKEN", "")
+
+from main import GameManager
+from utils.ttl_cache import TTLCache
+
+VOTERS = 100
+LOGS = 50
+
+
+class LegacyRoom:
+    """The previous GameManager fields: nested dict state and per-room content banks."""
+
+    def __init__(self):
+        self.instance_id = "default"
+        self.active_connections = []
+        self.user_map = {}
+        self.queues = {}
+        self.channel_id = None
+        self.last_objection_time = 0
+        self.user_last_action = TTLCache(3, 1000)
+        self.last_active = time.monotonic()
+        self.version = 0
+        self._dirty = set()
+        self._new_logs = []
+        self._cause = ("init", None)
+        self._unsnapshotted = 0
+        self.state = {
+            "votes": {"guilty": 0, "innocent": 0}, "crime": "", "verdict": None, "judge_id": None,
+            "accused": {"id": None, "username": "Unknown", "avatar": None},
+            "witness": {"username": None, "avatar": None},
+            "voters": [], "evidence": [], "logs": [], "timer": 60, "deadline": None, "sentence": None,
+        }
+        self.crimes_db = [""] * 25 # The per-room copies of the old hardcoded banks
+        self.sentences_db = [""] * 27
+        self.severe_sentences = [""] * 16
+
+    def fill(self, user_ids, entries):
+        for user_id in user_ids:
+            self.state["votes"]["guilty"] += 1
+            self.state["voters"].append(user_id)
+        for entry in entries:
+            self.state["logs"].append(dict(entry))
+            if len(self.state["logs"]) > 50: self.state["logs"].pop(0)
+
+
+def fill_compact(game: GameManager, user_ids, entries):
+    for user_id in user_ids:
+        game.state.guilty += 1
+        game.state.voters.add(user_id)
+    for entry in entries: game.state.logs.append(dict(entry))
+
+
+def bytes_per_room(factory, rooms: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    kept = [factory() for _ in range(rooms)]
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del kept
+    return used / rooms
+
+
+def run(rooms: int):
+    user_ids = [str(10 ** 17 + i) for i in range(VOTERS)] # Discord-sized snowflakes
+    entries = [{"message": f"Log entry {i}", "type": "info"} for i in range(LOGS)]
+
+    def legacy_busy():
+        room = LegacyRoom()
+        room.fill(user_ids, entries)
+        return room
+
+    def compact_busy():
+        game = GameManager()
+        fill_compact(game, user_ids, entries)
+        return game
+
+    return [
+        {"room": "idle", "legacy_bytes": round(bytes_per_room(LegacyRoom, rooms)), "compact_bytes": round(bytes_per_room(GameManager, rooms))},
+        {"room": f"{VOTERS} voters, {LOGS} logs", "legacy_bytes": round(bytes_per_room(legacy_busy, rooms)), "compact_bytes": round(bytes_per_room(compact_busy, rooms))},
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--idle-budget-bytes", type=int, default=2153, help="Most an idle room may cost")
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    results = run(args.rooms)
+    over = results[0]["compact_bytes"] > args.idle_budget_bytes
+    if args.json: print(json.dumps({"benchmark": "room_memory", "rooms": args.rooms, "results": results,
+                                    "idle_budget_bytes": args.idle_budget_bytes, "over_budget": over}))
+    else:
+        for r in results:
+            print(f"{r['room']:>22}: legacy {r['legacy_bytes']:>7} B/room | compact {r['compact_bytes']:>7} B/room")
+        if over: print(f"OVER BUDGET: an idle room costs more than {args.idle_budget_bytes} B")
+    sys.exit(1 if over else 0)
@@ -0,0 +1,136 @@
+"""
+Cold-start benchmark: how long a woken instance keeps the first player waiting.
+
+Each run starts the server the way render.yaml does (`uvicorn main:app`) in a fresh
+process and measures, from the moment the process is spawned:
+  - accept_ms:  the first /ws handshake that succeeds (time-to-first-WebSocket-accept)
+  - frame_ms:   the first frame on that socket (the room snapshot)
+  - ready_ms:   the first 200 from /readyz (caches and HTTP pools warm)
+It also times `import main` on its own, and lists the slowest modules main imports directly
+(python -X importtime), so a new eager import shows up by name.
+
+Exits with status 1 when the median import time or time-to-accept is over budget, so it can
+gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --import-budget-ms 600 --accept-budget-ms 1500 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import websockets
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+POLL_INTERVAL = 0.002
+IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def server_env() -> dict:
+    # Same settings as a default deploy: nothing persisted (the karma ledger, journal and analytics are opt-in)
+    return {k: v for k, v in os.environ.items() if k not in ("KC_KARMA_DB", "KC_JOURNAL_DIR", "KC_ANALYTICS_DIR")}
+
+
+def measure_import(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=SERVER_DIR, env=env, capture_output=True, text=True).stderr
+    modules = []
+    for m in filter(None, map(IMPORT_LINE.match, err.splitlines())):
+        depth = len(m.group(2))
+        if depth == 0 and m.group(3) == "main": break
+        if depth == 0: modules = [] # Something before main (site, sitecustomize)
+        elif depth == 2: modules.append((m.group(3), int(m.group(1)) / 1000)) # Children print before their parent
+    return [{"module": name, "ms": round(ms, 1)} for name, ms in sorted(modules, key=lambda m: -m[1])[:top]]
+
+
+async def http_status(port: int, path: str) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n".encode())
+    status = int((await reader.readline()).split()[1])
+    writer.close()
+    return status
+
+
+async def cold_start(port: int, env: dict, timeout: float) -> dict:
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                               cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {}
+    try:
+        url = f"ws://127.0.0.1:{port}/ws?user_id=bench&instance_id=bench-{port}"
+        while "accept_ms" not in result:
+            if process.poll() is not None: raise RuntimeError("server exited during startup")
+            if time.perf_counter() - started > timeout: raise RuntimeError("server did not accept in time")
+            try: ws = await websockets.connect(url, open_timeout=timeout)
+            except OSError:
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            result["accept_ms"] = (time.perf_counter() - started) * 1000
+            await ws.recv()
+            result["frame_ms"] = (time.perf_counter() - started) * 1000
+            await ws.close()
+        while time.perf_counter() - started < timeout:
+            if await http_status(port, "/readyz") == 200:
+                result["ready_ms"] = (time.perf_counter() - started) * 1000
+                break
+            await asyncio.sleep(POLL_INTERVAL)
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def median(runs: list, key: str):
+    values = [r[key] for r in runs if key in r]
+    return round(statistics.median(values), 1) if values else None
+
+
+async def run(runs: int, port: int, timeout: float, top: int) -> dict:
+    env = server_env()
+    measure_import(env) # Warm the OS file cache and __pycache__: a woken instance has both
+    imports = [measure_import(env) for _ in range(runs)]
+    starts = [await cold_start(port, env, timeout) for _ in range(runs)]
+    slowest = slowest_imports(env, top)
+    return {"runs": runs, "import_ms": round(statistics.median(imports), 1), "accept_ms": median(starts, "accept_ms"),
+            "frame_ms": median(starts, "frame_ms"), "ready_ms": median(starts, "ready_ms"), "slowest_imports": slowest}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8791)
+    parser.add_argument("--timeout", type=float, default=20.0, help="Seconds to wait for a started server")
+    parser.add_argument("--top", type=int, default=8, help="How many of main's slowest imports to list")
+    parser.add_argument("--import-budget-ms", type=float, default=float(os.getenv("KC_IMPORT_BUDGET_MS", "600")))
+    parser.add_argument("--accept-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a summary")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.runs, args.port, args.timeout, args.top))
+    over = [name for name, value, budget in (("import", report["import_ms"], args.import_budget_ms), ("accept", report["accept_ms"], args.accept_budget_ms))
+            if value is None or value > budget]
+    report.update(benchmark="startup", import_budget_ms=args.import_budget_ms, accept_budget_ms=args.accept_budget_ms, over_budget=over)
+    if args.json: print(json.dumps(report))
+    else:
+        print(f"median of {args.runs} cold starts")
+        print(f"  import main       {report['import_ms']:>7} ms (budget {args.import_budget_ms:.0f})")
+        print(f"  first WS accept   {report['accept_ms']:>7} ms (budget {args.accept_budget_ms:.0f})")
+        print(f"  first frame       {report['frame_ms']:>7} ms")
+        print(f"  /readyz 200       {report['ready_ms']!s:>7} ms")
+        print("  slowest imports in main: " + ", ".join(f"{m['module']} {m['ms']} ms" for m in report["slowest_imports"]))
+        if over: print("OVER BUDGET: " + ", ".join(over))
+    sys.exit(1 if over else 0)
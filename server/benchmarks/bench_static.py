@@ -0,0 +1,110 @@
+"""
+Static serving benchmark: an Activity launch storm against the client build.
+
+Every simulated launch fetches index.html plus each asset once, the way a cold browser does
+(Accept-Encoding: br, gzip), straight through the ASGI app so only the server side is
+measured. Compares Starlette's StaticFiles (what the app mounted before) with StaticAssets:
+requests per second and bytes on the wire. Without --dist a synthetic Vite-like build
+(~600 KB of JS/CSS plus a sound) is generated.
+
+Usage:
+    python benchmarks/bench_static.py --launches 500
+    python benchmarks/bench_static.py --dist ../client/dist --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from starlette.staticfiles import StaticFiles
+
+from utils.static_files import StaticAssets
+
+
+def synthetic_dist() -> str:
+    directory = tempfile.mkdtemp(prefix="kc-dist-")
+    os.makedirs(os.path.join(directory, "assets"))
+    rng = random.Random(7)
+    words = ["".join(rng.choices(string.ascii_letters, k=rng.randint(3, 12))) for _ in range(3000)]
+    def source(size):
+        return " ".join(rng.choice(words) + rng.choice(["();", "=>{", "}", ":0,"]) for _ in range(size // 8)).encode()[:size]
+    files = {"index.html": source(2_000), "assets/index-B2x9Qk1a.js": source(450_000), "assets/vendor-Cq81LmZa.js": source(120_000),
+             "assets/index-D0x7sPqL.css": source(40_000), "gavel.mp3": os.urandom(60_000)}
+    for name, body in files.items():
+        with open(os.path.join(directory, name), "wb") as f: f.write(body)
+    return directory
+
+
+def launch_paths(directory: str) -> list:
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith((".br", ".gz")): paths.append("/" + os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/"))
+    return ["/"] + [p for p in paths if p != "/index.html"]
+
+
+async def fetch(app, path: str) -> int:
+    scope = {"type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"", "scheme": "http",
+             "server": ("bench", 80), "http_version": "1.1", "headers": [(b"accept-encoding", b"br, gzip")]}
+    sent, requested = 0, False
+    async def receive():
+        nonlocal requested
+        if requested: await asyncio.Event().wait() # The client never disconnects (Starlette listens for it while sending)
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body": sent += len(message.get("body", b""))
+    await app(scope, receive, send)
+    return sent
+
+
+async def storm(name: str, app, paths: list, launches: int, concurrency: int) -> dict:
+    await asyncio.gather(*(fetch(app, p) for p in paths)) # Warm up
+    queue = [p for _ in range(launches) for p in paths]
+    sent = 0
+    async def worker(share):
+        nonlocal sent
+        for path in share:
+            size = await fetch(app, path)
+            sent += size
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(queue[i::concurrency]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"server": name, "requests": len(queue), "req_per_s": round(len(queue) / elapsed), "mb_sent": round(sent / 1e6, 1),
+            "ms_per_launch": round(elapsed * 1000 / launches, 2)}
+
+
+async def run(directory: str, launches: int, concurrency: int) -> list:
+    paths = launch_paths(directory)
+    assets = StaticAssets(directory)
+    await assets.start()
+    await assets._compressor
+    return [await storm("StaticFiles", StaticFiles(directory=directory, html=True), paths, launches, concurrency),
+            await storm("StaticAssets", assets, paths, launches, concurrency)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dist", help="A client build to serve (default: a synthetic one)")
+    parser.add_argument("--launches", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    directory = args.dist or synthetic_dist()
+    results = asyncio.run(run(directory, args.launches, args.concurrency))
+    if args.json: print(json.dumps({"benchmark": "static", "launches": args.launches, "concurrency": args.concurrency, "results": results}))
+    else:
+        print(f"{args.launches} launches x {len(launch_paths(directory))} files, {args.concurrency} concurrent")
+        for r in results:
+            print(f"{r['server']:>12}: {r['req_per_s']:>7} req/s, {r['mb_sent']:>7} MB sent, {r['ms_per_launch']} ms per launch")
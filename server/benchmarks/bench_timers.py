@@ -0,0 +1,87 @@
+"""
+Timer benchmark: per-room countdown tasks vs the central DeadlineScheduler.
+
+Simulates N concurrent trials. The legacy mode mirrors the old GameManager._timer_countdown
+(one task per room, sleep(1) + broadcast every second). The scheduler mode registers one
+absolute deadline per room and only "broadcasts" the verdict.
+
+Usage:
+    python benchmarks/bench_timers.py --rooms 10000 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.scheduler import DeadlineScheduler
+
+
+class CountingLoop(asyncio.SelectorEventLoop):
+    """Event loop that counts its own iterations (wakeups)."""
+    iterations = 0
+
+    def _run_once(self):
+        self.iterations += 1
+        super()._run_once()
+
+
+async def legacy(rooms: int, seconds: int, stats: dict):
+    async def countdown():
+        await asyncio.sleep(random.random()) # Trials start staggered within one second
+        timer = seconds
+        while timer > 0:
+            await asyncio.sleep(1)
+            timer -= 1
+            stats["timer_wakeups"] += 1
+            stats["messages"] += 1 # Full-state broadcast per tick
+        stats["messages"] += 1     # Verdict broadcast
+        stats["verdicts"] += 1
+
+    await asyncio.gather(*(countdown() for _ in range(rooms)))
+
+
+async def central(rooms: int, seconds: int, stats: dict):
+    sched = DeadlineScheduler()
+    done = asyncio.Event()
+
+    async def verdict():
+        stats["messages"] += 1
+        stats["verdicts"] += 1
+        if stats["verdicts"] == rooms: done.set()
+
+    start = time.time()
+    for room in range(rooms):
+        # The deadline itself rides along in the accusation patch, so it costs no extra message
+        sched.schedule(room, start + random.random() + seconds, verdict)
+    await done.wait()
+    stats["timer_wakeups"] = sched.wakeups
+
+
+def run(mode: str, rooms: int, seconds: int) -> dict:
+    loop = CountingLoop()
+    stats = {"messages": 0, "verdicts": 0, "timer_wakeups": 0}
+    started = time.perf_counter()
+    try: loop.run_until_complete((legacy if mode == "legacy" else central)(rooms, seconds, stats))
+    finally: loop.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "elapsed_s": round(elapsed, 2),
+        "loop_wakeups_per_s": round(loop.iterations / elapsed, 1),
+        "messages_per_s": round(stats["messages"] / elapsed, 1),
+        **stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--seconds", type=int, default=5, help="Trial length (the app uses 60)")
+    args = parser.parse_args()
+
+    for mode in ("legacy", "scheduler"):
+        print(run(mode, args.rooms, args.seconds))
@@ -0,0 +1,103 @@
+"""
+Wire encoding benchmark for /ws: CPU per broadcast and bytes on the wire per mode.
+
+Replays the messages of a scripted trial (join snapshot, a vote burst, evidence, objections,
+verdict) through every encoding in utils/wire_codec.py, raw and with permessage-deflate
+(one zlib stream per connection with context takeover, like browsers negotiate by default).
+
+Usage:
+    python benchmarks/bench_wire.py --voters 30 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.room_state import Party, RoomState
+from utils.wire_codec import CODECS
+
+
+def trial_messages(voters: int):
+    """The messages one client receives over a trial, as dicts (before encoding)."""
+    state, version, messages = RoomState(), 0, []
+
+    def patch(keys, logs=()):
+        nonlocal version
+        version += 1
+        message = {"type": "patch", "version": version, "data": {key: state.wire(key) for key in keys}}
+        for entry in logs: state.logs.append(entry)
+        if logs: message["logs"] = list(logs)
+        messages.append(message)
+
+    for i in range(20): state.logs.append({"message": f"Evidence submitted by Player{i}", "type": "evidence"})
+    state.judge_id = "100000000000000001"
+    messages.append({"type": "update", "version": version, "server_time": time.time(), "data": state.to_wire()})
+
+    state.accused = Party("100000000000000002", "Defendant", "a1b2c3d4e5f60718293a4b5c6d7e8f90")
+    state.crime, state.deadline = "Being AFK during the ready check", time.time() + 60
+    patch(("accused", "crime", "votes", "voters", "verdict", "deadline", "timer"), [{"message": "Judge accused Defendant!", "type": "alert"}])
+    for i in range(voters):
+        state.guilty += i % 3 != 0
+        state.innocent += i % 3 == 0
+        state.voters.add(str(100000000000000100 + i))
+        patch(("votes", "voters"))
+        messages.append({"type": "sound", "sound": "vote"})
+    for i in range(5):
+        state.evidence.append({"id": i + 1, "text": f"Exhibit {i}: screenshot of the ready check timing out", "author": f"Player{i}"})
+        patch(("evidence",), [{"message": f"Evidence submitted by Player{i}", "type": "evidence"}])
+        messages.append({"type": "sound", "sound": "evidence"})
+    for i in range(3):
+        messages.append({"type": "objection_event", "user_id": str(100000000000000100 + i), "username": f"Player{i}"})
+        patch((), [{"message": f"OBJECTION! by Player{i}", "type": "objection"}])
+    state.verdict, state.deadline = "guilty", None
+    patch(("verdict", "deadline"), [{"message": "Verdict delivered: GUILTY", "type": "verdict"}])
+    return messages
+
+
+def measure(codec, messages, repeat: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        payloads = [codec.encode(m) for m in messages]
+    encode_us = (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+
+    raw = [p.encode() if isinstance(p, str) else p for p in payloads]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        stream = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        # Per message: compress + sync flush, minus the 4-byte tail the extension strips
+        deflated = [len(stream.compress(p) + stream.flush(zlib.Z_SYNC_FLUSH)) - 4 for p in raw]
+    deflate_us = (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+    return {
+        "encoding": codec.name,
+        "encode_us_per_msg": round(encode_us, 2),
+        "bytes_per_msg": round(sum(map(len, raw)) / len(raw), 1),
+        "deflate_us_per_msg": round(deflate_us, 2),
+        "deflated_bytes_per_msg": round(sum(deflated) / len(deflated), 1),
+    }
+
+
+def run(voters: int, repeat: int):
+    messages = trial_messages(voters)
+    # Fallbacks alias another codec when an optional package is missing; measure each once
+    codecs = {codec.name: codec for codec in CODECS.values()}
+    return len(messages), [measure(codec, messages, repeat) for codec in codecs.values()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voters", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    count, results = run(args.voters, args.repeat)
+    if args.json: print(json.dumps({"benchmark": "wire", "messages": count, "results": results}))
+    else:
+        print(f"{count} messages per trial")
+        for r in results:
+            print(f"{r['encoding']:>8}: encode {r['encode_us_per_msg']:>6} us, {r['bytes_per_msg']:>7} B/msg | "
+                  f"+deflate {r['deflate_us_per_msg']:>6} us, {r['deflated_bytes_per_msg']:>6} B/msg")
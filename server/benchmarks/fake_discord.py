@@ -0,0 +1,68 @@
+"""
+Local stand-in for the Discord REST API, for exercising DiscordBot without touching discord.com.
+
+Implements POST /api/v10/channels/{channel_id}/messages with per-channel rate-limit buckets
+(X-RateLimit-* headers and 429 + retry_after), plus an optional failure rate for 5xx responses.
+GET /stats returns what the fake has received.
+
+Usage:
+    python benchmarks/fake_discord.py --port 8081 --limit 5 --window 2
+    DISCORD_API_BASE=http://127.0.0.1:8081/api/v10 DISCORD_BOT_TOKEN=fake uvicorn main:app
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(limit: int = 5, window: float = 2.0, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    buckets: Dict[str, List[float]] = {} # channel_id -> [remaining, resets_at]
+    stats = {"requests": 0, "messages": 0, "embeds": 0, "rate_limited": 0, "errors": 0}
+    app.state.stats = stats
+
+    @app.post("/api/v10/channels/{channel_id}/messages")
+    async def create_message(channel_id: str, request: Request):
+        stats["requests"] += 1
+        now = time.monotonic()
+        bucket = buckets.setdefault(channel_id, [limit, now + window])
+        if now >= bucket[1]: bucket[:] = [limit, now + window]
+
+        headers = {"X-RateLimit-Bucket": "fake-messages", "X-RateLimit-Limit": str(limit)}
+        if bucket[0] <= 0:
+            stats["rate_limited"] += 1
+            retry_after = round(bucket[1] - now, 3)
+            headers.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": str(retry_after), "Retry-After": str(retry_after)})
+            return JSONResponse({"message": "You are being rate limited.", "retry_after": retry_after, "global": False}, status_code=429, headers=headers)
+
+        bucket[0] -= 1
+        headers.update({"X-RateLimit-Remaining": str(int(bucket[0])), "X-RateLimit-Reset-After": str(round(bucket[1] - now, 3))})
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"message": "Internal Server Error"}, status_code=500, headers=headers)
+
+        body = await request.json()
+        stats["messages"] += 1
+        stats["embeds"] += len(body.get("embeds", []))
+        return JSONResponse({"id": str(stats["messages"]), "channel_id": channel_id}, headers=headers)
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--limit", type=int, default=5, help="Messages per channel per window")
+    parser.add_argument("--window", type=float, default=2.0, help="Bucket window in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.limit, args.window, args.error_rate), host="127.0.0.1", port=args.port, log_level="warning")
@@ -1,28 +1,89 @@
-from fastapi.staticfiles import StaticFiles
+import time
+IMPORT_STARTED = time.perf_counter() # For the import budget (see utils/startup.py)
 import os
-import requests
 import asyncio
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from pydantic import BaseModel
-from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
-import time
-from nacl.signing import VerifyKey
-from nacl.exceptions import BadSignatureError
+import uuid
+import hmac
+import logging
+import functools
+import itertools
+from contextlib import asynccontextmanager
+from utils.startup import load_env, readiness
+load_env() # 1. Load Secrets, before the modules below read their settings
 from utils.error_handler import handle_error, log_info
+from utils.logs import log_event
 from utils.security import SecurityService
 from utils.discord_bot import bot_client
+from utils.scheduler import scheduler
+from utils.outbound import OutboundQueue, merge_patches
+from utils.oauth import oauth_client
+from utils import fastjson
+from utils.journal import journal, SNAPSHOT_EVERY
+from utils.registry_backend import RegistryBackend, RelayedSocket, WORKERS_CHANNEL, create_backend, default_worker_id
+from utils.ttl_cache import TTLCache
+from utils.room_state import RoomState, Party, TRIAL_SECONDS
+from utils.content import ContentDecks, ORDINARY, SEVERE, catalog
+from utils.wire_codec import JSON, Codec, Payload, get_codec
+from utils.audience import AudienceFeed, AUDIENCE_THRESHOLD
+from utils.resume import ReplayBuffer, RESUME_GRACE, new_token
+from utils.karma import ledger, STATS
+from utils.analytics import analytics, decode_batch, PayloadError, MAX_BODY_BYTES
+from utils.static_files import StaticAssets
+from utils import inbound
+from utils.metrics import metrics, SIZE_BUCKETS
+from utils.profiler import profiler, ProfilerBusy, report_slow, DEFAULT_INTERVAL, MAX_SECONDS, SLOW_CALLBACK_SECONDS
 
-# 1. Load Secrets
-load_dotenv()
-CLIENT_ID = os.getenv("DISCORD_CLIENT_ID")
-CLIENT_SECRET = os.getenv("DISCORD_CLIENT_SECRET")
 DISCORD_PUBLIC_KEY = os.getenv("DISCORD_PUBLIC_KEY")
+ADMIN_TOKEN = os.getenv("KC_ADMIN_TOKEN") # Bearer token for /admin/*; the routes 404 when unset
+logger = logging.getLogger("kc.game")
 
-app = FastAPI()
+IMPORT_BUDGET_MS = float(os.getenv("KC_IMPORT_BUDGET_MS", "600")) # `import main` on a woken instance; over budget logs a warning
+
+@functools.lru_cache(maxsize=1)
+def interactions_verify_key():
+    """Parsed once instead of on every interaction, and only when first needed: nacl isn't on the cold-start path."""
+    if not DISCORD_PUBLIC_KEY: return None
+    from nacl.signing import VerifyKey
+    try: return VerifyKey(bytes.fromhex(DISCORD_PUBLIC_KEY))
+    except Exception as e:
+        handle_error(e, "load_public_key")
+        return None
+
+async def warm_up():
+    """What the first requests would otherwise pay for, done once the server is already accepting."""
+    try:
+        await asyncio.to_thread(catalog.get) # Index the content catalog before the first room draws from it
+        await asyncio.to_thread(interactions_verify_key)
+        await asyncio.gather(bot_client.warm_up(), oauth_client.warm_up())
+    except Exception as e: handle_error(e, "warm_up")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await registry.start()
+    await journal.start()
+    await ledger.start()
+    await analytics.start(registry.worker_id)
+    if static_assets: await static_assets.start() # Index now; brotli/gzip variants are built in the background
+    metrics.start_loop_monitor()
+    warming = asyncio.create_task(warm_up())
+    yield
+    warming.cancel()
+    metrics.stop_loop_monitor()
+    # Shutdown: persist journaled rooms, deliver queued embeds and close the pooled Discord connections
+    await journal.close()
+    await ledger.close()
+    await analytics.close()
+    await bot_client.aclose()
+    await oauth_client.aclose()
+    await registry.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,292 +95,682 @@ app.add_middleware(
 )
 
 # --- GAME REGISTRY (GLOBAL) ---
+SWEEP_INTERVAL = float(os.getenv("KC_SWEEP_INTERVAL", "30")) # Seconds between sweeps of stale state
+ROOM_IDLE_TTL = float(os.getenv("KC_ROOM_IDLE_TTL", "60"))   # Empty rooms older than this are dropped
+
 class GameRegistry:
-    def __init__(self):
+    """
+    Rooms hosted by this worker. Pending cases and room ownership live in the backend so
+    several workers can share them; a socket that lands on a worker which doesn't own its
+    room is relayed to the owner over the backend's pub/sub.
+    """
+    def __init__(self, backend: RegistryBackend, worker_id: str):
         self._games: Dict[str, 'GameManager'] = {}
-        self.pending_cases: Dict[str, dict] = {} # channel_id -> case_data
+        self.backend = backend
+        self.worker_id = worker_id
+        self._relayed: Dict[str, Tuple[str, RelayedSocket, str]] = {} # conn_id -> (instance_id, socket, user_id)
+        self._outgoing: Dict[str, Tuple[str, WebSocket, OutboundQueue]] = {} # conn_id -> (owner, socket, queue), relayed to other workers
+        self._room_locks: Dict[str, list] = {} # instance_id -> [lock, users]
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.backend.start()
+        self.backend.on_reconnect = self._reclaim_rooms
+        await self.backend.subscribe(f"worker:{self.worker_id}", self._on_relay_message)
+        await self.backend.subscribe(WORKERS_CHANNEL, self._on_worker_event)
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def close(self):
+        if self._sweeper: self._sweeper.cancel()
+        await self.backend.close()
+
+    # --- HOUSEKEEPING ---
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            try: await self.sweep()
+            except Exception as e: handle_error(e, "registry_sweep")
+
+    async def sweep(self):
+        """Drops expired pending cases and rate-limit entries, and rooms left empty without a cleanup."""
+        self.backend.sweep()
+        cutoff = time.monotonic() - ROOM_IDLE_TTL
+        for instance_id, game in list(self._games.items()):
+            if game.user_last_action: game.user_last_action.sweep()
+            if not game.active_connections and game.last_active < cutoff:
+                await self.cleanup_game(instance_id)
+
+    def gauges(self) -> Dict[str, int]:
+        """Sizes of the per-process structures that grow with traffic."""
+        pending = self.backend.pending_case_count()
+        return {
+            "rooms": len(self._games),
+            "empty_rooms": sum(1 for g in self._games.values() if not g.active_connections),
+            "connections": sum(len(g.active_connections) for g in self._games.values()),
+            "relayed_connections": len(self._relayed),
+            "pending_cases": pending if pending is not None else -1, # -1: held by the broker
+            "rate_limit_entries": sum(len(g.user_last_action) for g in self._games.values() if g.user_last_action is not None),
+        }
 
-    def get_game(self, instance_id: str) -> 'GameManager':
-        if instance_id not in self._games: self._games[instance_id] = GameManager()
+    async def get_game(self, instance_id: str) -> 'GameManager':
+        if instance_id not in self._games:
+            # Rooms are rebuilt from the journal lazily, on the first reconnect after a restart
+            game = GameManager(instance_id)
+            await game.restore()
+            self._games[instance_id] = game
         return self._games[instance_id]
-    
-    def cleanup_game(self, instance_id: str):
-        if instance_id in self._games and not self._games[instance_id].active_connections: del self._games[instance_id]
 
-registry = GameRegistry()
+    async def put_pending_case(self, channel_id: str, case: dict):
+        await self.backend.put_pending_case(channel_id, case)
+
+    async def pop_pending_case(self, channel_id: str) -> Optional[dict]:
+        return await self.backend.pop_pending_case(channel_id)
+
+    async def claim(self, instance_id: str) -> Tuple[Optional['GameManager'], str]:
+        """Returns (game, owner). game is None when another worker owns the room."""
+        async with self._room_lock(instance_id):
+            owner = await self.backend.claim_room(instance_id, self.worker_id)
+            if owner != self.worker_id: return None, owner
+            game = await self.get_game(instance_id)
+            game.last_active = time.monotonic() # Not sweepable while the claimant connects
+            return game, owner
+
+    async def cleanup_game(self, instance_id: str, server_restart: bool = False):
+        async with self._room_lock(instance_id):
+            game = self._games.get(instance_id)
+            # Kept while a dropped player may still resume; their departure closes it
+            if game and not game.active_connections and not game.leaving:
+                del self._games[instance_id]
+                scheduler.cancel(game) # A verdict timer firing now would journal the dead trial again
+                # Everyone left: the trial is over. On a restart, keep it for when they reconnect
+                if not server_restart: journal.delete(instance_id)
+                await self.backend.release_room(instance_id, self.worker_id)
+
+    @asynccontextmanager
+    async def _room_lock(self, instance_id: str):
+        # Serializes claim/release per room so a release can't undo a concurrent claim
+        entry = self._room_locks.setdefault(instance_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]: yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0: del self._room_locks[instance_id]
+
+    async def _reclaim_rooms(self):
+        for instance_id in list(self._games):
+            owner = await self.backend.claim_room(instance_id, self.worker_id)
+            if owner != self.worker_id:
+                log_info(f"Room was claimed by {owner} while disconnected", "room_moved", room=instance_id)
+                await self._hand_over(instance_id)
+
+    async def _hand_over(self, instance_id: str):
+        """Another worker hosts the room now: close its sockets here (clients reconnect and get routed there) and drop it."""
+        async with self._room_lock(instance_id):
+            game = self._games.pop(instance_id, None)
+            if game is None: return
+            scheduler.cancel(game)
+            for conn_id in [c for c, entry in self._relayed.items() if entry[0] == instance_id]: del self._relayed[conn_id]
+            for ws in list(game.active_connections):
+                await game.disconnect(ws, server_restart=True) # Like a redeploy: the journal stays for the new owner
+                try: await ws.close(code=SERVER_RESTART)
+                except Exception: pass
+
+    async def _on_worker_event(self, message: dict):
+        """A room owner lost its broker connection: its rooms are gone, so close the sockets relayed to it."""
+        if message.get("op") != "gone": return
+        for conn_id, (owner, websocket, queue) in list(self._outgoing.items()):
+            if owner != message["worker"]: continue
+            del self._outgoing[conn_id]
+            queue.close()
+            try: await websocket.close(code=SERVER_RESTART)
+            except Exception: pass
+
+    # --- RELAYING (socket on this worker, room on another) ---
+    async def relay(self, websocket: WebSocket, owner: str, instance_id: str, user_id: str, channel_id: Optional[str], codec: Codec = JSON,
+                    resume: Optional[str] = None, since: Optional[int] = None, guild_id: Optional[str] = None):
+        await websocket.accept()
+        conn_id = uuid.uuid4().hex
+        queue = OutboundQueue(websocket, codec)
+        inbox = f"worker:{owner}"
+
+        async def on_frame(frame: dict):
+            # The owner relays plain JSON; re-encode here if this client asked for something else. The message goes
+            # with it so the queue can coalesce patches and bound one-shot events, as for a local socket
+            if frame["op"] == "send":
+                message = fastjson.loads(frame["text"])
+                queue.put(frame["text"] if codec is JSON else codec.encode(message), message)
+            elif frame["op"] == "close":
+                queue.close()
+                await websocket.close(code=frame.get("code", 1000))
+
+        await self.backend.subscribe(f"conn:{conn_id}", on_frame)
+        self._outgoing[conn_id] = (owner, websocket, queue)
+        await self.backend.publish(inbox, {"op": "join", "conn": conn_id, "room": instance_id, "user_id": user_id, "channel_id": channel_id,
+                                          "resume": resume, "since": since, "guild_id": guild_id})
+        code = 1000
+        try:
+            while True:
+                data = await websocket.receive_text()
+                await self.backend.publish(inbox, {"op": "msg", "conn": conn_id, "text": data})
+        except WebSocketDisconnect as e: code = e.code
+        except Exception as e: handle_error(e, "relay_loop")
+        finally:
+            queue.close()
+            self._outgoing.pop(conn_id, None)
+            await self.backend.unsubscribe(f"conn:{conn_id}")
+            await self.backend.publish(inbox, {"op": "leave", "conn": conn_id, "code": code})
+
+    async def _on_relay_message(self, message: dict):
+        """Owner side: frames from sockets relayed by other workers."""
+        op, conn_id = message["op"], message["conn"]
+        if op == "join":
+            socket = RelayedSocket(self.backend, conn_id)
+            game, _ = await self.claim(message["room"])
+            if game is None: # Ownership moved while the join was in flight; make the client reconnect
+                await socket.close(code=1012)
+                return
+            self._relayed[conn_id] = (message["room"], socket, message["user_id"])
+            await game.connect(socket, message["user_id"], message.get("channel_id"), resume=message.get("resume"), since=message.get("since"),
+                               guild_id=message.get("guild_id"))
+            return
+
+        entry = self._relayed.get(conn_id)
+        game = self._games.get(entry[0]) if entry else None
+        if game is None: return
+        instance_id, socket, user_id = entry
+        if op == "msg":
+            await game.receive(socket, user_id, message["text"])
+        elif op == "leave":
+            del self._relayed[conn_id]
+            server_restart = message.get("code") == SERVER_RESTART
+            await game.disconnect(socket, server_restart)
+            await self.cleanup_game(instance_id, server_restart)
+
+registry = GameRegistry(create_backend(), default_worker_id())
+
+# --- METRICS ---
+MESSAGE_TYPES = tuple(inbound.MESSAGE_SCHEMA)
+HANDLE_SECONDS = metrics.histogram("kc_handle_message_seconds", "Time to handle one client message", ("type",))
+HANDLE_TIMERS = {t: HANDLE_SECONDS.labels(t) for t in MESSAGE_TYPES} # Prebuilt so the hot path only does a dict lookup
+# An observation costs ~0.2 µs, so only 1 in 8 broadcasts goes into the histograms; every one is still
+# timed against SLOW_CALLBACK_SECONDS (broadcasts from timers and departures aren't inside receive())
+BROADCAST_SAMPLE_EVERY = 8
+WATCH_SLOW_BROADCASTS = SLOW_CALLBACK_SECONDS != float("inf")
+BROADCAST_SECONDS = metrics.histogram("kc_broadcast_seconds", f"Time to encode and fan out one broadcast (1 in {BROADCAST_SAMPLE_EVERY} sampled)").labels()
+BROADCAST_BYTES = metrics.histogram("kc_broadcast_bytes", f"Encoded size of one broadcast (1 in {BROADCAST_SAMPLE_EVERY} sampled)", buckets=SIZE_BUCKETS).labels()
+BROADCAST_TICKS = itertools.count()
+OUTBOUND_FRAMES = metrics.counter("kc_outbound_frames_total", "Frames queued to clients by broadcasts").labels()
+RESUMED = metrics.counter("kc_resumed_sessions_total", "Reconnects served from the replay buffer instead of a snapshot").labels()
+metrics.gauge("kc_registry_entries", "Live entries per registry structure (-1: held by the broker)",
+              lambda: {(kind,): value for kind, value in registry.gauges().items()}, ("kind",))
+metrics.gauge("kc_scheduled_timers", "Trial deadlines waiting in the scheduler", lambda: {(): len(scheduler)})
+
+EVIDENCE_COOLDOWN = 3          # Seconds between evidence submissions per user
+RATE_LIMIT_MAX_USERS = 1000    # Per room; least recently active users are forgotten first
+
+SERVER_RESTART = 1012 # Close code uvicorn reports for sockets dropped by a shutdown/redeploy
 
 # --- GAME STATE MANAGER ---
 class GameManager:
-    def __init__(self):
+    __slots__ = ("instance_id", "active_connections", "user_map", "queues", "channel_id", "guild_id", "last_objection_time",
+                 "user_last_action", "last_active", "version", "_dirty", "_new_logs", "_cause", "_unsnapshotted", "state",
+                 "audience", "_membership", "_primary_key", "_primary", "inbound", "_sent", "sessions", "leaving", "replay", "decks")
+
+    # Containers left as None are created on first use: most rooms sit idle, and each empty one costs 70-250 B
+    def __init__(self, instance_id: str = "default"):
+        self.instance_id = instance_id
         self.active_connections: List[WebSocket] = []
         self.user_map: Dict[WebSocket, str] = {} # Map WS -> user_id
-        self._timer_task: Optional[asyncio.Task] = None
+        self.queues: Optional[Dict[WebSocket, OutboundQueue]] = None # Map WS -> its send queue
         self.channel_id: Optional[str] = None
+        self.guild_id: Optional[str] = None # For the karma ledger; from the first client that knows it
         
         # Security: Rate Limiting
         self.last_objection_time = 0
-        self.user_last_action: Dict[str, float] = {} # user_id -> timestamp
-        
-        self.state = {
-            "votes": {"guilty": 0, "innocent": 0},
-            "crime": "",
-            "verdict": None, # 'guilty' | 'innocent' | None
-            "judge_id": None,
-            "accused": {
-                "id": None,
-                "username": "Unknown",
-                "avatar": None
-            },
-            "witness": {
-                "username": None,
-                "avatar": None
-            },
-            "voters": [],   # Track who voted
-            "evidence": [], # List of {id, type, content, author}
-            "logs": [],      # List of {timestamp, message, type}
-            "timer": 60,     # Voting timer in seconds
-            "sentence": None # The punishment if guilty
-        }
-        
-        # --- DATA BANKS ---
-        self.crimes_db = [
-            "Posting cringe in #general", "Ghosting the squad for 3 weeks", "Eating chips with an open mic",
-            "Using light mode unironically", "Backseat gaming during a clutch", "Pronouncing 'GIF' wrong",
-            "Spamming @everyone for no reason", "Not boosting the server", "Playing music bot at 200% volume",
-            "Stealing the last kill", "Being AFK during the ready check", "Having a chaotic desktop",
-            "Not saying 'GG' after a loss", "Simping too hard", "Using comic sans", "Replying 'k' to a long paragraph",
-            "Leaving only 1 second on the microwave", "Spoiling the movie ending 'by accident'",
-            "Using 'Reply All' on a company-wide email", "Chewing loudly in voice chat",
-            "Not cropping the meme before posting", "Sending voice messages longer than 2 minutes",
-            "Asking a question that was just answered", "Linking a 30-minute YouTube video without a timestamp",
-            "Saying 'I'm down' then sleeping immediately"
-        ]
+        self.user_last_action: Optional[TTLCache] = None # user_id -> timestamp
+        self.last_active = time.monotonic() # For sweeping rooms that were left empty
+
+        # Delta Sync: keys changed since the last patch + log entries not yet sent
+        self.version = 0
+        self._dirty: Optional[set] = None
+        self._new_logs: List[dict] = []
+        self._sent: Optional[Dict[str, object]] = None # Key -> value last patched out, so touched-but-unchanged keys are skipped
+        self.inbound: Optional[Dict[WebSocket, object]] = None # Map WS -> its inbound token bucket
+
+        # Resume (see utils/resume.py): recent patches for reconnecting clients, their tokens, and dropped players still in grace
+        self.replay = ReplayBuffer()
+        self.sessions: Optional[Dict[str, str]] = None # user_id -> resume token (rotated on every connect)
+        self.leaving: Optional[set] = None
+
+        # Journal: what caused the pending changes, and events written since the last snapshot
+        self._cause: Tuple[str, Optional[str]] = ("init", None)
+        self._unsnapshotted = 0
         
-        self.sentences_db = [
-            "Must change nickname to 'Clown' for 24h", "Banned from using vowels in chat for 10m",
-            "Must sing an apology song in VC", "Forced to use Light Mode for 5 minutes",
-            "Must post a cringe selfie", "Cannot speak for 3 rounds", "Must compliment the Judge for 1 minute",
-            "Sentenced to play League of Legends", "Publicly shamed in #announcements",
-            "Must end every sentence with 'uwu' for 1 hour", "Forced to use a default Discord avatar for a week",
-            "Banned from using emojis for 24 hours", "Must change status to 'I love Nickelback'",
-            "Cannot mute mic for the next 30 minutes", "Must write a haiku about their crime",
-            "Sentenced to be the server's personal butler for a day", "Must react to every message with a clown emoji",
-            "Forced to stream their desktop while organizing it", "Must use 'Comic Sans' logic in all arguments",
-            "Cannot say the word 'the' for 10 minutes", "Must send a heartfelt apology to a bot",
-            "Required to narrate their own actions in 3rd person", "Banned from sharing memes for 48 hours",
-            "Must wear a virtual 'Cone of Shame' (Status)", "Sentenced to explain FNAF lore to the chat",
-            "Must reply with a GIF to every message for 10m", "Forced to listen to 1 hour of elevator music"
-        ]
-
-        self.severe_sentences = [
-            "BANNED: Must use only 'Meow' in chat for 24 hours.",
-            "EXILE: Forbidden from entering Voice Chat for 3 days.",
-            "SHAME: Must post a 500-word essay on why they are a coward.",
-            "TOTAL LOCKDOWN: Forced to use a 'Pig' avatar for 1 week.",
-            "COMMUNITY SERVICE: Must clean (moderate) the #general chat for 12 hours.",
-            "PUBLIC EXECUTION: Judge can ban them from one specific channel for 24h.",
-            "PERMANENT STIGMA: Must keep status as 'I LOST TO THE SYSTEM' for 48h.",
-            "DIGITAL DEBT: Must react with a 🤡 to every message the Judge sends for a week.",
-            "VOICE REVEAL: Must read the entire Discord Terms of Service out loud in VC.",
-            "IDENTITY THEFT: Judge picks a new embarrassing nickname for them for 7 days.",
-            "GHOSTED: Entire squad is forbidden from replying to them for 2 hours.",
-            "THE GAUNTLET: Must play a game of the Judge's choice until they win 3 times.",
-            "SOCIAL BANKRUPTCY: Must gift 1 server boost or post a cringe video dance.",
-            "LABOR CAMP: Must invite 5 new bots to their personal test server and configure them.",
-            "MEMORY WIPE: Must delete their most recent 100 messages in the server.",
-            "TRIAL BY FIRE: Must solo-stream a horror game for 1 hour while the squad watches."
-        ]
-
-    async def connect(self, websocket: WebSocket, user_id: str, channel_id: Optional[str] = None):
+        self.state = RoomState()
+        self.decks: Optional[ContentDecks] = None # Non-repeating draws from the shared content catalog
+
+        # Audience mode (big rooms, see utils/audience.py): None until the room is big enough
+        self.audience: Optional[AudienceFeed] = None
+        self._membership = 0 # Bumped on every join/leave; invalidates the cached primary sockets
+        self._primary_key: Optional[tuple] = None
+        self._primary: List[WebSocket] = []
+
+    async def restore(self):
+        """Resumes the room from the journal, if it was live when the server last stopped."""
+        if not journal.enabled: return # Off by default: don't pay a thread-pool hop per new room
+        saved = await asyncio.to_thread(journal.load, self.instance_id)
+        if not saved: return
+        self.version, state = saved
+        self.state = RoomState.from_wire(state)
+        self._sent = None
+        self.replay.clear()
+        self.state.judge_id = None # Re-assigned to the first player back
+        if self.state.deadline is not None and self.state.verdict is None:
+            scheduler.schedule(self, self.state.deadline, self._timer_expired) # Fires at once if it passed while down
+        log_info(f"Restored room at version {self.version}", "restore_room", room=self.instance_id)
+
+    async def connect(self, websocket: WebSocket, user_id: str, channel_id: Optional[str] = None, codec: Codec = JSON,
+                      resume: Optional[str] = None, since: Optional[int] = None, guild_id: Optional[str] = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
-        self.user_map[websocket] = user_id
-        
-        print(f"🔌 Connection: User={user_id} | Channel ID={channel_id}") # Debug Log
+        self.last_active = time.monotonic()
+        self._cause = ("connect", user_id)
+        token = self.sessions.get(user_id) if self.sessions else None
+        resumed = resume is not None and token is not None and hmac.compare_digest(resume.encode(), token.encode())
+        if self.leaving and user_id in self.leaving:
+            # Back within the grace window: the seat (judge, accused) was kept for them
+            self.leaving.discard(user_id)
+            scheduler.cancel((self, "leave", user_id))
+
+        log_event(logger, "connect", "🔌 Connection", room=self.instance_id, user=user_id, channel=channel_id, resumed=resumed or None)
+
+        if guild_id and not self.guild_id: self.guild_id = guild_id
 
         # Load Pending Case from Slash Command
         if channel_id:
             self.channel_id = channel_id
-            if channel_id in registry.pending_cases:
-                case = registry.pending_cases.pop(channel_id)
-                self.state["accused"] = case["accused"]
-                self.state["crime"] = case["crime"]
-                self.state["votes"] = {"guilty": 0, "innocent": 0}
-                self.state["voters"] = []
-                self.state["verdict"] = None
+            case = await registry.pop_pending_case(channel_id)
+            if case:
+                self.state.accused = Party.from_wire(case["accused"])
+                self.state.crime = case["crime"]
+                self.state.reset_votes()
+                self.state.verdict = None
+                self._touch("accused", "crime", "votes", "voters", "verdict")
                 self._log("OPENING PENDING CASE FILE...", "system")
-                self._log(f"ACCUSED: {self.state['accused']['username']}", "alert")
+                self._log(f"ACCUSED: {self.state.accused.username}", "alert")
                 self._start_timer()
 
-        if self.state["judge_id"] is None:
-            self.state["judge_id"] = user_id
+        if self.state.judge_id is None:
+            self.state.judge_id = user_id
+            self._touch("judge_id")
             self._log("The court is now in session. Judge assigned.", "system")
-        await websocket.send_text(json.dumps({"type": "update", "data": self.state}))
 
-    async def disconnect(self, websocket: WebSocket):
+        # Existing clients get the delta, the newcomer a full snapshot (or, resuming, just the patches it missed)
+        await self._flush()
+        self.active_connections.append(websocket)
+        self.user_map[websocket] = user_id
+        if self.queues is None: self.queues, self.inbound = {}, {}
+        self.queues[websocket] = OutboundQueue(websocket, codec)
+        self.inbound[websocket] = inbound.new_bucket()
+        self._membership += 1
+        if self.audience is None and AUDIENCE_THRESHOLD and len(self.active_connections) >= AUDIENCE_THRESHOLD:
+            await self._enter_audience_mode()
+        if self.sessions is None: self.sessions = {}
+        token = self.sessions[user_id] = new_token()
+        self._send_personal(websocket, {"type": "session", "token": token, "grace": RESUME_GRACE})
+        if not (resumed and since is not None and self._replay(websocket, since)): await self.send_snapshot(websocket)
+
+    async def disconnect(self, websocket: WebSocket, server_restart: bool = False):
         if websocket in self.active_connections:
             user_id = self.user_map.get(websocket)
             self.active_connections.remove(websocket)
+            self.last_active = time.monotonic()
             if websocket in self.user_map: del self.user_map[websocket]
-            if user_id == self.state["judge_id"]:
-                if self.active_connections:
-                    new_judge_ws = self.active_connections[0]
-                    new_judge_id = self.user_map[new_judge_ws]
-                    self.state["judge_id"] = new_judge_id
-                    self._log(f"Judge disconnected. New Judge is {new_judge_id}.", "system")
-                else:
-                    self.state["judge_id"] = None
-                    self._cancel_timer()
-                    self._log("Judge disconnected. Court adjourned.", "system")
-            if user_id == self.state["accused"].get("id") and self.state["verdict"] is None:
-                import random
-                self.state["verdict"] = "guilty"
-                punishment = random.choice(self.severe_sentences)
-                self.state["sentence"] = punishment
+            queue = self.queues.pop(websocket, None)
+            if queue: queue.close()
+            self.inbound.pop(websocket, None)
+            self._membership += 1
+            if self.audience and not self.active_connections: self.audience.close()
+            # Dropped by a redeploy, not by the player: leave the trial as it is for the restore
+            if server_restart: return
+            if user_id in self.user_map.values(): return # Still connected from another socket
+            if RESUME_GRACE > 0:
+                # Maybe just a network blip: keep their role until the grace runs out
+                if self.leaving is None: self.leaving = set()
+                self.leaving.add(user_id)
+                scheduler.schedule((self, "leave", user_id), time.time() + RESUME_GRACE, lambda: self._depart(user_id))
+            else: await self._depart(user_id)
+
+    async def _depart(self, user_id: str):
+        """The player is gone for good (the grace ran out): hand over their roles."""
+        if self.leaving: self.leaving.discard(user_id)
+        if self.sessions: self.sessions.pop(user_id, None)
+        self._cause = ("disconnect", user_id)
+        if user_id == self.state.judge_id:
+            if self.active_connections:
+                new_judge_ws = self.active_connections[0]
+                new_judge_id = self.user_map[new_judge_ws]
+                self.state.judge_id = new_judge_id
+                self._touch("judge_id")
+                self._log(f"Judge disconnected. New Judge is {new_judge_id}.", "system")
+            else:
+                self.state.judge_id = None
+                self._touch("judge_id")
                 self._cancel_timer()
-                self._log(f"CONTEMPT OF COURT! {self.state['accused']['username']} fled. AUTOMATIC GUILTY.", "alert")
-                self._log(f"SEVERE SENTENCE: {punishment}", "alert")
-                await self.broadcast({"type": "sound", "sound": "gavel"})
-                if self.channel_id:
-                    bot_client.send_verdict_embed(self.channel_id, self.state)
-            await self.broadcast({"type": "update", "data": self.state})
+                self._log("Judge disconnected. Court adjourned.", "system")
+        if user_id == self.state.accused.id and self.state.verdict is None:
+            self.state.verdict = "guilty"
+            punishment = self._draw("sentences", severities=(SEVERE,))
+            self.state.sentence = punishment
+            self._touch("verdict", "sentence")
+            self._cancel_timer()
+            self._log(f"CONTEMPT OF COURT! {self.state.accused.username} fled. AUTOMATIC GUILTY.", "alert")
+            self._log(f"SEVERE SENTENCE: {punishment}", "alert")
+            self._record("convicted", self.state.crime)
+            self._record("sentenced", punishment)
+            analytics.track("verdict_delivered", self.instance_id, user_id, verdict="guilty", contempt=True)
+            await self.broadcast({"type": "sound", "sound": "gavel"})
+            if self.channel_id:
+                bot_client.send_verdict_embed(self.channel_id, self.state.to_wire())
+        await self._flush()
+        # The room was kept open for this player; nobody came back, so close it now
+        if not self.active_connections and not self.leaving: await registry.cleanup_game(self.instance_id)
 
     async def broadcast(self, message: dict):
         if not self.active_connections: return
-        
-        json_msg = json.dumps(message)
-        async def send(ws):
-            try: await ws.send_text(json_msg)
-            except Exception as e: handle_error(e, "broadcast_one")
-
-        await asyncio.gather(*(send(ws) for ws in self.active_connections))
+        sampled = not next(BROADCAST_TICKS) % BROADCAST_SAMPLE_EVERY
+        timed = sampled or WATCH_SLOW_BROADCASTS
+        if timed: started = time.perf_counter()
+        if self.audience is None: payload = self._fan_out(message, self.active_connections)
+        else:
+            # Big room: primary participants now, the audience in the next coalesced update
+            payload = self._fan_out(message, self._primary_sockets())
+            self.audience.add(message)
+        if not timed: return
+        elapsed = time.perf_counter() - started
+        if elapsed > SLOW_CALLBACK_SECONDS: report_slow("broadcast", elapsed, room=self.instance_id, type=message.get("type"), recipients=len(self.active_connections))
+        if sampled and payload is not None: # Not sampled, or nothing was fanned out (audience only)
+            BROADCAST_SECONDS.observe(elapsed)
+            BROADCAST_BYTES.observe(len(payload))
+
+    def _fan_out(self, message: dict, sockets: List[WebSocket]) -> Optional[Payload]:
+        # Encode once per encoding in use, then hand off to each client's queue (never waits on slow sockets)
+        encoded: Dict[str, Payload] = {}
+        payload = None
+        for ws in sockets:
+            queue = self.queues[ws]
+            payload = encoded.get(queue.codec.name)
+            if payload is None: payload = encoded[queue.codec.name] = queue.codec.encode(message)
+            queue.put(payload, message)
+        if sockets: OUTBOUND_FRAMES.inc(len(sockets))
+        return payload
+
+    # --- AUDIENCE MODE ---
+    async def _enter_audience_mode(self):
+        self.audience = AudienceFeed(self._deliver_to_audience)
+        log_event(logger, "audience_mode", "🏟️ Room switched to audience mode", room=self.instance_id, connections=len(self.active_connections))
+        # Everyone moves to the audience format (vote count + own flag) from a fresh snapshot
+        for ws in self.active_connections: await self.send_snapshot(ws)
+
+    def _primary_sockets(self) -> List[WebSocket]:
+        """Sockets of the judge, accused and witness (cached until someone joins/leaves or the roles change)."""
+        key = (self._membership, self.state.judge_id, self.state.accused.id, self.state.witness.id)
+        if key != self._primary_key:
+            # Roles changed: the buffered window still goes to the old audience, so nobody misses a version
+            if self._primary_key is not None and key[1:] != self._primary_key[1:]: self.audience.flush()
+            self._primary_key = key
+            self._primary = [ws for ws in self.active_connections if self.user_map.get(ws) in key[1:]]
+        return self._primary
+
+    def _deliver_to_audience(self, messages: List[dict], personal: List[Tuple[WebSocket, dict]]):
+        primary_ids = self._primary_key[1:] if self._primary_key else ()
+        audience = [ws for ws in self.active_connections if self.user_map.get(ws) not in primary_ids]
+        for message in messages: self._fan_out(message, audience)
+        for ws, message in personal: self._send_personal(ws, message)
+
+    def _replay(self, websocket: WebSocket, since: int) -> bool:
+        """Sends a resuming client the patches after `since`. False when they're no longer buffered (send a snapshot)."""
+        missed = self.replay.since(since, self.version)
+        if missed is None: return False
+        if self.audience is not None: self.audience.flush() # Same as a snapshot: the feed mustn't resend these versions
+        if missed: self._send_personal(websocket, missed[0] if len(missed) == 1 else merge_patches(missed))
+        if self.audience is not None:
+            # Audience patches don't carry votes: tell the client its own
+            self._send_personal(websocket, {"type": "personal", "data": {"you_voted": self.user_map.get(websocket) in self.state.voters}})
+        RESUMED.inc()
+        return True
+
+    def _send_personal(self, websocket: WebSocket, message: dict):
+        queue = self.queues.get(websocket) if self.queues else None
+        if queue: queue.put(queue.codec.encode(message), message)
+
+    async def receive(self, websocket: WebSocket, user_id: str, data: str):
+        """Handles one raw frame from a client. Floods and malformed frames are dropped (and counted) first."""
+        bucket = self.inbound.get(websocket) if self.inbound else None
+        if bucket is not None and not bucket.take():
+            inbound.DROPS["rate_limited"].inc()
+            return
+        message, reason = inbound.parse(data)
+        if message is not None and message["type"] in inbound.JUDGE_ONLY and user_id != self.state.judge_id: reason = "not_judge"
+        if reason is not None:
+            inbound.DROPS[reason].inc()
+            return
+
+        msg_type = message["type"]
+        started, timer = time.perf_counter(), HANDLE_TIMERS[msg_type]
+        try:
+            # Client missed a patch (version gap) and asks for a fresh snapshot
+            if msg_type == "sync": await self.send_snapshot(websocket)
+            else: await self.handle_message(message, user_id, websocket)
+        except Exception as e: handle_error(e, "handle_message", room=self.instance_id, user=user_id, type=msg_type)
+        elapsed = time.perf_counter() - started
+        timer.observe(elapsed)
+        if elapsed > SLOW_CALLBACK_SECONDS: report_slow("handle_message", elapsed, room=self.instance_id, type=msg_type, user=user_id)
+
+    async def send_snapshot(self, websocket: WebSocket):
+        """Sends the full state to one client (on connect or when it asks to resync)."""
+        queue = self.queues.get(websocket) if self.queues else None
+        if not queue: return
+        if self.audience is None: data = self.state.to_wire()
+        else:
+            self.audience.flush() # Buffered patches go out first, so this snapshot supersedes them in the queue
+            data = self.state.to_audience_wire(self.user_map.get(websocket))
+        message = {"type": "update", "version": self.version, "server_time": time.time(), "data": data}
+        queue.put(queue.codec.encode(message), message)
+
+    async def _flush(self):
+        """Broadcasts only the keys whose value changed since the last flush, tagged with a new version."""
+        if not self._dirty and not self._new_logs: return
+        dirty = self._dirty or () # None when only log entries are pending
+        audience_votes = self.audience is not None and "voters" in dirty
+        if self._sent is None: self._sent = {}
+        data = {}
+        for key in dirty:
+            if audience_votes and key == "voters": continue
+            value = self.state.wire(key)
+            if key not in self._sent or self._sent[key] != value: data[key] = self._sent[key] = value
+        voter_count = len(self.state.voters) if audience_votes else None
+        if audience_votes and self._sent.get("voter_count") == voter_count: audience_votes = False
+        self._dirty = None
+        if not data and not audience_votes and not self._new_logs: return # Touched, but nothing clients don't already have
+
+        self.version += 1
+        patch = {"type": "patch", "version": self.version, "data": data}
+        if self._new_logs: patch["logs"] = self._new_logs
+        if "deadline" in data: patch["server_time"] = time.time() # Lets clients correct for clock skew
+        self._new_logs = []
+        if audience_votes:
+            # The journal keeps the full voters list; clients only get the count (O(1) per vote, not O(n))
+            self._journal({**data, "voters": self.state.wire("voters")} if journal.enabled else data, patch.get("logs"))
+            data["voter_count"] = self._sent["voter_count"] = voter_count
+            if not voter_count: data["you_voted"] = False # Votes were reset: the same for everyone
+        else: self._journal(data, patch.get("logs"))
+        self.replay.append(patch)
+        await self.broadcast(patch)
+
+    def _journal(self, data: dict, logs: Optional[List[dict]]):
+        if not journal.enabled or registry._games.get(self.instance_id) is not self: return # Cleaned up: nothing to resume
+        action, user_id = self._cause
+        journal.append(self.instance_id, {"v": self.version, "t": time.time(), "cause": action, "user": user_id,
+                                          "data": data, "logs": logs})
+        self._unsnapshotted += 1
+        if self._unsnapshotted >= SNAPSHOT_EVERY:
+            journal.snapshot(self.instance_id, self.version, self.state.to_wire())
+            self._unsnapshotted = 0
+
+    def _record(self, kind: str, detail: Optional[str]):
+        """Adds an outcome for the accused to the karma ledger (written in the background)."""
+        accused = self.state.accused
+        ledger.record(kind, accused.id, self.guild_id, accused.username, detail or None, self.instance_id)
+
+    def _touch(self, *keys: str):
+        if self._dirty is None: self._dirty = set(keys)
+        else: self._dirty.update(keys)
+
+    def _draw(self, bank: str, tag: Optional[str] = None, severities: Optional[Tuple[int, ...]] = None) -> str:
+        if self.decks is None: self.decks = ContentDecks()
+        return self.decks.draw(bank, tag, severities)
 
     def _log(self, message: str, type: str = "info"):
         entry = {"message": message, "type": type}
-        self.state["logs"].append(entry)
-        if len(self.state["logs"]) > 50: self.state["logs"].pop(0)
+        self.state.logs.append(entry) # Bounded deque: the oldest entry drops off
+        self._new_logs.append(entry)
 
     def _start_timer(self):
-        self._cancel_timer()
-        self.state["timer"] = 60
-        self._timer_task = asyncio.create_task(self._timer_countdown())
+        self.state.timer = TRIAL_SECONDS
+        self.state.deadline = time.time() + self.state.timer
+        self._touch("timer", "deadline")
+        scheduler.schedule(self, self.state.deadline, self._timer_expired)
 
     def _cancel_timer(self):
-        if self._timer_task:
-            self._timer_task.cancel()
-            self._timer_task = None
+        scheduler.cancel(self)
+        if self.state.deadline is not None:
+            self.state.deadline = None
+            self._touch("deadline")
 
-    async def _timer_countdown(self):
-        try:
-            while self.state["timer"] > 0:
-                await asyncio.sleep(1)
-                self.state["timer"] -= 1
-                await self.broadcast({"type": "update", "data": self.state})
-            await self._execute_verdict(auto=True)
-        except asyncio.CancelledError: pass
+    async def _timer_expired(self):
+        self._cause = ("timer_expired", None)
+        if self.state.verdict is None: await self._execute_verdict(auto=True)
 
     async def _execute_verdict(self, auto=False):
         self._cancel_timer()
-        g, i = self.state["votes"]["guilty"], self.state["votes"]["innocent"]
-        self.state["verdict"] = "guilty" if g > i else "innocent"
+        g, i = self.state.guilty, self.state.innocent
+        self.state.verdict = "guilty" if g > i else "innocent"
+        self._touch("verdict")
         await self.broadcast({"type": "sound", "sound": "gavel"})
-        log_msg = f"Verdict delivered: {self.state['verdict'].upper()}"
+        log_msg = f"Verdict delivered: {self.state.verdict.upper()}"
         if auto: log_msg += " (Time Expired)"
         self._log(log_msg, "verdict")
-        await self.broadcast({"type": "update", "data": self.state})
+        self._record("convicted" if self.state.verdict == "guilty" else "acquitted", self.state.crime)
+        if self.state.accused.id: ledger.record("judged", self.state.judge_id, self.guild_id, detail=self.state.verdict, room=self.instance_id)
+        analytics.track("verdict_delivered", self.instance_id, self.state.judge_id, verdict=self.state.verdict, auto=auto, guilty=g, innocent=i)
+        await self._flush()
         
         # Trigger Discord Embed
         # Only send immediately if Innocent (no sentence phase)
-        if self.channel_id and self.state['verdict'] == 'innocent':
-            bot_client.send_verdict_embed(self.channel_id, self.state)
+        if self.channel_id and self.state.verdict == 'innocent':
+            bot_client.send_verdict_embed(self.channel_id, self.state.to_wire())
 
-    async def handle_message(self, message: dict, user_id: str):
+    async def handle_message(self, message: dict, user_id: str, websocket: Optional[WebSocket] = None):
         msg_type = message.get("type")
         username = message.get("username", "Unknown")
+        self._cause = (msg_type, user_id)
         
         # 1. Voting
         if msg_type == "vote":
-            if self.state["accused"]["username"] != "Unknown" and user_id not in self.state["voters"]:
+            if self.state.accused.username != "Unknown" and user_id not in self.state.voters:
                 vote = message.get("vote")
-                if self.state["verdict"] is None and vote in self.state["votes"]:
-                    self.state["votes"][vote] += 1
-                    self.state["voters"].append(user_id)
+                if self.state.verdict is None and vote in ("guilty", "innocent"):
+                    if vote == "guilty": self.state.guilty += 1
+                    else: self.state.innocent += 1
+                    self.state.voters.add(user_id)
+                    self._touch("votes", "voters")
+                    analytics.track("vote_cast", self.instance_id, user_id, vote=vote)
                     await self.broadcast({"type": "sound", "sound": "vote"})
+                    if self.audience is not None and websocket is not None:
+                        # Audience mode sends no voters list, so the voter hears about its own vote directly
+                        # (audience voters with their next update, after any reset buffered in it)
+                        personal = {"type": "personal", "data": {"you_voted": True}}
+                        if websocket in self._primary_sockets(): self._send_personal(websocket, personal)
+                        else: self.audience.add_personal(websocket, personal)
         
         # 2. Updating the Crime Text
         elif msg_type == "update_crime":
-            if user_id == self.state["judge_id"]:
+            if user_id == self.state.judge_id:
                 crime_text = message.get("crime", "")[:100]
                 if SecurityService.is_clean(crime_text):
-                    self.state["crime"] = SecurityService.sanitize(crime_text)
+                    self.state.crime = SecurityService.sanitize(crime_text)
+                    self._touch("crime")
             
         # 2.5 Generate AI Crime
         elif msg_type == "generate_crime":
-            if user_id == self.state["judge_id"]:
-                import random
-                self.state["crime"] = random.choice(self.crimes_db)
+            if user_id == self.state.judge_id:
+                tag = message.get("tag") # Optional theme, e.g. "voice" or "gaming"
+                self.state.crime = self._draw("crimes", tag if isinstance(tag, str) else None)
+                self._touch("crime")
                 self._log("AI Protocol generated a new accusation.", "system")
                 await self.broadcast({"type": "sound", "sound": "vote"}) # Use vote sound as feedback
 
         # 3. Accusing a User
         elif msg_type == "accuse_user":
-            if user_id == self.state["judge_id"]:
-                print(f"⚖️ ACTION: Accuse User | Judge: {user_id} | Channel: {self.channel_id}")
+            if user_id == self.state.judge_id:
                 user_data = message.get("user")
-                self.state["accused"] = user_data
-                self.state["accused"]["id"] = user_data.get("id") 
-                self.state["votes"] = {"guilty": 0, "innocent": 0}
-                self.state["voters"] = []
-                self.state["verdict"] = None
-                self.state["sentence"] = None
-                self.state["evidence"] = []
-                self.state["crime"] = self.state["crime"][:100]
-                self.state["witness"] = {"username": None, "avatar": None}
-                self._log(f"Judge accused {self.state['accused']['username']}!", "alert")
+                self.state.accused = Party.from_wire(user_data)
+                log_event(logger, "accuse", "⚖️ Judge accused a user", room=self.instance_id, user=user_id, channel=self.channel_id, accused=self.state.accused.id)
+                self.state.reset_votes()
+                self.state.verdict = None
+                self.state.sentence = None
+                self.state.evidence = []
+                self.state.crime = self.state.crime[:100]
+                self.state.witness = Party()
+                self._touch("accused", "votes", "voters", "verdict", "sentence", "evidence", "crime", "witness")
+                self._log(f"Judge accused {self.state.accused.username}!", "alert")
                 self._start_timer()
-                if self.channel_id:
-                    print("📤 Triggering Accusation Embed...")
-                    bot_client.send_case_start_embed(self.channel_id, self.state)
-                else:
-                    print("❌ No Channel ID for Accusation Embed")
+                analytics.track("case_opened", self.instance_id, user_id, accused=self.state.accused.id)
+                if self.channel_id: bot_client.send_case_start_embed(self.channel_id, self.state.to_wire())
+                else: log_event(logger, "embed_skipped", "❌ No Channel ID for Accusation Embed", logging.WARNING, room=self.instance_id, user=user_id)
 
         # 3.5 Call a Witness
         elif msg_type == "call_witness":
-            if user_id == self.state["judge_id"]:
-                print(f"⚖️ ACTION: Call Witness | Judge: {user_id}")
-                self.state["witness"] = message.get("user")
-                self._log(f"Judge called witness {self.state['witness']['username']} to the stand.", "info")
+            witness = Party.from_wire(message.get("user"))
+            if user_id == self.state.judge_id and witness.to_wire() != self.state.witness.to_wire():
+                self.state.witness = witness
+                log_event(logger, "call_witness", "⚖️ Judge called a witness", room=self.instance_id, user=user_id, witness=self.state.witness.id)
+                self._touch("witness")
+                self._log(f"Judge called witness {self.state.witness.username} to the stand.", "info")
                 if self.channel_id:
-                    bot_client.send_witness_embed(self.channel_id, self.state)
+                    bot_client.send_witness_embed(self.channel_id, self.state.to_wire())
 
         # 4. Calling the Verdict
         elif msg_type == "call_verdict":
-            if user_id == self.state["judge_id"]:
+            if user_id == self.state.judge_id and self.state.verdict is None:
                 await self._execute_verdict(auto=False)
                 
         # 4.5 Pass Sentence
         elif msg_type == "pass_sentence":
-             print(f"⚖️ ACTION: Pass Sentence | User: {user_id} | Judge: {self.state['judge_id']} | Verdict: {self.state['verdict']}")
-             if user_id == self.state["judge_id"] and self.state["verdict"] == "guilty":
-                 import random
-                 self.state["sentence"] = random.choice(self.sentences_db)
-                 self._log(f"SENTENCE PASSED: {self.state['sentence']}", "alert")
+             log_event(logger, "pass_sentence", "⚖️ Pass Sentence", room=self.instance_id, user=user_id, judge=self.state.judge_id, verdict=self.state.verdict)
+             if user_id == self.state.judge_id and self.state.verdict == "guilty":
+                 first = self.state.sentence is None # Re-rolls don't count as another sentence served
+                 self.state.sentence = self._draw("sentences", severities=ORDINARY)
+                 if first: self._record("sentenced", self.state.sentence)
+                 analytics.track("sentence_passed", self.instance_id, user_id, reroll=not first)
+                 self._touch("sentence")
+                 self._log(f"SENTENCE PASSED: {self.state.sentence}", "alert")
                  await self.broadcast({"type": "sound", "sound": "gavel"})
-                 if self.channel_id:
-                     print(f"📤 Triggering Punishment Embed for Channel {self.channel_id}")
-                     bot_client.send_verdict_embed(self.channel_id, self.state)
-                 else:
-                     print("❌ Cannot send Punishment Embed: No Channel ID linked.")
+                 if self.channel_id: bot_client.send_verdict_embed(self.channel_id, self.state.to_wire())
+                 else: log_event(logger, "embed_skipped", "❌ Cannot send Punishment Embed: No Channel ID linked.", logging.WARNING, room=self.instance_id, user=user_id)
 
         # 5. Next Case
         elif msg_type == "next_case":
-            if user_id == self.state["judge_id"]:
+            blank = self.state.accused.username == "Unknown" and self.state.verdict is None and not self.state.voters and not self.state.evidence
+            if user_id == self.state.judge_id and not (blank and not self.state.crime):
                 self._cancel_timer()
-                self.state["votes"] = {"guilty": 0, "innocent": 0}
-                self.state["voters"], self.state["verdict"], self.state["sentence"], self.state["evidence"] = [], None, None, []
-                self.state["crime"] = ""
-                self.state["witness"], self.state["accused"] = {"username": None, "avatar": None}, {"username": "Unknown", "avatar": None}
-                self.state["timer"] = 60
+                self.state.reset_votes()
+                self.state.verdict, self.state.sentence, self.state.evidence = None, None, []
+                self.state.crime = ""
+                self.state.witness, self.state.accused = Party(), Party(username="Unknown")
+                self.state.timer = TRIAL_SECONDS
+                self._touch("votes", "voters", "verdict", "sentence", "evidence", "crime", "witness", "accused", "timer")
                 self._log("Case closed. Preparing next case...", "info")
 
         # 6. OBJECTION!
@@ -330,34 +781,43 @@ class GameManager:
                 await self.broadcast({"type": "objection_event", "user_id": user_id, "username": username})
                 await self.broadcast({"type": "sound", "sound": "objection"})
                 self._log(f"OBJECTION! by {username}", "objection")
+                analytics.track("objection_called", self.instance_id, user_id)
                 if self.channel_id:
                     bot_client.send_objection_embed(self.channel_id, username)
 
         # 7. Add Evidence
         elif msg_type == "add_evidence":
             now = time.time()
-            if now - self.user_last_action.get(user_id, 0) >= 3:
+            last = self.user_last_action.get(user_id, 0) if self.user_last_action is not None else 0
+            if now - last >= EVIDENCE_COOLDOWN:
                 evidence_text = message.get("text", "")[:100]
                 if SecurityService.is_clean(evidence_text):
+                    if self.user_last_action is None: self.user_last_action = TTLCache(EVIDENCE_COOLDOWN, RATE_LIMIT_MAX_USERS)
                     self.user_last_action[user_id] = now
-                    new_ev = {"id": len(self.state["evidence"]) + 1, "text": SecurityService.sanitize(evidence_text), "author": username}
-                    self.state["evidence"].append(new_ev)
+                    new_ev = {"id": len(self.state.evidence) + 1, "text": SecurityService.sanitize(evidence_text), "author": username}
+                    self.state.evidence.append(new_ev)
+                    self._touch("evidence")
                     await self.broadcast({"type": "sound", "sound": "evidence"})
                     self._log(f"Evidence submitted by {username}", "evidence")
+                    analytics.track("evidence_added", self.instance_id, user_id, length=len(new_ev["text"]))
                     
                     if self.channel_id:
                         bot_client.send_evidence_embed(self.channel_id, new_ev)
-                else:
-                    await self.broadcast({"type": "error", "message": "Evidence rejected: Inappropriate content."})
+                elif websocket is not None:
+                    # Only the sender needs to know; broadcasting it let one client spam the whole room
+                    self._send_personal(websocket, {"type": "error", "message": "Evidence rejected: Inappropriate content."})
 
         # 8. Delete Evidence
         elif msg_type == "delete_evidence":
-            if user_id == self.state["judge_id"]:
+            if user_id == self.state.judge_id:
                 ev_id = message.get("id")
-                self.state["evidence"] = [e for e in self.state["evidence"] if e["id"] != ev_id]
-                self._log("Evidence removed by Judge moderation.", "system")
+                remaining = [e for e in self.state.evidence if e["id"] != ev_id]
+                if len(remaining) != len(self.state.evidence):
+                    self.state.evidence = remaining
+                    self._touch("evidence")
+                    self._log("Evidence removed by Judge moderation.", "system")
 
-        await self.broadcast({"type": "update", "data": self.state})
+        await self._flush()
 
 
 class TokenRequest(BaseModel):
@@ -367,53 +827,128 @@ class TokenRequest(BaseModel):
 @app.post("/api/token")
 async def exchange_token(request: TokenRequest):
     try:
-        data = {'client_id': CLIENT_ID, 'client_secret': CLIENT_SECRET, 'grant_type': 'authorization_code', 'code': request.code, 'redirect_uri': request.redirect_uri}
-        r = requests.post('https://discord.com/api/oauth2/token', data=data, headers={'Content-Type': 'application/x-www-form-urlencoded'})
-        if r.status_code != 200: raise HTTPException(status_code=400, detail=r.json())
-        return r.json()
+        return await oauth_client.exchange(request.code, request.redirect_uri)
     except Exception as e:
         handle_error(e, "token_exchange")
         raise e
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, user_id: str = "anon", instance_id: str = "default", channel_id: Optional[str] = None):
-    game = registry.get_game(instance_id)
-    await game.connect(websocket, user_id, channel_id)
+async def websocket_endpoint(websocket: WebSocket, user_id: str = "anon", instance_id: str = "default", channel_id: Optional[str] = None, encoding: str = "json",
+                             resume: Optional[str] = None, since: Optional[int] = None, guild_id: Optional[str] = None):
+    codec = get_codec(encoding)
+    game, owner = await registry.claim(instance_id)
+    if game is None:
+        # Another worker hosts this room: relay the socket to it
+        await registry.relay(websocket, owner, instance_id, user_id, channel_id, codec, resume, since, guild_id)
+        return
+
+    server_restart = False
     try:
+        await game.connect(websocket, user_id, channel_id, codec, resume, since, guild_id)
         while True:
             data = await websocket.receive_text()
-            try: await game.handle_message(json.loads(data), user_id)
-            except Exception as e: handle_error(e, "handle_message")
-    except WebSocketDisconnect: await game.disconnect(websocket)
+            await game.receive(websocket, user_id, data)
+    except WebSocketDisconnect as e:
+        server_restart = e.code == SERVER_RESTART
+        await game.disconnect(websocket, server_restart)
     except Exception as e:
-        handle_error(e, "websocket_loop")
+        handle_error(e, "websocket_loop", room=instance_id, user=user_id)
         await game.disconnect(websocket)
-    finally: registry.cleanup_game(instance_id)
+    finally: await registry.cleanup_game(instance_id, server_restart)
+
+# --- ANALYTICS ---
+@app.post("/api/analytics")
+async def analytics_endpoint(request: Request, content_encoding: Optional[str] = Header(None)):
+    """Batched client events: {"user_id", "instance_id", "events": [{"event", "ts", "props"}]}, optionally gzipped."""
+    if not analytics.enabled: return Response(status_code=204) # Accepted and discarded
+    body = b""
+    async for chunk in request.stream(): # Stop reading as soon as it's over the limit
+        body += chunk
+        if len(body) > MAX_BODY_BYTES: raise HTTPException(status_code=413, detail="Payload too large")
+    try: user_id, instance_id, events = decode_batch(body, content_encoding)
+    except PayloadError as e: raise HTTPException(status_code=e.status, detail=str(e))
+    analytics.ingest(user_id, instance_id, events)
+    return Response(status_code=204)
+
+# --- KARMA ---
+@app.get("/api/leaderboard")
+async def leaderboard_endpoint(stat: str = "convictions", guild_id: Optional[str] = None, limit: int = 10):
+    """Top users by one stat, in a guild or across all of them."""
+    if not ledger.enabled: raise HTTPException(status_code=503, detail="Karma ledger disabled")
+    if stat not in STATS: raise HTTPException(status_code=400, detail=f"stat must be one of {', '.join(STATS)}")
+    entries = await ledger.leaderboard(stat, guild_id, max(1, min(limit, 100)))
+    return {"stat": stat, "guild_id": guild_id, "entries": entries}
+
+@app.get("/api/users/{user_id}/rap-sheet")
+async def rap_sheet_endpoint(user_id: str, guild_id: Optional[str] = None, limit: int = 20):
+    """A user's totals and most recent court outcomes."""
+    if not ledger.enabled: raise HTTPException(status_code=503, detail="Karma ledger disabled")
+    return await ledger.rap_sheet(user_id, guild_id, max(1, min(limit, 100)))
+
+# --- HEALTH ---
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and the event loop answers. Does no work."""
+    return Response(content=b"ok", media_type="text/plain")
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once caches and HTTP pools are warm, 503 with the checks still pending until then."""
+    ready, checks = readiness.report()
+    return json_response(fastjson.dumps({"ready": ready, "checks": checks}), 200 if ready else 503)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+# --- ADMIN ---
+def require_admin(authorization: Optional[str]):
+    if not ADMIN_TOKEN: raise HTTPException(status_code=404)
+    if not authorization or not hmac.compare_digest(authorization.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/admin/profile")
+async def profile_endpoint(seconds: float = 10, interval_ms: float = DEFAULT_INTERVAL * 1000, threads: str = "loop", authorization: Optional[str] = Header(None)):
+    """Samples this worker for `seconds` and returns collapsed stacks (flamegraph.pl / speedscope input)."""
+    require_admin(authorization)
+    if not 0 < seconds <= MAX_SECONDS: raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_SECONDS}]")
+    try: stacks = await profiler.profile(seconds, max(1.0, interval_ms) / 1000, all_threads=threads == "all")
+    except ProfilerBusy as e: raise HTTPException(status_code=409, detail=str(e))
+    return Response(content=stacks, media_type="text/plain")
 
 # --- DISCORD INTERACTIONS (SLASH COMMANDS) ---
+# Prebuilt bodies for the fixed responses
+PONG_BODY = fastjson.dumps({"type": 1})
+INVALID_SIGNATURE_BODY = fastjson.dumps("Invalid Request Signature")
+UNKNOWN_COMMAND_BODY = fastjson.dumps({"error": "Unknown Command"})
+
+def json_response(body: bytes, status_code: int = 200) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
 @app.post("/api/interactions")
 async def discord_interaction(request: Request):
-    # 1. Verification
+    # 1. Verification (over the raw body bytes, no decode/re-encode)
     signature = request.headers.get("X-Signature-Ed25519")
     timestamp = request.headers.get("X-Signature-Timestamp")
     body = await request.body()
     
-    if not signature or not timestamp or not DISCORD_PUBLIC_KEY:
-        return JSONResponse(status_code=401, content="Invalid Request Signature")
+    verify_key = interactions_verify_key()
+    if not signature or not timestamp or not verify_key:
+        return json_response(INVALID_SIGNATURE_BODY, 401)
 
+    from nacl.exceptions import BadSignatureError
     try:
-        verify_key = VerifyKey(bytes.fromhex(DISCORD_PUBLIC_KEY))
-        verify_key.verify(f'{timestamp}{body.decode("utf-8")}'.encode(), bytes.fromhex(signature))
-    except BadSignatureError:
-        return JSONResponse(status_code=401, content="Invalid Request Signature")
+        verify_key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+    except (BadSignatureError, ValueError):
+        return json_response(INVALID_SIGNATURE_BODY, 401)
 
     # 2. Handle Payload
-    data = json.loads(body)
+    data = fastjson.loads(body)
     type_ = data.get("type")
 
     # PING
     if type_ == 1:
-        return JSONResponse({"type": 1})
+        return json_response(PONG_BODY)
 
     # APPLICATION COMMAND
     if type_ == 2:
@@ -441,13 +976,13 @@ async def discord_interaction(request: Request):
 
             # Store Pending Case
             if accused_user and channel_id:
-                registry.pending_cases[channel_id] = {
+                await registry.put_pending_case(channel_id, {
                     "accused": accused_user,
                     "crime": reason
-                }
+                })
 
             # Response Embed
-            return JSONResponse({
+            return json_response(fastjson.dumps({
                 "type": 4, # CHANNEL_MESSAGE_WITH_SOURCE
                 "data": {
                     "embeds": [{
@@ -458,11 +993,21 @@ async def discord_interaction(request: Request):
                         "footer": {"text": "Karma Court • Justice Awaits"}
                     }]
                 }
-            })
+            }))
 
-    return JSONResponse({"error": "Unknown Command"}, status_code=400)
+    return json_response(UNKNOWN_COMMAND_BODY, 400)
 
 # Serve React Frontend (MUST BE LAST)
 # Ensure the directory exists or this will error locally if not built.
-if os.path.exists("../client/dist"):
-    app.mount("/", StaticFiles(directory="../client/dist", html=True), name="static")
\ No newline at end of file
+static_assets = StaticAssets("../client/dist") if os.path.exists("../client/dist") else None
+if static_assets: app.mount("/", static_assets, name="static")
+
+# --- READINESS (/readyz) ---
+readiness.check("content", lambda: catalog.loaded)
+readiness.check("discord_http", lambda: bot_client.pool_ready)
+readiness.check("oauth_http", lambda: oauth_client.pool_ready)
+if static_assets: readiness.check("static", lambda: static_assets.ready)
+
+import_ms = (time.perf_counter() - IMPORT_STARTED) * 1000
+if import_ms > IMPORT_BUDGET_MS:
+    log_event(logger, "import_budget", f"⚠️ Imported in {import_ms:.0f} ms, over the {IMPORT_BUDGET_MS:.0f} ms budget", logging.WARNING, import_ms=round(import_ms))
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Product analytics: client events posted to /api/analytics plus the server's own game events.
+
+Events go through a bounded asyncio queue to a writer task that appends them, a batch at a
+time on a thread, to gzip-compressed NDJSON segments:
+    <dir>/events-<UTC start>-<worker>.ndjson.gz.part   (being written)
+    <dir>/events-<UTC start>-<worker>.ndjson.gz        (closed after KC_ANALYTICS_SEGMENT_MB of
+                                                         JSON or KC_ANALYTICS_SEGMENT_SECONDS)
+Nothing on the game path ever waits for it: when the queue is full the event is dropped and
+counted in kc_analytics_dropped_total{reason}. Read the segments with
+`python -m utils.analytics_report`.
+
+Enabled by setting KC_ANALYTICS_DIR.
+"""
+import asyncio
+import gzip
+import os
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+from utils import fastjson
+from utils.error_handler import handle_error
+from utils.metrics import metrics
+
+ANALYTICS_DIR = os.getenv("KC_ANALYTICS_DIR")
+QUEUE_SIZE = int(os.getenv("KC_ANALYTICS_QUEUE_SIZE", "10000"))                        # Events waiting for the writer
+SEGMENT_BYTES = int(float(os.getenv("KC_ANALYTICS_SEGMENT_MB", "64")) * 1024 * 1024)    # Uncompressed JSON per segment
+SEGMENT_SECONDS = float(os.getenv("KC_ANALYTICS_SEGMENT_SECONDS", "3600"))              # Longest a segment stays open
+WRITE_BATCH = 1000
+
+# Client payloads: {"user_id": ..., "instance_id": ..., "events": [{"event": ..., "ts": ..., "props": {...}}]}
+CLIENT_EVENTS = frozenset({"game_start", "vote_cast", "objection_called", "evidence_added", "verdict_delivered"})
+MAX_BODY_BYTES = 64 * 1024          # As posted (possibly gzip)
+MAX_DECODED_BYTES = 512 * 1024      # After gunzip: guards against compression bombs
+MAX_BATCH_EVENTS = 200
+MAX_ID_LENGTH = 64
+
+EVENTS = metrics.counter("kc_analytics_events_total", "Analytics events queued for writing", ("source",))
+DROPPED = metrics.counter("kc_analytics_dropped_total", "Analytics events dropped instead of written", ("reason",))
+CLIENT_QUEUED, SERVER_QUEUED = EVENTS.labels("client"), EVENTS.labels("server")
+DROPS = {reason: DROPPED.labels(reason) for reason in ("queue_full", "bad_event", "too_many", "write_error")}
+
+
+class PayloadError(ValueError):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def decode_batch(body: bytes, content_encoding: Optional[str]) -> Tuple[Optional[str], Optional[str], list]:
+    """(user_id, instance_id, raw events) from a client POST. Raises PayloadError for unusable bodies."""
+    if len(body) > MAX_BODY_BYTES: raise PayloadError(413, "Payload too large")
+    if content_encoding == "gzip":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try: body = inflater.decompress(body, MAX_DECODED_BYTES)
+        except zlib.error: raise PayloadError(400, "Invalid gzip body")
+        if inflater.unconsumed_tail: raise PayloadError(413, "Payload too large")
+    elif content_encoding not in (None, "identity"): raise PayloadError(415, "Unsupported Content-Encoding")
+    try: payload = fastjson.loads(body)
+    except ValueError: raise PayloadError(400, "Invalid JSON")
+    events = payload.get("events") if isinstance(payload, dict) else None
+    if not isinstance(events, list): raise PayloadError(400, "Expected {\"events\": [...]}")
+    user_id, instance_id = payload.get("user_id"), payload.get("instance_id")
+    user_id = user_id[:MAX_ID_LENGTH] if isinstance(user_id, str) else None
+    instance_id = instance_id[:MAX_ID_LENGTH] if isinstance(instance_id, str) else None
+    return user_id, instance_id, events
+
+
+class SegmentWriter:
+    """Blocking side: owns the open segment. Only ever called from one writer thread at a time."""
+
+    def __init__(self, directory: str, worker_id: str):
+        self.directory = directory
+        self.worker_id = worker_id
+        self._file: Optional[gzip.GzipFile] = None
+        self._path = ""
+        self._bytes = 0
+        self._opened = 0.0
+
+    def write(self, events: List[dict]):
+        if self._file is not None and (self._bytes >= SEGMENT_BYTES or time.time() - self._opened >= SEGMENT_SECONDS): self.close()
+        if self._file is None: self._open()
+        data = b"".join(fastjson.dumps(event) + b"\n" for event in events)
+        self._file.write(data)
+        self._file.flush() # Sync-flush the deflate stream: a crash loses at most the batch in flight
+        self._bytes += len(data)
+
+    def _open(self):
+        self._opened = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self._opened))
+        self._path = os.path.join(self.directory, f"events-{stamp}-{self.worker_id}.ndjson.gz")
+        self._file = gzip.open(self._path + ".part", "ab", compresslevel=6)
+        self._bytes = 0
+
+    def close(self):
+        if self._file is None: return
+        self._file.close()
+        os.replace(self._path + ".part", self._path)
+        self._file = None
+
+
+class AnalyticsSink:
+    def __init__(self, directory: Optional[str] = ANALYTICS_DIR, queue_size: int = QUEUE_SIZE):
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._writer: Optional[SegmentWriter] = None
+        self._closing = False
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    # --- PRODUCING (event loop side: never waits) ---
+    def track(self, event: str, room: Optional[str] = None, user: Optional[str] = None, **props):
+        """A server-side game event."""
+        if self._queue is not None and self._put({"ts": time.time(), "source": "server", "event": event, "room": room, "user": user, "props": props}):
+            SERVER_QUEUED.inc()
+
+    def ingest(self, user_id: Optional[str], instance_id: Optional[str], events: list) -> int:
+        """Queues a client batch (see decode_batch). Returns how many events were accepted."""
+        if self._queue is None: return 0
+        if len(events) > MAX_BATCH_EVENTS:
+            DROPS["too_many"].inc(len(events) - MAX_BATCH_EVENTS)
+            events = events[:MAX_BATCH_EVENTS]
+        received, accepted = time.time(), 0
+        for i, raw in enumerate(events):
+            name = raw.get("event") if isinstance(raw, dict) else None
+            props = raw.get("props", {}) if name in CLIENT_EVENTS else None
+            if not isinstance(props, dict):
+                DROPS["bad_event"].inc()
+                continue
+            ts = raw.get("ts")
+            event = {"ts": ts if isinstance(ts, (int, float)) else received, "received": received, "source": "client",
+                     "event": name, "room": instance_id, "user": user_id, "props": props}
+            if not self._put(event):
+                DROPS["queue_full"].inc(len(events) - i - 1) # The rest of the batch won't fit either
+                break
+            accepted += 1
+        CLIENT_QUEUED.inc(accepted)
+        return accepted
+
+    def _put(self, event: dict) -> bool:
+        try: self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            DROPS["queue_full"].inc()
+            return False
+        return True
+
+    # --- WRITING (background task + thread) ---
+    async def start(self, worker_id: str):
+        if not self.enabled or self._task is not None: return
+        os.makedirs(self.directory, exist_ok=True)
+        self._writer = SegmentWriter(self.directory, worker_id)
+        self._queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.create_task(self._write_loop())
+
+    async def close(self):
+        if self._task is None: return
+        # Let the loop finish its current batch (cancelling could run two writes at once)
+        self._closing = True
+        if self._queue.empty(): self._queue.put_nowait(None) # Wakes the loop
+        await self._task
+        self._task = None
+        while not self._queue.empty(): await self._write(self._drain([]))
+        await asyncio.to_thread(self._writer.close)
+        self._queue = None
+
+    async def _write_loop(self):
+        while not self._closing:
+            batch = [await self._queue.get()]
+            await self._write(self._drain(batch))
+
+    def _drain(self, batch: List[dict]) -> List[dict]:
+        while len(batch) < WRITE_BATCH and not self._queue.empty(): batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: List[dict]):
+        batch = [event for event in batch if event is not None]
+        if not batch: return
+        try: await asyncio.to_thread(self._writer.write, batch)
+        except Exception as e:
+            DROPS["write_error"].inc(len(batch))
+            handle_error(e, "analytics_write", events=len(batch))
+
+
+analytics = AnalyticsSink()
+metrics.gauge("kc_analytics_queue_depth", "Analytics events waiting for the writer", lambda: {(): analytics.depth()})
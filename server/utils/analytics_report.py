@@ -0,0 +1,87 @@
+"""
+Offline aggregation over the analytics segments written by utils/analytics.py.
+
+Streams every segment in the directory (one line in memory at a time, including the
+segment still being written) and counts events grouped by the fields you pick:
+event, source, day, hour, room, user or props.<name>.
+
+Usage:
+    python -m utils.analytics_report --dir $KC_ANALYTICS_DIR
+    python -m utils.analytics_report --dir analytics --by event,day --since 2026-10-01
+    python -m utils.analytics_report --dir analytics --by props.vote --event vote_cast --json
+"""
+import argparse
+import calendar
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+from collections import Counter
+from typing import Iterator, List, Optional
+
+
+def segments(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "events-*.ndjson.gz")) + glob.glob(os.path.join(directory, "events-*.ndjson.gz.part")))
+
+
+def read_events(paths: List[str]) -> Iterator[dict]:
+    for path in paths:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try: yield json.loads(line)
+                    except ValueError: continue # Torn final line of a crashed writer
+        except (EOFError, zlib.error, OSError) as e: # Open or truncated segment: keep what was readable
+            if not path.endswith(".part"): print(f"warning: {os.path.basename(path)}: {e}", file=sys.stderr)
+
+
+def group_key(event: dict, fields: List[str]) -> tuple:
+    key = []
+    for field in fields:
+        if field == "day": value = time.strftime("%Y-%m-%d", time.gmtime(event.get("ts", 0)))
+        elif field == "hour": value = time.strftime("%Y-%m-%d %H:00", time.gmtime(event.get("ts", 0)))
+        elif field.startswith("props."): value = (event.get("props") or {}).get(field[6:])
+        else: value = event.get(field)
+        key.append(value if isinstance(value, (str, int, float, type(None))) else json.dumps(value, sort_keys=True))
+    return tuple(key)
+
+
+def aggregate(paths: List[str], fields: List[str], since: Optional[float] = None, until: Optional[float] = None,
+              event_name: Optional[str] = None) -> Counter:
+    counts: Counter = Counter()
+    for event in read_events(paths):
+        ts = event.get("ts", 0)
+        if since is not None and ts < since: continue
+        if until is not None and ts >= until: continue
+        if event_name is not None and event.get("event") != event_name: continue
+        counts[group_key(event, fields)] += 1
+    return counts
+
+
+def parse_day(value: str) -> float:
+    return calendar.timegm(time.strptime(value, "%Y-%m-%d")) # UTC midnight
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=os.getenv("KC_ANALYTICS_DIR") or "analytics")
+    parser.add_argument("--by", default="event,source", help="Comma-separated fields to group by")
+    parser.add_argument("--since", type=parse_day, help="First day to include (YYYY-MM-DD, UTC)")
+    parser.add_argument("--until", type=parse_day, help="First day to leave out (YYYY-MM-DD, UTC)")
+    parser.add_argument("--event", help="Only count this event")
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    fields = [f.strip() for f in args.by.split(",") if f.strip()]
+    paths = segments(args.dir)
+    counts = aggregate(paths, fields, args.since, args.until, args.event)
+    rows = [{**dict(zip(fields, key)), "count": n} for key, n in counts.most_common()]
+    if args.json: print(json.dumps({"segments": len(paths), "group_by": fields, "total": sum(counts.values()), "rows": rows}))
+    else:
+        widths = [max([len(f)] + [len(str(r[f])) for r in rows]) for f in fields]
+        print("  ".join(f.ljust(w) for f, w in zip(fields, widths)) + "  count")
+        for r in rows: print("  ".join(str(r[f]).ljust(w) for f, w in zip(fields, widths)) + f"  {r['count']}")
+        print(f"{sum(counts.values())} events in {len(paths)} segments")
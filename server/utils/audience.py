@@ -0,0 +1,65 @@
+"""
+Audience mode for big rooms.
+
+Once a room reaches KC_AUDIENCE_THRESHOLD connections it treats the judge, accused and
+witness as primary participants and everyone else as audience:
+  - Primary sockets keep getting every patch and event immediately.
+  - Audience sockets get one coalesced update per KC_AUDIENCE_UPDATE_INTERVAL: the pending
+    patches merged into one, then the one-shot events of the window with duplicates dropped
+    (a vote wave is hundreds of identical "vote" sounds).
+  - Nobody receives the voters list any more, only `voter_count`; each client learns its own
+    vote from `you_voted` (in its snapshot and in a `personal` message when it votes).
+The mode is sticky for the life of the room so clients don't flap between formats.
+"""
+import asyncio
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.outbound import merge_patches
+
+AUDIENCE_THRESHOLD = int(os.getenv("KC_AUDIENCE_THRESHOLD", "50"))               # Connections; 0 disables audience mode
+AUDIENCE_UPDATE_INTERVAL = float(os.getenv("KC_AUDIENCE_UPDATE_INTERVAL", "0.5")) # Seconds between audience updates
+
+
+class AudienceFeed:
+    """Buffers broadcasts for the audience and hands them out at most once per interval."""
+    __slots__ = ("interval", "_deliver", "_patches", "_events", "_personal", "_handle")
+
+    def __init__(self, deliver: Callable[[List[dict], List[Tuple[Any, dict]]], None], interval: float = AUDIENCE_UPDATE_INTERVAL):
+        self.interval = interval
+        self._deliver = deliver # Called with the coalesced messages (in order) and the personal ones
+        self._patches: List[dict] = []
+        self._events: Dict[str, dict] = {} # Canonical JSON -> event, in arrival order
+        self._personal: List[Tuple[Any, dict]] = [] # (socket, message): after the window, so a reset in it can't undo them
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def add(self, message: dict):
+        if message.get("type") == "patch": self._patches.append(message)
+        else: self._events.setdefault(json.dumps(message, sort_keys=True), message)
+        self._schedule()
+
+    def add_personal(self, websocket, message: dict):
+        self._personal.append((websocket, message))
+        self._schedule()
+
+    def _schedule(self):
+        if self._handle is None: self._handle = asyncio.get_running_loop().call_later(self.interval, self.flush)
+
+    def flush(self):
+        """Delivers what is pending now (also called before snapshots and when the primaries change)."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._patches and not self._events and not self._personal: return
+        messages = []
+        if self._patches: messages.append(self._patches[0] if len(self._patches) == 1 else merge_patches(self._patches))
+        messages.extend(self._events.values())
+        personal = self._personal
+        self._patches, self._events, self._personal = [], {}, []
+        self._deliver(messages, personal)
+
+    def close(self):
+        if self._handle is not None: self._handle.cancel()
+        self._handle = None
+        self._patches, self._events, self._personal = [], {}, []
@@ -0,0 +1,117 @@
+"""
+Minimal registry broker shared by all workers (see utils/registry_backend.py).
+
+Speaks newline-delimited JSON over TCP and keeps:
+  * a key/value store for pending cases (same TTL and size cap as the in-process backend)
+  * room ownership claims, released automatically when the owning worker disconnects
+  * pub/sub channels (a subscriber that stops reading is disconnected, not buffered for)
+  * announcements on WORKERS_CHANNEL when a room owner disconnects, so the workers relaying
+    sockets to it can send those clients elsewhere
+
+Run it next to the workers:
+    python -m utils.broker --port 7400
+    KC_REGISTRY_URL=tcp://127.0.0.1:7400 uvicorn main:app --workers 4
+"""
+import argparse
+import asyncio
+import os
+from typing import Dict, Set, Tuple
+
+from utils import fastjson
+from utils.error_handler import handle_error, log_info
+from utils.registry_backend import LINE_LIMIT, PENDING_CASE_MAX, PENDING_CASE_TTL, WORKERS_CHANNEL
+from utils.ttl_cache import TTLCache
+
+SWEEP_INTERVAL = 30.0
+SUBSCRIBER_BUFFER_LIMIT = int(os.getenv("KC_BROKER_SUBSCRIBER_BUFFER") or 4 * LINE_LIMIT) # Unread bytes before a subscriber is cut off
+
+
+class Broker:
+    def __init__(self):
+        self.values = TTLCache(PENDING_CASE_TTL, PENDING_CASE_MAX)
+        self.owners: Dict[str, Tuple[str, asyncio.StreamWriter]] = {} # room -> (worker_id, connection)
+        self.subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        channels: Set[str] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                request = fastjson.loads(line)
+                try: result = self.apply(request, writer, channels)
+                except Exception as e:
+                    if "id" in request: self._send(writer, {"id": request["id"], "error": str(e)})
+                    continue
+                if "id" in request: self._send(writer, {"id": request["id"], "result": result})
+        except (ConnectionError, asyncio.IncompleteReadError): pass
+        except Exception as e: handle_error(e, "broker_client")
+        finally:
+            for channel in channels: self._unsubscribe(channel, writer)
+            # A dead worker can't host rooms any more: free them for the next claimant
+            freed = [r for r, (_, conn) in self.owners.items() if conn is writer]
+            for worker in {self.owners[r][0] for r in freed}: self._publish(WORKERS_CHANNEL, {"op": "gone", "worker": worker})
+            for room in freed: del self.owners[room]
+            writer.close()
+
+    def apply(self, request: dict, writer: asyncio.StreamWriter, channels: Set[str]):
+        op = request["op"]
+        if op == "put":
+            self.values.set(request["key"], request["value"])
+        elif op == "pop":
+            return self.values.pop(request["key"])
+        elif op == "claim":
+            owner = self.owners.setdefault(request["room"], (request["worker"], writer))
+            return owner[0]
+        elif op == "release":
+            owner = self.owners.get(request["room"])
+            if owner and owner[0] == request["worker"]: del self.owners[request["room"]]
+        elif op == "publish":
+            self._publish(request["channel"], request["data"])
+        elif op == "subscribe":
+            self.subscribers.setdefault(request["channel"], set()).add(writer)
+            channels.add(request["channel"])
+        elif op == "unsubscribe":
+            self._unsubscribe(request["channel"], writer)
+            channels.discard(request["channel"])
+        else:
+            raise ValueError(f"unknown op {op!r}")
+
+    def _unsubscribe(self, channel: str, writer: asyncio.StreamWriter):
+        subscribers = self.subscribers.get(channel)
+        if subscribers is None: return
+        subscribers.discard(writer)
+        if not subscribers: del self.subscribers[channel]
+
+    def _publish(self, channel: str, data: dict):
+        line = fastjson.dumps({"op": "message", "channel": channel, "data": data}) + b"\n"
+        for subscriber in list(self.subscribers.get(channel, ())):
+            if subscriber.is_closing(): continue
+            if subscriber.transport.get_write_buffer_size() > SUBSCRIBER_BUFFER_LIMIT:
+                # A stalled worker: drop it rather than buffer without bound. It reconnects, resubscribes and reclaims
+                log_info("Disconnecting a subscriber that stopped reading", "broker_slow_subscriber", channel=channel)
+                subscriber.transport.abort()
+                continue
+            subscriber.write(line)
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, message: dict):
+        writer.write(fastjson.dumps(message) + b"\n")
+
+
+async def serve(host: str, port: int):
+    broker = Broker()
+    server = await asyncio.start_server(broker.handle, host, port, limit=LINE_LIMIT)
+    log_info(f"Registry broker listening on {host}:{port}")
+    async with server:
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            broker.values.sweep()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7400)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,171 @@
+"""
+Content catalog: the crimes and sentences rooms draw from.
+
+Loaded once per process from a JSON data file (KC_CONTENT_FILE, default data/content.json):
+    {"crimes": [{"text": "...", "tags": ["voice"], "severity": 1}, ...], "sentences": [...]}
+Severity runs from 1 (mild) to 3 (severe, the contempt-of-court sentences). Entries are
+indexed by tag and severity once per load and every room shares the same tuples.
+
+Rooms draw through a Deck per (bank, tag, severities): a lazy Fisher-Yates shuffle that only
+remembers the positions it swapped, so a draw is O(1), a room never copies the catalog and
+nothing repeats until the whole pool has come up. The file is re-read when it changes
+(checked at most every RELOAD_CHECK_INTERVAL seconds, parsed off the event loop); decks
+built on the previous catalog start a fresh shuffle on their next draw.
+"""
+import json
+import os
+import random
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from utils.error_handler import handle_error, log_info
+
+MILD, NORMAL, SEVERE = 1, 2, 3
+ORDINARY = (MILD, NORMAL) # Sentences a judge hands out; SEVERE is kept for contempt
+
+CONTENT_FILE = os.getenv("KC_CONTENT_FILE") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "content.json")
+RELOAD_CHECK_INTERVAL = 5.0 # Seconds between mtime checks
+
+
+class Bank:
+    """One kind of content (crimes or sentences): the texts plus index arrays per tag and severity."""
+    __slots__ = ("texts", "_by_tag", "_by_severity", "_pools")
+
+    def __init__(self, entries: Iterable[dict]):
+        texts, by_tag, by_severity = [], {}, {}
+        for entry in entries:
+            text = entry.get("text")
+            if not isinstance(text, str) or not text.strip(): continue
+            index = len(texts)
+            texts.append(text)
+            for tag in entry.get("tags", ()): by_tag.setdefault(tag, array("I")).append(index)
+            by_severity.setdefault(int(entry.get("severity", NORMAL)), array("I")).append(index)
+        if not texts: raise ValueError("content bank is empty")
+        self.texts: Tuple[str, ...] = tuple(texts)
+        self._by_tag: Dict[str, array] = by_tag
+        self._by_severity: Dict[int, array] = by_severity
+        self._pools: Dict[tuple, Sequence[int]] = {} # (tag, severities) -> indexes, built on first use
+
+    def __len__(self):
+        return len(self.texts)
+
+    def has_tag(self, tag: str) -> bool:
+        return tag in self._by_tag
+
+    def pool(self, tag: Optional[str] = None, severities: Optional[Tuple[int, ...]] = None) -> Sequence[int]:
+        """Indexes of the entries with `tag` and one of `severities`. Falls back to the whole bank when that's empty."""
+        key = (tag, severities)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._by_tag.get(tag, ()) if tag is not None else range(len(self.texts))
+            if severities is not None:
+                allowed = set()
+                for severity in severities: allowed.update(self._by_severity.get(severity, ()))
+                pool = array("I", (i for i in pool if i in allowed))
+            if not pool: pool = range(len(self.texts))
+            self._pools[key] = pool
+        return pool
+
+
+class Catalog:
+    __slots__ = ("crimes", "sentences")
+
+    def __init__(self, data: dict):
+        self.crimes = Bank(data.get("crimes", ()))
+        self.sentences = Bank(data.get("sentences", ()))
+
+
+class Deck:
+    """Lazy shuffle of one pool: `swaps` holds only the positions moved so far in this round."""
+    __slots__ = ("catalog", "pool", "remaining", "swaps")
+
+    def __init__(self, catalog: Catalog, pool: Sequence[int]):
+        self.catalog = catalog
+        self.pool = pool
+        self.remaining = len(pool)
+        self.swaps: Dict[int, int] = {}
+
+    def draw(self) -> int:
+        if self.remaining == 0: # Every entry came up once: start the next round
+            self.remaining = len(self.pool)
+            self.swaps.clear()
+        last = self.remaining - 1
+        pick = random.randrange(self.remaining)
+        chosen = self.swaps.get(pick, pick)
+        moved = self.swaps.pop(last, last)
+        if pick != last: self.swaps[pick] = moved
+        self.remaining = last
+        return self.pool[chosen]
+
+
+class ContentDecks:
+    """A room's draws. Decks are created on first use and rebuilt when the catalog reloads."""
+    __slots__ = ("_decks",)
+
+    def __init__(self):
+        self._decks: Dict[tuple, Deck] = {}
+
+    def draw(self, bank: str, tag: Optional[str] = None, severities: Optional[Tuple[int, ...]] = None) -> str:
+        current = catalog.get()
+        entries: Bank = getattr(current, bank)
+        if tag is not None and not entries.has_tag(tag): tag = None # Unknown tags don't get decks of their own
+        key = (bank, tag, severities)
+        deck = self._decks.get(key)
+        if deck is None or deck.catalog is not current:
+            deck = self._decks[key] = Deck(current, entries.pool(tag, severities))
+        return entries.texts[deck.draw()]
+
+
+class ContentCatalog:
+    """Holds the current Catalog and swaps in a new one when the data file changes."""
+
+    def __init__(self, path: str = CONTENT_FILE):
+        self.path = path
+        self._current: Optional[Catalog] = None
+        self._loaded_mtime: Optional[float] = None
+        self._next_reload_check = 0.0
+        self._reloading = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    def get(self) -> Catalog:
+        now = time.monotonic()
+        if self._current is None or now >= self._next_reload_check:
+            self._next_reload_check = now + RELOAD_CHECK_INTERVAL
+            self._reload_if_changed()
+        return self._current
+
+    def _reload_if_changed(self):
+        try: mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            if self._current is None: raise # Nothing to fall back on
+            handle_error(e, "content_reload", path=self.path)
+            return
+        if self._current is not None and (mtime == self._loaded_mtime or self._reloading): return
+
+        if self._current is None:
+            self._load(mtime) # First load: rooms can't draw until it's there
+        else:
+            # Tens of thousands of entries take a moment to index, so parse off the event loop and swap when ready
+            self._reloading = True
+            threading.Thread(target=self._reload, args=(mtime,), daemon=True).start()
+
+    def _load(self, mtime: float):
+        with open(self.path, encoding="utf-8") as f:
+            current = Catalog(json.load(f))
+        self._current, self._loaded_mtime = current, mtime
+        log_info(f"Loaded {len(current.crimes)} crimes and {len(current.sentences)} sentences", "content_load", path=self.path)
+
+    def _reload(self, mtime: float):
+        try: self._load(mtime)
+        except Exception as e:
+            self._loaded_mtime = mtime # Don't retry a broken file until it changes again
+            handle_error(e, "content_reload", path=self.path)
+        finally: self._reloading = False
+
+
+catalog = ContentCatalog()
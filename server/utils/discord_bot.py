@@ -1,17 +1,60 @@
 import os
-import requests
+import asyncio
 import json
+import logging
 import random
+import re
 import time
+from collections import deque
 from datetime import datetime
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from utils.metrics import DISCORD_LATENCY, DISCORD_RESPONSES, metrics
+from utils.logs import log_event
+from utils.startup import load_env
 
-load_dotenv()
+if TYPE_CHECKING: import httpx # Imported with the first client (~200 ms with its TLS context), off the cold-start path
+
+load_env()
+
+# Delivery settings
+MAX_ATTEMPTS = 5          # Per message, including 429 retries
+BACKOFF_BASE = 0.5        # Seconds, doubled per failed attempt (with jitter)
+BACKOFF_CAP = 15.0
+
+# Batching: low-priority embeds (evidence, objections...) arriving within the window are
+# merged into one message. Discord allows 10 embeds and ~6000 characters per message.
+EMBED_BATCH_WINDOW = float(os.getenv("KC_EMBED_BATCH_WINDOW", "2.0"))
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_BATCH_CHARS = 6000
+
+ID_SEGMENT = re.compile(r"/\d+")
+logger = logging.getLogger("kc.discord")
+
+# Delivery counters: embeds queued vs. messages actually sent shows what batching saves
+EMBEDS_QUEUED = metrics.counter("kc_discord_embeds_total", "Embeds queued for delivery").labels()
+MESSAGES_SENT = metrics.counter("kc_discord_messages_total", "Batched embed messages handed to the Discord API (one call each, before retries)").labels()
+API_CALLS_SAVED = metrics.counter("kc_discord_api_calls_saved_total", "Embeds that rode along in another embed's message instead of their own call").labels()
 
 class DiscordBot:
     def __init__(self):
         self.bot_token = os.getenv("DISCORD_BOT_TOKEN")
-        self.base_url = "https://discord.com/api/v10"
+        # Overridable so the bot can be pointed at a local fake Discord (see benchmarks/fake_discord.py)
+        self.base_url = os.getenv("DISCORD_API_BASE", "https://discord.com/api/v10")
+
+        # Pooled keep-alive HTTP client (created lazily inside the event loop)
+        self._client: Optional["httpx.AsyncClient"] = None
+
+        # Background delivery: one FIFO + sender task per channel, so a rate-limited
+        # channel never holds up the others and embeds keep their order.
+        self._outbox: Dict[str, Deque[Tuple[str, dict, bool]]] = {} # channel -> (url, embed, urgent)
+        self._senders: Dict[str, asyncio.Task] = {}
+        self._batch_ready: Dict[str, asyncio.Event] = {} # Set to cut a batching window short
+
+        # Rate limits: route -> Discord bucket hash, bucket key -> (remaining, resets_at)
+        self._route_buckets: Dict[str, str] = {}
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+        self._global_reset_at = 0.0
 
     def _get_case_id(self):
         """Generates a pseudo-random Case ID based on time."""
@@ -60,7 +103,7 @@ class DiscordBot:
             "footer": {"text": "Karma Court • Justice In Real-Time"}
         }
         
-        self._post(url, embed, target_id)
+        self._post(url, embed, target_id, urgent=True)
 
     def send_witness_embed(self, channel_id: str, game_state: dict):
         if not self.bot_token: self.bot_token = os.getenv("DISCORD_BOT_TOKEN")
@@ -179,7 +222,7 @@ class DiscordBot:
             "footer": {"text": f"Karma Court • Justice Served • {datetime.utcnow().strftime('%Y-%m-%d')}"}
         }
 
-        self._post(url, embed, target_id)
+        self._post(url, embed, target_id, urgent=True)
 
     def send_evidence_embed(self, channel_id: str, evidence_item: dict):
         if not self.bot_token: self.bot_token = os.getenv("DISCORD_BOT_TOKEN")
@@ -213,22 +256,165 @@ class DiscordBot:
 
         self._post(url, embed, target_id)
 
-    def _post(self, url, embed, channel_id):
+    def _post(self, url, embed, channel_id, urgent: bool = False):
+        """
+        Queues an embed for background delivery. Must be called from inside the event loop.
+        Urgent embeds (case start, verdict) flush the channel's batch immediately.
+        """
         if not self.bot_token:
-            print("❌ Discord Bot Error: No Bot Token found.")
+            log_event(logger, "discord_no_token", "❌ Discord Bot Error: No Bot Token found.", logging.ERROR, channel=channel_id)
             return
 
-        headers = {
-            "Authorization": f"Bot {self.bot_token}",
-            "Content-Type": "application/json"
-        }
+        queue = self._outbox.setdefault(channel_id, deque())
+        queue.append((url, embed, urgent))
+        EMBEDS_QUEUED.inc()
+        ready = self._batch_ready.setdefault(channel_id, asyncio.Event())
+        if urgent or len(queue) >= MAX_EMBEDS_PER_MESSAGE: ready.set()
+        if channel_id not in self._senders:
+            self._senders[channel_id] = asyncio.create_task(self._drain_channel(channel_id))
+
+    async def _drain_channel(self, channel_id: str):
+        queue, ready = self._outbox[channel_id], self._batch_ready[channel_id]
         try:
-            r = requests.post(url, headers=headers, json={"embeds": [embed]})
+            while queue:
+                # Hold low-priority embeds for the batching window unless a flush was requested
+                if not ready.is_set() and EMBED_BATCH_WINDOW > 0:
+                    try: await asyncio.wait_for(ready.wait(), EMBED_BATCH_WINDOW)
+                    except asyncio.TimeoutError: pass
+                ready.clear()
+
+                url, batch, size = queue[0][0], [], 0
+                while queue and len(batch) < MAX_EMBEDS_PER_MESSAGE and queue[0][0] == url:
+                    embed_size = len(json.dumps(queue[0][1]))
+                    if batch and size + embed_size > MAX_BATCH_CHARS: break
+                    batch.append(queue.popleft()[1])
+                    size += embed_size
+                if any(item[2] for item in queue) or len(queue) >= MAX_EMBEDS_PER_MESSAGE: ready.set()
+
+                MESSAGES_SENT.inc()
+                API_CALLS_SAVED.inc(len(batch) - 1)
+                await self._send(url, {"embeds": batch}, channel_id)
+        finally:
+            self._senders.pop(channel_id, None)
+            if not queue:
+                self._outbox.pop(channel_id, None)
+                self._batch_ready.pop(channel_id, None)
+
+    async def flush(self):
+        """Sends every queued embed now and waits until all are delivered (or given up on)."""
+        while self._senders:
+            for ready in self._batch_ready.values(): ready.set()
+            await asyncio.gather(*list(self._senders.values()), return_exceptions=True)
+
+    async def aclose(self):
+        await self.flush()
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def pool_ready(self) -> bool:
+        return self._client is not None
+
+    async def warm_up(self):
+        """Builds the pooled client (httpx import + TLS context) off the event loop and, with a token, opens its first connection."""
+        if self._client is None:
+            client = await asyncio.to_thread(self._new_client)
+            # A send may have built one on the loop meanwhile: keep that one rather than leak this
+            if self._client is None: self._client = client
+            else: await client.aclose()
+        if not self.bot_token: return
+        import httpx
+        try: await self._client.get(f"{self.base_url}/gateway")
+        except httpx.HTTPError as e: log_event(logger, "discord_warm_up", f"⚠️ Could not preconnect to Discord: {e!r}", logging.WARNING)
+
+    def _http(self) -> "httpx.AsyncClient":
+        # Only called on the event loop, so there is never a second client
+        if self._client is None: self._client = self._new_client()
+        return self._client
+
+    @staticmethod
+    def _new_client() -> "httpx.AsyncClient":
+        import httpx
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+
+    async def _send(self, url: str, payload: dict, channel_id: str) -> bool:
+        route = f"POST {url}" # The channel id is a major parameter, so it is part of the route
+        headers = {"Authorization": f"Bot {self.bot_token}", "Content-Type": "application/json"}
+        metric_route = "POST " + ID_SEGMENT.sub("/:id", urlsplit(url).path) # Ids out of metric labels
+        latency = DISCORD_LATENCY.labels(metric_route)
+        import httpx
+
+        for attempt in range(MAX_ATTEMPTS):
+            await self._wait_for_rate_limit(route)
+            started = time.perf_counter()
+            try:
+                r = await self._http().post(url, headers=headers, json=payload)
+            except httpx.HTTPError as e:
+                DISCORD_RESPONSES.labels(metric_route, "error").inc()
+                log_event(logger, "discord_error", f"❌ Error sending Discord Embed: {e!r}", logging.WARNING, channel=channel_id, attempt=attempt + 1)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            latency.observe(time.perf_counter() - started)
+            DISCORD_RESPONSES.labels(metric_route, str(r.status_code)).inc()
+            self._update_rate_limit(route, r.headers)
             if r.status_code in [200, 201, 204]:
-                print(f"✅ Embed sent successfully to channel: {channel_id}")
-            else:
-                print(f"❌ Failed to send. Status: {r.status_code} | Response: {r.text}")
-        except Exception as e:
-            print(f"❌ Error sending Discord Embed: {e}")
+                log_event(logger, "discord_sent", "✅ Embed sent successfully", channel=channel_id)
+                return True
+            if r.status_code == 429:
+                self._handle_429(route, r)
+                continue
+            if r.status_code >= 500:
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            log_event(logger, "discord_failed", f"❌ Failed to send. Response: {r.text[:500]}", logging.ERROR, channel=channel_id, status=r.status_code)
+            return False
+
+        log_event(logger, "discord_gave_up", f"❌ Giving up on embed after {MAX_ATTEMPTS} attempts", logging.ERROR, channel=channel_id)
+        return False
+
+    # --- RATE LIMITS ---
+    def _bucket_key(self, route: str) -> str:
+        return self._route_buckets.get(route, route)
+
+    async def _wait_for_rate_limit(self, route: str):
+        while True:
+            now = time.monotonic()
+            wait = self._global_reset_at - now
+            remaining, resets_at = self._buckets.get(self._bucket_key(route), (1, 0.0))
+            if remaining <= 0: wait = max(wait, resets_at - now)
+            if wait <= 0: break
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+        # Reserve a slot so concurrent senders sharing the bucket don't overshoot it
+        key = self._bucket_key(route)
+        if key in self._buckets:
+            remaining, resets_at = self._buckets[key]
+            self._buckets[key] = (remaining - 1, resets_at) if resets_at > time.monotonic() else (1, 0.0)
+
+    def _update_rate_limit(self, route: str, headers: "httpx.Headers"):
+        bucket = headers.get("X-RateLimit-Bucket")
+        if bucket: self._route_buckets[route] = f"{bucket}:{route}"
+        remaining, reset_after = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            self._buckets[self._bucket_key(route)] = (int(remaining), time.monotonic() + float(reset_after))
+
+    def _handle_429(self, route: str, r: "httpx.Response"):
+        try: body = r.json()
+        except ValueError: body = {}
+        retry_after = float(body.get("retry_after") or r.headers.get("Retry-After") or 1.0)
+        resets_at = time.monotonic() + retry_after
+        log_event(logger, "discord_rate_limited", f"⏳ Rate limited, retrying in {retry_after:.2f}s", logging.WARNING, route=route, retry_after=retry_after)
+        if body.get("global") or r.headers.get("X-RateLimit-Global"):
+            self._global_reset_at = max(self._global_reset_at, resets_at)
+        else:
+            self._buckets[self._bucket_key(route)] = (0, resets_at)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
 
 bot_client = DiscordBot()
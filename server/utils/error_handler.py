@@ -1,25 +1,25 @@
 import logging
-import traceback
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from utils.logs import configure_logging, log_event
+
+# Configure logging (queued JSON records, written by a background thread)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-def handle_error(error: Exception, context: str = ""):
+def handle_error(error: Exception, context: str = "", **fields):
     """
     Logs the error and returns a friendly error message or structure.
+    The traceback is captured, not formatted: the log flusher thread formats it.
     """
     error_msg = str(error)
-    trace = traceback.format_exc()
-    
-    logger.error(f"Error in {context}: {error_msg}\n{trace}")
-    
+
+    logger.error(f"Error in {context}: {error_msg}", exc_info=error, extra={"fields": {"action": context, **fields}})
+
     return {
         "status": "error",
         "message": "An internal server error occurred.",
         "details": error_msg if context == "dev" else None # Hide details in prod usually
     }
 
-def log_info(message: str):
-    logger.info(message)
-
+def log_info(message: str, action: str = "info", **fields):
+    log_event(logger, action, message, **fields)
@@ -0,0 +1,19 @@
+"""
+JSON helpers backed by orjson when it is installed, falling back to the stdlib.
+dumps() always returns bytes; loads() accepts bytes or str.
+"""
+import json
+
+try:
+    import orjson
+except ImportError: # pragma: no cover - optional speedup
+    orjson = None
+
+if orjson:
+    loads = orjson.loads
+    dumps = orjson.dumps
+else:
+    loads = json.loads
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
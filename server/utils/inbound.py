@@ -0,0 +1,58 @@
+"""
+Cheap checks on client frames before they reach GameManager.handle_message.
+
+Every connection gets a token bucket (KC_INBOUND_RATE messages/s, bursts of KC_INBOUND_BURST);
+frames over budget, oversized, not JSON objects, of an unknown type or with mistyped fields
+are dropped without an answer and counted in kc_inbound_dropped_total{reason}.
+"""
+import json
+import os
+from typing import Optional, Tuple
+
+from utils.metrics import metrics
+from utils.rate_limit import TokenBucket
+
+MAX_FRAME_BYTES = int(os.getenv("KC_MAX_FRAME_BYTES", "4096"))
+INBOUND_RATE = float(os.getenv("KC_INBOUND_RATE", "10"))   # Messages per second per connection
+INBOUND_BURST = float(os.getenv("KC_INBOUND_BURST", "20"))
+
+# Message type -> required fields and their types. Other fields are ignored.
+MESSAGE_SCHEMA = {
+    "sync": {},
+    "vote": {"vote": str},
+    "update_crime": {"crime": str},
+    "generate_crime": {},
+    "accuse_user": {"user": dict},
+    "call_witness": {"user": dict},
+    "call_verdict": {},
+    "pass_sentence": {},
+    "next_case": {},
+    "objection": {},
+    "add_evidence": {"text": str},
+    "delete_evidence": {"id": int},
+}
+JUDGE_ONLY = frozenset({"update_crime", "generate_crime", "accuse_user", "call_witness", "call_verdict",
+                        "pass_sentence", "next_case", "delete_evidence"})
+
+DROPPED = metrics.counter("kc_inbound_dropped_total", "Client messages dropped before handling", ("reason",))
+DROPS = {reason: DROPPED.labels(reason) for reason in ("rate_limited", "too_large", "bad_json", "unknown_type", "bad_schema", "not_judge")}
+
+
+def new_bucket() -> TokenBucket:
+    return TokenBucket(INBOUND_RATE, INBOUND_BURST)
+
+
+def parse(data: str) -> Tuple[Optional[dict], Optional[str]]:
+    """(message, None) for a well-formed frame, (None, drop reason) otherwise."""
+    if len(data) > MAX_FRAME_BYTES: return None, "too_large"
+    try: message = json.loads(data)
+    except ValueError: return None, "bad_json"
+    if not isinstance(message, dict): return None, "bad_json"
+    msg_type = message.get("type")
+    fields = MESSAGE_SCHEMA.get(msg_type) if isinstance(msg_type, str) else None
+    if fields is None: return None, "unknown_type"
+    for field, kind in fields.items():
+        if not isinstance(message.get(field), kind): return None, "bad_schema"
+    username = message.get("username")
+    if username is not None and not isinstance(username, str): return None, "bad_schema"
+    return message, None
@@ -0,0 +1,133 @@
+"""
+Append-only per-room journal with periodic snapshots, for surviving restarts and redeploys.
+
+Every accepted state change (the same delta a room broadcasts as a patch) is appended to
+`<dir>/<room>.log`; every SNAPSHOT_EVERY events the full state is written to `<room>.snap`
+and the log starts over. Nothing is read at startup: a room is rebuilt from its files the
+first time a client reconnects to it.
+
+Writes never touch the disk on the event loop. `append()`/`snapshot()` only encode and
+buffer; a background task hands each batch to a thread that writes it and fsyncs each file
+once per batch.
+
+Enabled by setting KC_JOURNAL_DIR.
+"""
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+
+from utils import fastjson
+from utils.error_handler import handle_error
+
+JOURNAL_DIR = os.getenv("KC_JOURNAL_DIR")
+FLUSH_INTERVAL = float(os.getenv("KC_JOURNAL_FLUSH_INTERVAL", "0.2")) # Seconds between batched fsyncs
+SNAPSHOT_EVERY = int(os.getenv("KC_JOURNAL_SNAPSHOT_EVERY", "200"))   # Events per room between snapshots
+
+
+class RoomJournal:
+    def __init__(self, directory: Optional[str] = JOURNAL_DIR, flush_interval: float = FLUSH_INTERVAL):
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[str, str, bytes]] = [] # (room file base, kind, payload) in append order
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        if self.enabled: os.makedirs(directory, exist_ok=True)
+
+    def _base(self, instance_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(instance_id.encode()).hexdigest())
+
+    # --- WRITING (event loop side: encode + buffer only) ---
+    def append(self, instance_id: str, record: dict):
+        if self.enabled: self._pending.append((self._base(instance_id), "event", fastjson.dumps(record) + b"\n"))
+
+    def snapshot(self, instance_id: str, version: int, state: dict):
+        if self.enabled:
+            payload = fastjson.dumps({"room": instance_id, "version": version, "state": state})
+            self._pending.append((self._base(instance_id), "snapshot", payload))
+
+    def delete(self, instance_id: str):
+        """Forgets a room (after its last player left normally), in order with pending writes."""
+        if self.enabled: self._pending.append((self._base(instance_id), "delete", b""))
+
+    async def start(self):
+        if self.enabled and self._task is None: self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        # Let the loop finish its current batch (cancelling could reorder it with the last one)
+        self._closing = True
+        if self._task: await self._task
+        self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending: return
+        batch, self._pending = self._pending, []
+        try: await asyncio.to_thread(self._write_batch, batch)
+        except Exception as e: handle_error(e, "journal_write")
+
+    async def _flush_loop(self):
+        while not self._closing:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    @staticmethod
+    def _write_batch(batch: List[Tuple[str, str, bytes]]):
+        files: Dict[str, object] = {}
+        try:
+            for base, kind, payload in batch:
+                if kind in ("snapshot", "delete"):
+                    log = files.pop(base, None)
+                    if log: log.close()
+                if kind == "delete":
+                    for suffix in (".log", ".snap"):
+                        try: os.remove(base + suffix)
+                        except FileNotFoundError: pass
+                elif kind == "snapshot":
+                    tmp = base + ".snap.tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(payload)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp, base + ".snap")
+                    files[base] = open(base + ".log", "wb") # Events so far are covered by the snapshot
+                else:
+                    log = files.get(base)
+                    if log is None: log = files[base] = open(base + ".log", "ab")
+                    log.write(payload)
+        finally:
+            for log in files.values():
+                log.flush()
+                os.fsync(log.fileno())
+                log.close()
+
+    # --- READING (blocking: call through asyncio.to_thread) ---
+    def load(self, instance_id: str) -> Optional[Tuple[int, dict]]:
+        """Rebuilds (version, state) for a room, or None if it has no journal."""
+        if not self.enabled: return None
+        base = self._base(instance_id)
+        version, state = 0, None
+        if os.path.exists(base + ".snap"):
+            with open(base + ".snap", "rb") as f: snap = fastjson.loads(f.read())
+            version, state = snap["version"], snap["state"]
+        if os.path.exists(base + ".log"):
+            state = state or {}
+            with open(base + ".log", "rb") as f:
+                for line in f:
+                    try: record = fastjson.loads(line)
+                    except ValueError: break # Torn final write from a crash
+                    if record["v"] <= version: continue # Already in the snapshot
+                    version = record["v"]
+                    apply_patch(state, record["data"], record.get("logs"))
+        return (version, state) if state is not None else None
+
+
+
+def apply_patch(state: dict, data: dict, logs: Optional[list], max_logs: int = 50):
+    """Applies a broadcast patch to a plain state dict (same rules as the client)."""
+    state.update(data)
+    if logs: state["logs"] = (state.get("logs", []) + logs)[-max_logs:]
+
+
+journal = RoomJournal()
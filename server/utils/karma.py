@@ -0,0 +1,157 @@
+"""
+Karma ledger: every user's court record, per guild and across all guilds.
+
+Rooms report outcomes as they happen (convicted, acquitted, sentenced, judged). `record()`
+only appends to a list on the event loop; a background task writes each batch to SQLite
+in one transaction on a thread, so a burst of verdicts costs the loop nothing.
+
+Two tables:
+  - events: one row per outcome, indexed by (user_id, ts) for rap sheets.
+  - totals: running counters per (guild, user), updated by the same transaction. The "*"
+    guild holds the all-guilds totals. One index per stat makes a leaderboard an index
+    range scan of `limit` rows, and results are cached until the next batch lands.
+
+Stored in the SQLite file KC_KARMA_DB. Off when unset, like the journal and analytics: Render's
+filesystem is ephemeral, so a ledger needs a persistent disk to be worth keeping.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from utils.error_handler import handle_error
+from utils.ttl_cache import TTLCache
+
+KARMA_DB = os.getenv("KC_KARMA_DB", "")
+FLUSH_INTERVAL = float(os.getenv("KC_KARMA_FLUSH_INTERVAL", "1.0")) # Seconds between batched writes
+TOP_CACHE_TTL = 30 # Seconds a cached leaderboard may live (every write batch drops them anyway)
+
+ALL_GUILDS = "*"
+STATS = ("convictions", "acquittals", "sentences", "judged")
+KIND_STAT = {"convicted": "convictions", "acquitted": "acquittals", "sentenced": "sentences", "judged": "judged"}
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, guild_id TEXT NOT NULL, user_id TEXT NOT NULL,
+    kind TEXT NOT NULL, detail TEXT, room TEXT
+);
+CREATE INDEX IF NOT EXISTS events_user ON events (user_id, ts);
+CREATE TABLE IF NOT EXISTS totals (
+    guild_id TEXT NOT NULL, user_id TEXT NOT NULL, username TEXT,
+    convictions INTEGER NOT NULL DEFAULT 0, acquittals INTEGER NOT NULL DEFAULT 0,
+    sentences INTEGER NOT NULL DEFAULT 0, judged INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+""" + "".join(f"CREATE INDEX IF NOT EXISTS totals_{stat} ON totals (guild_id, {stat} DESC);\n" for stat in STATS)
+
+# (ts, guild_id, user_id, username, kind, detail, room)
+Event = Tuple[float, str, str, Optional[str], str, Optional[str], Optional[str]]
+
+
+class KarmaLedger:
+    def __init__(self, path: Optional[str] = KARMA_DB, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.enabled = bool(path)
+        self.flush_interval = flush_interval
+        self._pending: List[Event] = []
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock() # One connection, used from worker threads one at a time
+        self._top = TTLCache(TOP_CACHE_TTL, 1024) # (guild, stat, limit) -> leaderboard rows
+
+    # --- WRITING (event loop side: buffer only) ---
+    def record(self, kind: str, user_id: Optional[str], guild_id: Optional[str] = None, username: Optional[str] = None,
+               detail: Optional[str] = None, room: Optional[str] = None):
+        if self.enabled and user_id: self._pending.append((time.time(), guild_id or "", user_id, username, kind, detail, room))
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            await asyncio.to_thread(self._connect)
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        self._closing = True
+        if self._task: await self._task
+        self._task = None
+        await self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def flush(self):
+        if not self._pending or self._db is None: return
+        batch, self._pending = self._pending, []
+        try: await asyncio.to_thread(self._write_batch, batch)
+        except Exception as e: handle_error(e, "karma_write", events=len(batch))
+        self._top = TTLCache(TOP_CACHE_TTL, 1024) # Totals moved: recompute on the next read
+
+    async def _flush_loop(self):
+        while not self._closing:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(SCHEMA)
+        self._db.execute("PRAGMA synchronous = NORMAL") # WAL: durable at checkpoints, never corrupt
+
+    def _write_batch(self, batch: List[Event]):
+        # Fold the batch into one counter bump per (guild, user, stat), for the guild and for all guilds
+        bumps: Counter = Counter()
+        names: Dict[str, str] = {}
+        for _, guild_id, user_id, username, kind, _, _ in batch:
+            stat = KIND_STAT[kind]
+            bumps[(guild_id, user_id, stat)] += 1
+            bumps[(ALL_GUILDS, user_id, stat)] += 1
+            if username: names[user_id] = username
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN")
+            try:
+                db.executemany("INSERT INTO events (ts, guild_id, user_id, kind, detail, room) VALUES (?, ?, ?, ?, ?, ?)",
+                               [(ts, guild_id, user_id, kind, detail, room) for ts, guild_id, user_id, _, kind, detail, room in batch])
+                for stat in STATS:
+                    rows = [(guild_id, user_id, names.get(user_id), n) for (guild_id, user_id, s), n in bumps.items() if s == stat]
+                    if rows: db.executemany(
+                        f"INSERT INTO totals (guild_id, user_id, username, {stat}) VALUES (?, ?, ?, ?) "
+                        f"ON CONFLICT (guild_id, user_id) DO UPDATE SET {stat} = {stat} + excluded.{stat}, "
+                        f"username = COALESCE(excluded.username, username)", rows)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    # --- READING ---
+    async def leaderboard(self, stat: str, guild_id: Optional[str] = None, limit: int = 10) -> List[dict]:
+        """Top `limit` users by `stat` (one of STATS) in a guild, or across all guilds."""
+        key = (guild_id or ALL_GUILDS, stat, limit)
+        rows = self._top.get(key)
+        if rows is None:
+            rows = await asyncio.to_thread(self._query, f"SELECT user_id, username, {', '.join(STATS)} FROM totals "
+                                                        f"WHERE guild_id = ? AND {stat} > 0 ORDER BY {stat} DESC LIMIT ?", (key[0], limit))
+            self._top.set(key, rows)
+        return rows
+
+    async def rap_sheet(self, user_id: str, guild_id: Optional[str] = None, limit: int = 20) -> dict:
+        totals = await asyncio.to_thread(self._query, f"SELECT username, {', '.join(STATS)} FROM totals WHERE guild_id = ? AND user_id = ?",
+                                         (guild_id or ALL_GUILDS, user_id))
+        if guild_id: history = await asyncio.to_thread(self._query, "SELECT ts, guild_id, kind, detail FROM events WHERE user_id = ? AND guild_id = ? "
+                                                                    "ORDER BY ts DESC LIMIT ?", (user_id, guild_id, limit))
+        else: history = await asyncio.to_thread(self._query, "SELECT ts, guild_id, kind, detail FROM events WHERE user_id = ? "
+                                                             "ORDER BY ts DESC LIMIT ?", (user_id, limit))
+        record = totals[0] if totals else {"username": None, **{stat: 0 for stat in STATS}}
+        return {"user_id": user_id, "guild_id": guild_id, "username": record.pop("username"), "totals": record, "history": history}
+
+    def _query(self, sql: str, params: tuple) -> List[dict]:
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+ledger = KarmaLedger()
@@ -0,0 +1,200 @@
+"""
+Structured, non-blocking logging.
+
+Callers never touch stdout: records go through a sampling filter and a per-level rate limit
+and are then appended to a bounded deque, without formatting. A background thread drains it
+every FLUSH_INTERVAL, formats the batch (messages, fields and tracebacks alike) and writes it
+with a single write + flush, so a flood of actions costs the event loop a record and a deque
+append each (no lock, no thread wakeup), never a blocked pipe.
+
+Each line is one JSON object: ts, level, logger, msg, plus `action`, `room`, `user` and any
+other fields passed to log_event(). KC_LOG_FORMAT=text prints the old human-readable lines
+instead (local development).
+
+Settings:
+  KC_LOG_LEVEL        minimum level (INFO)
+  KC_LOG_SAMPLE       keep-rates for high-volume actions, e.g. "connect=0.1,discord_sent=0.1"
+  KC_LOG_RATE_LIMITS  records per second per level, e.g. "INFO=500,WARNING=100,ERROR=50"
+  KC_LOG_QUEUE_SIZE   records buffered before new ones are dropped (10000)
+Rate-limited and overflowed records are counted in kc_log_dropped_total and summarised in a
+`log_dropped` record.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from utils.metrics import metrics
+from utils.rate_limit import TokenBucket
+
+LOG_FORMAT = os.getenv("KC_LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("KC_LOG_LEVEL", "INFO").upper()
+QUEUE_SIZE = int(os.getenv("KC_LOG_QUEUE_SIZE", "10000"))
+FLUSH_INTERVAL = 0.1      # Seconds between flushes
+BATCH_SIZE = 1024         # Most records formatted into one write() call
+DROP_REPORT_INTERVAL = 10 # Seconds between `log_dropped` summaries while records are being dropped
+
+DEFAULT_SAMPLE_RATES = {"connect": 0.1, "discord_sent": 0.1}
+DEFAULT_RATE_LIMITS = {"DEBUG": 500, "INFO": 500, "WARNING": 100, "ERROR": 50, "CRITICAL": 50}
+
+DROPPED = metrics.counter("kc_log_dropped_total", "Log records dropped before being written", ("level", "reason"))
+
+
+def _parse_rates(value: Optional[str], defaults: Dict[str, float], upper: bool = False) -> Dict[str, float]:
+    rates = dict(defaults)
+    for item in (value or "").split(","):
+        key, _, rate = item.partition("=")
+        if key.strip() and rate.strip(): rates[key.strip().upper() if upper else key.strip()] = float(rate)
+    return rates
+
+SAMPLE_RATES = _parse_rates(os.getenv("KC_LOG_SAMPLE"), DEFAULT_SAMPLE_RATES)
+RATE_LIMITS = _parse_rates(os.getenv("KC_LOG_RATE_LIMITS"), DEFAULT_RATE_LIMITS, upper=True)
+
+
+class QueueingHandler(logging.Handler):
+    """Caller side: sample, rate-limit and enqueue. Formatting is left to the flusher thread."""
+
+    def __init__(self, records: Deque[logging.LogRecord]):
+        super().__init__()
+        self.records = records
+        self.buckets = {level: TokenBucket(rate) for level, rate in RATE_LIMITS.items()}
+        self.dropped: Dict[tuple, int] = {} # (level, reason) -> count since the last summary
+        self._drop_lock = threading.Lock()  # Other threads (to_thread workers) log too
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        fields = getattr(record, "fields", None)
+        if fields:
+            rate = SAMPLE_RATES.get(fields.get("action"), 1.0)
+            if rate < 1.0:
+                if random.random() >= rate: return False
+                fields["sampled"] = rate # Each kept record stands for 1/rate of them
+        bucket = self.buckets.get(record.levelname)
+        if bucket and not bucket.take(): return self._drop(record, "rate_limit")
+        if len(self.records) >= QUEUE_SIZE: return self._drop(record, "overflow")
+        self.records.append(record) # deque.append is atomic, no lock needed
+        return True
+
+    def _drop(self, record: logging.LogRecord, reason: str) -> bool:
+        DROPPED.labels(record.levelname, reason).inc()
+        with self._drop_lock:
+            key = (record.levelname, reason)
+            self.dropped[key] = self.dropped.get(key, 0) + 1
+        return False
+
+    def take_dropped(self) -> Dict[tuple, int]:
+        with self._drop_lock:
+            dropped, self.dropped = self.dropped, {}
+        return dropped
+
+    def emit(self, record: logging.LogRecord): # Unused: handle() enqueues directly
+        self.handle(record)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name, "msg": record.getMessage()}
+        fields = getattr(record, "fields", None)
+        if fields: entry.update((k, v) for k, v in fields.items() if v is not None)
+        if record.exc_info: entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if not fields: return line
+        head, sep, trace = line.partition("\n") # Keep fields on the first line, above a traceback
+        return head + " | " + " ".join(f"{k}={v}" for k, v in fields.items() if v is not None) + sep + trace
+
+
+class Flusher:
+    """Background thread: drains the deque every FLUSH_INTERVAL, one write + flush per batch."""
+
+    def __init__(self, records: Deque[logging.LogRecord], handler: QueueingHandler, formatter: logging.Formatter, stream=None):
+        self.records = records
+        self.handler = handler
+        self.formatter = formatter
+        self.stream = stream or sys.stdout
+        self._last_report = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="kc-log-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self._drain()
+            self._report_drops()
+        self._drain()
+        self._report_drops(force=True)
+
+    def _drain(self):
+        while self.records:
+            batch = []
+            try:
+                while len(batch) < BATCH_SIZE: batch.append(self.records.popleft())
+            except IndexError: pass
+            self._write(batch)
+
+    def _write(self, batch: List[logging.LogRecord]):
+        if not batch: return
+        lines = []
+        for record in batch:
+            try: lines.append(self.formatter.format(record))
+            except Exception: lines.append(f"unformattable log record from {record.name}: {record.msg!r}")
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError): pass # Closed or broken pipe: nothing left to report to
+
+    def _report_drops(self, force: bool = False):
+        now = time.monotonic()
+        if now - self._last_report < DROP_REPORT_INTERVAL and not force: return
+        self._last_report = now
+        dropped = self.handler.take_dropped()
+        if not dropped: return
+        record = logging.makeLogRecord({"name": "kc.logs", "levelno": logging.WARNING, "levelname": "WARNING",
+                                        "msg": f"Dropped {sum(dropped.values())} log records since the last report"})
+        record.fields = {"action": "log_dropped", "dropped": {f"{level}:{reason}": n for (level, reason), n in dropped.items()}}
+        self._write([record])
+
+    def close(self, timeout: float = 2.0):
+        """Writes what is queued and stops the thread (atexit)."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+_flusher: Optional[Flusher] = None
+
+def configure_logging():
+    """Routes the root logger through the queue and starts the flusher. Idempotent."""
+    global _flusher
+    if _flusher is not None: return
+    records: Deque[logging.LogRecord] = deque()
+    handler = QueueingHandler(records)
+    _flusher = Flusher(records, handler, JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    # Skip collecting what the formatters never print (thread/process names on every record)
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+    root = logging.getLogger()
+    for existing in root.handlers[:]: root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    import atexit
+    atexit.register(_flusher.close)
+
+
+def log_event(logger: logging.Logger, action: str, message: str, level: int = logging.INFO,
+              room: Optional[str] = None, user: Optional[str] = None, **fields):
+    """Logs one structured record: `action` names the event, `room`/`user` make it queryable."""
+    if not logger.isEnabledFor(level): return
+    # makeRecord + handle skips Logger.findCaller's stack walk; file/line aren't logged anyway
+    logger.handle(logger.makeRecord(logger.name, level, "", 0, message, (), None,
+                                    extra={"fields": {"action": action, "room": room, "user": user, **fields}}))
@@ -0,0 +1,138 @@
+"""
+Minimal Prometheus-style metrics, rendered by GET /metrics (text exposition format 0.0.4).
+
+Built for the hot path: everything runs on the event loop thread, so counters are plain
+attribute increments (no locks), histogram buckets are a preallocated list indexed with
+bisect, and labelled children are created once and cached, so observing allocates nothing
+beyond the float it adds. Gauges for sizes are callbacks evaluated only when /metrics is scraped.
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+LOOP_LAG_INTERVAL = 0.5 # Seconds between event-loop lag probes
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # Last slot is +Inf; the total count is derived at scrape time
+        self.sum = 0.0
+
+    def observe(self, value: float, bisect_left=bisect_left): # Local binding: this runs per message
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Family:
+    """A named metric with fixed label names; children are created on first use and cached."""
+
+    def __init__(self, kind: str, name: str, help: str, labels: Tuple[str, ...] = (), factory: Callable = Counter):
+        self.kind, self.name, self.help, self.label_names = kind, name, help, labels
+        self._factory = factory
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        child = self.children.get(values)
+        if child is None: child = self.children[values] = self._factory()
+        return child
+
+    def render(self, out: List[str]):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in self.children.items():
+            labels = _labels(self.label_names, values)
+            if isinstance(child, Histogram):
+                cumulative = 0
+                for bound, count in zip(self.bounds_of(child), child.counts):
+                    cumulative += count
+                    out.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), values + (bound,))} {cumulative}")
+                out.append(f"{self.name}_sum{labels} {child.sum}")
+                out.append(f"{self.name}_count{labels} {cumulative}")
+            else:
+                out.append(f"{self.name}{labels} {child.value}")
+
+    @staticmethod
+    def bounds_of(histogram: Histogram):
+        return [repr(float(b)) for b in histogram.bounds] + ["+Inf"]
+
+
+class CallbackGauge:
+    """Gauge whose values are read at scrape time: fn() -> {label values tuple: value}."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], fn: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name, self.help, self.label_names, self.fn = name, help, labels, fn
+
+    def render(self, out: List[str]):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} gauge")
+        for values, value in self.fn().items():
+            out.append(f"{self.name}{_labels(self.label_names, values)} {value}")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[object] = []
+        self._lag_task: Optional[asyncio.Task] = None
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Family:
+        return self._add(Family("counter", name, help, labels, Counter))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Family:
+        return self._add(Family("histogram", name, help, labels, lambda: Histogram(buckets)))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]], labels: Tuple[str, ...] = ()) -> CallbackGauge:
+        return self._add(CallbackGauge(name, help, labels, fn))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        out: List[str] = []
+        for metric in self._metrics: metric.render(out)
+        return "\n".join(out) + "\n"
+
+    # --- EVENT LOOP LAG ---
+    def start_loop_monitor(self):
+        if self._lag_task is None: self._lag_task = asyncio.create_task(self._watch_loop())
+
+    def stop_loop_monitor(self):
+        if self._lag_task: self._lag_task.cancel()
+        self._lag_task = None
+
+    async def _watch_loop(self):
+        lag = LOOP_LAG.labels()
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag.observe(max(0.0, time.perf_counter() - started - LOOP_LAG_INTERVAL))
+
+
+metrics = MetricsRegistry()
+
+# --- METRICS SHARED ACROSS MODULES ---
+LOOP_LAG = metrics.histogram("kc_event_loop_lag_seconds", "How late the event loop ran a timer that was due")
+DISCORD_LATENCY = metrics.histogram("kc_discord_request_seconds", "Discord REST call latency", ("route",))
+DISCORD_RESPONSES = metrics.counter("kc_discord_responses_total", "Discord REST responses by status (error = transport failure)", ("route", "status"))
@@ -0,0 +1,69 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+# Common character substitutions used to dodge filters ("5p4m" -> "spam").
+# Matched as character classes so punctuation keeps working as a word boundary ("spam!").
+LEET_VARIANTS = {
+    "a": "4@", "b": "8", "e": "3€", "g": "9", "i": "1!|", "l": "1|", "o": "0", "s": "5$", "t": "7+", "z": "2",
+}
+
+# Up to 3 spaces/punctuation may be inserted between letters ("s.p.a.m", "s p a m")
+SEPARATOR = r"[\W_]{0,3}"
+_END = ""
+
+
+def normalize(text: str) -> str:
+    """Case-folds and strips accents/width variants ("Ｓｐáｍ" -> "spam")."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.casefold()
+
+
+class WordMatcher:
+    """
+    Scans a text once against the whole banned-word list.
+    The words are folded into a trie and compiled into a single regex, so the cost per
+    check depends on the text length rather than on the number of words.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words: List[str] = sorted({normalize(w.strip()) for w in words if w and w.strip()})
+        self.pattern = self._compile(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def search(self, text: str) -> Optional[str]:
+        """Returns the first banned term found in `text`, or None."""
+        if not text or self.pattern is None: return None
+        match = self.pattern.search(normalize(text))
+        return match.group(0) if match else None
+
+    @classmethod
+    def _compile(cls, words: List[str]) -> Optional[re.Pattern]:
+        if not words: return None
+        trie: Dict = {}
+        for word in words:
+            node = trie
+            for ch in word: node = node.setdefault(ch, {})
+            node[_END] = True
+        # Whole-word match: not preceded or followed by a letter/digit
+        return re.compile(rf"(?<![^\W_])(?:{cls._trie_regex(trie)})(?![^\W_])")
+
+    @classmethod
+    def _trie_regex(cls, node: Dict) -> str:
+        branches = []
+        for ch, child in node.items():
+            if ch == _END: continue
+            # Repeated letters are tolerated too ("spaaam")
+            variants = LEET_VARIANTS.get(ch)
+            atom = f"[{re.escape(ch + variants)}]" if variants else re.escape(ch)
+            if ch.isalnum(): atom += "+"
+            rest = cls._trie_regex(child)
+            branches.append(f"{atom}{SEPARATOR}{rest}" if rest else atom)
+        if not branches: return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if _END in node: body = f"(?:{body})?"
+        return body
@@ -0,0 +1,105 @@
+import os
+import asyncio
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from fastapi import HTTPException
+from utils.startup import load_env
+
+if TYPE_CHECKING: import httpx # Imported with the first client, off the cold-start path
+
+load_env()
+
+TOKEN_URL = os.getenv("DISCORD_OAUTH_URL", "https://discord.com/api/oauth2/token")
+MAX_CONCURRENT_EXCHANGES = int(os.getenv("KC_OAUTH_CONCURRENCY", "16"))
+RESULT_TTL = 30.0 # Seconds a successful exchange is remembered for client retries (codes are single-use)
+EXCHANGE_TIMEOUT = 5.0 # Seconds for the whole upstream call; httpx's timeouts apply to each connect/read/write separately
+
+
+class OAuthClient:
+    """
+    Async Discord OAuth2 code exchange over a pooled connection.
+    Concurrent requests for the same code share one upstream call (single-flight),
+    and the number of simultaneous upstream calls is capped.
+    """
+
+    def __init__(self):
+        self.client_id = os.getenv("DISCORD_CLIENT_ID")
+        self.client_secret = os.getenv("DISCORD_CLIENT_SECRET")
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXCHANGES)
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._results: Dict[Tuple[str, str], Tuple[float, dict]] = {} # key -> (expires_at, token)
+
+    @property
+    def pool_ready(self) -> bool:
+        return self._client is not None
+
+    async def warm_up(self):
+        """Builds the pooled client off the event loop and opens a connection for the launch's token exchange."""
+        if self._client is None:
+            client = await asyncio.to_thread(self._new_client)
+            # An exchange may have built one on the loop meanwhile: keep that one rather than leak this
+            if self._client is None: self._client = client
+            else: await client.aclose()
+        if not self.client_id: return
+        import httpx
+        try: await self._client.head(TOKEN_URL) # Any status will do: the connection stays in the pool
+        except httpx.HTTPError: pass
+
+    def _http(self) -> "httpx.AsyncClient":
+        # Only called on the event loop, so there is never a second client
+        if self._client is None: self._client = self._new_client()
+        return self._client
+
+    @staticmethod
+    def _new_client() -> "httpx.AsyncClient":
+        import httpx
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(5.0, connect=3.0),
+            limits=httpx.Limits(max_connections=MAX_CONCURRENT_EXCHANGES, max_keepalive_connections=MAX_CONCURRENT_EXCHANGES),
+        )
+
+    async def exchange(self, code: str, redirect_uri: str) -> dict:
+        key = (code, redirect_uri)
+        cached = self._results.get(key)
+        if cached and cached[0] > time.monotonic(): return cached[1]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._exchange(code, redirect_uri))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one impatient client can't cancel the exchange for everyone else
+        token = await asyncio.shield(future)
+        self._remember(key, token)
+        return token
+
+    def _remember(self, key: Tuple[str, str], token: dict):
+        now = time.monotonic()
+        self._results = {k: v for k, v in self._results.items() if v[0] > now}
+        self._results[key] = (now + RESULT_TTL, token)
+
+    async def _exchange(self, code: str, redirect_uri: str) -> dict:
+        client = self._http()
+        import httpx
+        data = {'client_id': self.client_id, 'client_secret': self.client_secret, 'grant_type': 'authorization_code', 'code': code, 'redirect_uri': redirect_uri}
+        async with self._semaphore:
+            try:
+                r = await asyncio.wait_for(client.post(TOKEN_URL, data=data, headers={'Content-Type': 'application/x-www-form-urlencoded'}), EXCHANGE_TIMEOUT)
+            except (httpx.TimeoutException, asyncio.TimeoutError):
+                raise HTTPException(status_code=504, detail="Discord token exchange timed out")
+            except httpx.HTTPError as e:
+                raise HTTPException(status_code=502, detail=f"Discord token exchange failed: {e!r}")
+        if r.status_code != 200:
+            try: detail = r.json()
+            except ValueError: detail = r.text
+            raise HTTPException(status_code=400, detail=detail)
+        return r.json()
+
+    async def aclose(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+
+oauth_client = OAuthClient()
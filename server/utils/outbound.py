@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from utils.error_handler import handle_error, log_info
+from utils.wire_codec import JSON, Codec, Payload
+
+# Backpressure settings
+SEND_QUEUE_SIZE = int(os.getenv("KC_SEND_QUEUE_SIZE", "64"))           # Max queued messages per client
+SLOW_CLIENT_TIMEOUT = float(os.getenv("KC_SLOW_CLIENT_TIMEOUT", "10"))  # Seconds a client may stay full/stalled
+
+_STATE = object() # Queue marker: "send the pending state messages here"
+_closing: Set[asyncio.Task] = set() # Eviction closes in flight (the loop only keeps weak references to tasks)
+
+
+class OutboundQueue:
+    """
+    Bounded send queue + writer task for one WebSocket.
+    One-shot events (sound, objection_event, error...) are delivered in order; once the queue
+    holds max_size items, further ones are dropped.
+    State messages (update/patch) are coalesced: a client that falls behind receives the
+    pending patches merged into one, instead of every intermediate version.
+    A client whose queue stays full (or whose send stalls) past SLOW_CLIENT_TIMEOUT is evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, codec: Codec = JSON, max_size: int = SEND_QUEUE_SIZE, slow_timeout: float = SLOW_CLIENT_TIMEOUT):
+        self.websocket = websocket
+        self.codec = codec # How this client wants messages encoded (see utils/wire_codec.py)
+        self.max_size = max_size
+        self.slow_timeout = slow_timeout
+        self.closed = False
+        self.full_since: Optional[float] = None
+        self._items: deque = deque()         # encoded events or the _STATE marker
+        self._state: List[tuple] = []        # pending (payload, message) state messages
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    def put(self, payload: Payload, message: dict):
+        """Queues a message already encoded with `self.codec`. Never blocks the caller."""
+        if self.closed: return
+        full = len(self._items) >= self.max_size
+        if full:
+            now = time.monotonic()
+            if self.full_since is None: self.full_since = now
+            elif now - self.full_since > self.slow_timeout:
+                self.evict("queue full")
+                return
+        else:
+            self.full_since = None
+
+        if message.get("type") in ("update", "patch"):
+            if message["type"] == "update": self._state.clear() # A snapshot supersedes older patches
+            if not self._state: self._items.append(_STATE) # At most one marker: bounded even when full
+            self._state.append((payload, message))
+            if len(self._state) > self.max_size: self._fold_state()
+        elif full: return # Dropped: the queue is bounded, state catches the client up
+        else:
+            self._items.append(payload)
+        self._wakeup.set()
+
+    def _fold_state(self):
+        """Merges the pending patches into one so a stalled client's state stays one message."""
+        head = [self._state.pop(0)] if self._state[0][1]["type"] == "update" else []
+        merged = merge_patches([m for _, m in self._state])
+        self._state = head + [(self.codec.encode(merged), merged)]
+
+    def evict(self, reason: str):
+        if self.closed: return
+        log_info(f"Evicting slow client ({reason})", "evict_slow_client", reason=reason)
+        self.close()
+        task = asyncio.ensure_future(self._close_socket())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+    def close(self):
+        self.closed = True
+        self._items.clear()
+        self._state.clear()
+        self._task.cancel()
+
+    async def _close_socket(self):
+        try: await self.websocket.close(code=1008)
+        except Exception: pass
+
+    def _take_state(self) -> List[Payload]:
+        pending, self._state = self._state, []
+        out = []
+        if pending and pending[0][1]["type"] == "update": out.append(pending.pop(0)[0])
+        if len(pending) == 1: out.append(pending[0][0])
+        elif pending: out.append(self.codec.encode(merge_patches([m for _, m in pending])))
+        return out
+
+    async def _writer(self):
+        try:
+            while True:
+                if not self._items:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                item = self._items.popleft()
+                for payload in (self._take_state() if item is _STATE else [item]):
+                    send = self.websocket.send_bytes if isinstance(payload, bytes) else self.websocket.send_text
+                    await asyncio.wait_for(send(payload), self.slow_timeout)
+        except asyncio.CancelledError: pass
+        except asyncio.TimeoutError: self.evict("send stalled")
+        except WebSocketDisconnect: self.close() # Client went away mid-send; the receive loop cleans up
+        except Exception as e:
+            handle_error(e, "outbound_writer")
+            self.close()
+
+
+def merge_patches(patches: List[dict]) -> dict:
+    """Folds consecutive patches into one. `base` is the version the client must already have."""
+    merged = {"type": "patch", "base": patches[0].get("base", patches[0]["version"] - 1), "version": patches[-1]["version"], "data": {}}
+    logs: list = []
+    for patch in patches:
+        merged["data"].update(patch["data"])
+        logs.extend(patch.get("logs", ()))
+        if "server_time" in patch: merged["server_time"] = patch["server_time"]
+    if logs: merged["logs"] = logs[-50:]
+    return merged
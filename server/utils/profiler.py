@@ -0,0 +1,100 @@
+"""
+On-demand sampling profiler for the live process, served by GET /admin/profile.
+
+Nothing runs until a profile is requested: a daemon thread then wakes every `interval`
+seconds, reads the event loop thread's stack from sys._current_frames() and tags it with
+the asyncio task that is running at that moment, so time shows up per task (a websocket
+loop, the journal flusher, a Discord send) as well as per function. With all_threads,
+worker threads (asyncio.to_thread, the journal writer) are sampled too.
+
+Output is the collapsed-stack format ("root;caller;callee count" per line) read by
+flamegraph.pl, speedscope and inferno.
+
+Also holds the optional slow-callback detector: KC_SLOW_CALLBACK_MS > 0 logs every message
+handler or broadcast that held the loop longer than that.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Dict
+
+from utils.logs import log_event
+
+MAX_SECONDS = 60           # Longest profile one request can ask for
+DEFAULT_INTERVAL = 0.005   # Seconds between samples
+
+SLOW_CALLBACK_MS = float(os.getenv("KC_SLOW_CALLBACK_MS", "0"))
+SLOW_CALLBACK_SECONDS = SLOW_CALLBACK_MS / 1000 if SLOW_CALLBACK_MS > 0 else float("inf") # inf: never slow, so off costs one compare
+
+logger = logging.getLogger("kc.profiler")
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._running = False
+        self._labels: Dict[object, str] = {} # code object -> frame label, reused across samples
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(self, seconds: float, interval: float = DEFAULT_INTERVAL, all_threads: bool = False) -> str:
+        """Samples the running process for `seconds` and returns collapsed stacks."""
+        if self._running: raise ProfilerBusy("a profile is already running")
+        self._running = True
+        stacks: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, name="kc-profiler", daemon=True,
+                                   args=(asyncio.get_running_loop(), threading.get_ident(), stop, interval, all_threads, stacks))
+        sampler.start()
+        try: await asyncio.sleep(min(seconds, MAX_SECONDS))
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            self._running = False
+            self._labels.clear()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def _sample(self, loop, loop_thread: int, stop: threading.Event, interval: float, all_threads: bool, stacks: Counter):
+        me = threading.get_ident()
+        while not stop.wait(interval):
+            names = {t.ident: t.name for t in threading.enumerate()} if all_threads else {}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (ident != loop_thread and not all_threads): continue
+                root = self._task_root(loop) if ident == loop_thread else "thread:" + names.get(ident, str(ident))
+                stacks[root + ";" + self._collapse(frame)] += 1
+
+    def _task_root(self, loop) -> str:
+        try: task = asyncio.current_task(loop)
+        except RuntimeError: task = None
+        if task is None: return "loop" # Between callbacks: polling for I/O or running plain callbacks
+        coro = task.get_coro()
+        return "task:" + getattr(coro, "__qualname__", type(coro).__name__)
+
+    def _collapse(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+                label = self._labels[code] = f"{module}:{getattr(code, 'co_qualname', code.co_name)}".replace(";", ":").replace(" ", "_")
+            labels.append(label)
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+
+def report_slow(what: str, elapsed: float, **fields):
+    """Logs a handler/broadcast that exceeded KC_SLOW_CALLBACK_MS (callers compare against SLOW_CALLBACK_SECONDS)."""
+    log_event(logger, "slow_callback", f"🐢 Slow {what}: {elapsed * 1000:.1f} ms blocking the loop", logging.WARNING,
+              callback=what, elapsed_ms=round(elapsed * 1000, 1), **fields)
+
+
+profiler = SamplingProfiler()
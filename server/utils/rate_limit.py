@@ -0,0 +1,21 @@
+"""Token bucket shared by the inbound message limiter and the log rate limits."""
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = rate if burst is None else burst # Default: one second's worth
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1: return False
+        self.tokens -= 1
+        return True
@@ -0,0 +1,275 @@
+"""
+Shared registry state for running several workers.
+
+The GameRegistry keeps live rooms in process memory; everything that has to be visible to
+every worker goes through a RegistryBackend:
+  * pending cases filed by `/accuse` (any worker) and picked up by `/ws` (the room owner)
+  * room ownership: the first worker to claim an instance_id hosts that room
+  * pub/sub, used to relay sockets that land on a worker which doesn't own their room
+
+MemoryBackend is the single-process default. BrokerBackend talks to `utils/broker.py`
+(newline-delimited JSON over TCP) and is enabled with KC_REGISTRY_URL=tcp://host:port.
+"""
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+import os
+import socket
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from utils import fastjson
+from utils.error_handler import handle_error, log_info
+from utils.ttl_cache import TTLCache
+
+Handler = Callable[[dict], Awaitable]
+
+# /accuse cases nobody launches the activity for are dropped after a while
+PENDING_CASE_TTL = float(os.getenv("KC_PENDING_CASE_TTL", "900"))
+PENDING_CASE_MAX = int(os.getenv("KC_PENDING_CASE_MAX", "10000"))
+
+# Largest frame relayed to a client (a big room's snapshot). Relayed frames are JSON escaped inside JSON
+# (up to twice as long), so both ends of a broker connection read lines of up to LINE_LIMIT bytes
+MAX_RELAYED_FRAME_BYTES = int(os.getenv("KC_MAX_RELAYED_FRAME_BYTES", str(4 * 1024 * 1024)))
+LINE_LIMIT = 2 * MAX_RELAYED_FRAME_BYTES + 64 * 1024
+WORKERS_CHANNEL = "workers" # The broker announces {"op": "gone", "worker"} here when a room owner disconnects
+
+
+class Subscription:
+    """Delivers messages for one channel to its handler in order, on a task of its own."""
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    def deliver(self, message: dict):
+        self.queue.put_nowait(message)
+
+    async def _run(self):
+        while True:
+            message = await self.queue.get()
+            try: await self.handler(message)
+            except Exception as e: handle_error(e, "subscription_handler")
+
+    def close(self):
+        self.task.cancel()
+
+
+class RegistryBackend(ABC):
+    """Interface for the state shared between workers. A backend missing a method fails when it is created."""
+    on_reconnect: Optional[Callable[[], Awaitable]] = None # Called after a lost connection is restored
+
+    async def start(self): pass
+    async def close(self): pass
+    def sweep(self): pass # Drops expired local state (called periodically by the registry)
+    def pending_case_count(self) -> Optional[int]: return None # None when held elsewhere
+
+    @abstractmethod
+    async def put_pending_case(self, channel_id: str, case: dict): ...
+
+    @abstractmethod
+    async def pop_pending_case(self, channel_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def claim_room(self, instance_id: str, worker_id: str) -> str:
+        """Claims the room if nobody owns it yet. Returns the owning worker id."""
+
+    @abstractmethod
+    async def release_room(self, instance_id: str, worker_id: str): ...
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict):
+        """Delivers to the channel's subscriber. Waits while the transport is backed up, so callers feel backpressure."""
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: Handler): ...
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str): ...
+
+
+class MemoryBackend(RegistryBackend):
+    """Single-process backend: plain dicts, pub/sub delivered locally."""
+
+    def __init__(self):
+        self.pending_cases = TTLCache(PENDING_CASE_TTL, PENDING_CASE_MAX) # channel_id -> case_data
+        self.owners: Dict[str, str] = {}         # instance_id -> worker_id
+        self._subs: Dict[str, Subscription] = {}
+
+    async def put_pending_case(self, channel_id: str, case: dict):
+        self.pending_cases.set(channel_id, case)
+
+    async def pop_pending_case(self, channel_id: str) -> Optional[dict]:
+        return self.pending_cases.pop(channel_id)
+
+    def sweep(self):
+        self.pending_cases.sweep()
+
+    def pending_case_count(self) -> Optional[int]:
+        return len(self.pending_cases)
+
+    async def claim_room(self, instance_id: str, worker_id: str) -> str:
+        return self.owners.setdefault(instance_id, worker_id)
+
+    async def release_room(self, instance_id: str, worker_id: str):
+        if self.owners.get(instance_id) == worker_id: del self.owners[instance_id]
+
+    async def publish(self, channel: str, message: dict):
+        sub = self._subs.get(channel)
+        if sub: sub.deliver(message)
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self._subs[channel] = Subscription(handler)
+
+    async def unsubscribe(self, channel: str):
+        sub = self._subs.pop(channel, None)
+        if sub: sub.close()
+
+    async def close(self):
+        for sub in self._subs.values(): sub.close()
+        self._subs.clear()
+
+
+class BrokerBackend(RegistryBackend):
+    """Networked backend: a client for utils/broker.py. Reconnects and resubscribes on failure."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._subs: Dict[str, Subscription] = {}
+        self._connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self._connect()
+        self._task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self._task: self._task.cancel()
+        for sub in self._subs.values(): sub.close()
+        if self._writer: self._writer.close()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT)
+        self._connected.set()
+
+    async def _read_loop(self):
+        while True:
+            try:
+                line = await self._reader.readline()
+                if not line: raise ConnectionError("broker closed the connection")
+                message = fastjson.loads(line)
+                if "id" in message:
+                    future = self._pending.pop(message["id"], None)
+                    if future and not future.done():
+                        if "error" in message: future.set_exception(RuntimeError(message["error"]))
+                        else: future.set_result(message.get("result"))
+                elif message.get("op") == "message":
+                    sub = self._subs.get(message["channel"])
+                    if sub: sub.deliver(message["data"])
+            except asyncio.CancelledError: raise
+            except Exception as e:
+                handle_error(e, "broker_connection")
+                await self._reconnect()
+
+    async def _reconnect(self):
+        self._connected.clear()
+        for future in self._pending.values():
+            if not future.done(): future.set_exception(ConnectionError("broker connection lost"))
+        self._pending.clear()
+        delay = 0.5
+        while True:
+            try:
+                await self._connect()
+                break
+            except OSError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10.0)
+        log_info("Reconnected to registry broker")
+        for channel in self._subs: self._write({"op": "subscribe", "channel": channel})
+        if self.on_reconnect: asyncio.create_task(self.on_reconnect())
+
+    def _write(self, message: dict):
+        line = fastjson.dumps(message) + b"\n"
+        # The broker would drop the whole connection (and free every room this worker owns) on an overlong line
+        if len(line) > LINE_LIMIT: raise ValueError(f"{len(line)} B message is over the broker's {LINE_LIMIT} B line limit")
+        self._writer.write(line)
+
+    async def _request(self, op: str, **params):
+        # Written synchronously when connected, so requests reach the broker in call order
+        if not self._connected.is_set(): await asyncio.wait_for(self._connected.wait(), 10.0)
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._write({"id": request_id, "op": op, **params})
+        try:
+            await self._writer.drain()
+            return await asyncio.wait_for(future, 5.0)
+        finally: self._pending.pop(request_id, None)
+
+    async def put_pending_case(self, channel_id: str, case: dict):
+        await self._request("put", key=channel_id, value=case)
+
+    async def pop_pending_case(self, channel_id: str) -> Optional[dict]:
+        return await self._request("pop", key=channel_id)
+
+    async def claim_room(self, instance_id: str, worker_id: str) -> str:
+        return await self._request("claim", room=instance_id, worker=worker_id)
+
+    async def release_room(self, instance_id: str, worker_id: str):
+        await self._request("release", room=instance_id, worker=worker_id)
+
+    async def publish(self, channel: str, message: dict):
+        # No reply to wait for (ordering is guaranteed by the single broker connection), but wait out a full
+        # transport buffer: a slow broker then backs up the senders' OutboundQueues, which coalesce or evict
+        if not self._connected.is_set(): await asyncio.wait_for(self._connected.wait(), 10.0)
+        self._write({"op": "publish", "channel": channel, "data": message})
+        await self._writer.drain()
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self._subs[channel] = Subscription(handler)
+        await self._request("subscribe", channel=channel)
+
+    async def unsubscribe(self, channel: str):
+        sub = self._subs.pop(channel, None)
+        if sub: sub.close()
+        if self._connected.is_set(): self._write({"op": "unsubscribe", "channel": channel})
+
+
+class RelayedSocket:
+    """
+    Stands in for a WebSocket that is connected to another worker.
+    GameManager wraps it in an OutboundQueue like a local socket; frames are forwarded over
+    pub/sub. send_text waits while the broker connection is backed up, so a slow broker fills
+    that queue and gets the same coalescing and slow-client eviction as a slow local client.
+    """
+
+    def __init__(self, backend: RegistryBackend, conn_id: str):
+        self.backend = backend
+        self.conn_id = conn_id
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.backend.publish(f"conn:{self.conn_id}", {"op": "send", "text": text})
+
+    async def close(self, code: int = 1000):
+        await self.backend.publish(f"conn:{self.conn_id}", {"op": "close", "code": code})
+
+
+def default_worker_id() -> str:
+    return os.getenv("KC_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def create_backend() -> RegistryBackend:
+    """Builds the backend selected by KC_REGISTRY_URL (unset = in-process memory)."""
+    url = os.getenv("KC_REGISTRY_URL")
+    if not url: return MemoryBackend()
+    parsed = urlparse(url)
+    if parsed.scheme != "tcp": raise ValueError(f"Unsupported KC_REGISTRY_URL scheme: {parsed.scheme}")
+    return BrokerBackend(parsed.hostname or "127.0.0.1", parsed.port or 7400)
@@ -0,0 +1,46 @@
+"""
+Session resume for clients that drop and reconnect (mobile Discord does this constantly).
+
+Every connection gets a resume token in a `session` message. A client that reconnects with
+`?resume=<token>&since=<last version it applied>` gets only the patches it missed, replayed
+from a short per-room buffer, instead of a full snapshot. If the version has already fallen
+out of the buffer it gets the snapshot as before.
+
+A player who drops keeps their seat for KC_RESUME_GRACE seconds: the judge handover and the
+accused's contempt verdict only happen if they are still gone when the grace runs out.
+"""
+import os
+import secrets
+from collections import deque
+from typing import List, Optional
+
+RESUME_GRACE = float(os.getenv("KC_RESUME_GRACE", "15"))            # Seconds a dropped player keeps their role; 0 = act at once
+REPLAY_BUFFER_SIZE = int(os.getenv("KC_REPLAY_BUFFER_SIZE", "64"))  # Patches kept per room for resuming clients
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class ReplayBuffer:
+    """The last few patches a room broadcast, in version order."""
+    __slots__ = ("size", "_patches")
+
+    def __init__(self, size: int = REPLAY_BUFFER_SIZE):
+        self.size = size
+        self._patches: Optional[deque] = None # Created on the first patch: most rooms are idle most of the time
+
+    def append(self, patch: dict):
+        if self._patches is None: self._patches = deque(maxlen=self.size)
+        self._patches.append(patch)
+
+    def clear(self):
+        self._patches = None
+
+    def since(self, version: int, current: int) -> Optional[List[dict]]:
+        """Patches after `version` up to `current`, or None when the gap can't be bridged from the buffer."""
+        if version == current: return []
+        if version > current or not self._patches: return None
+        first = self._patches[0]["version"]
+        if version < first - 1: return None
+        return [patch for patch in self._patches if patch["version"] > version]
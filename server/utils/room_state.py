@@ -0,0 +1,108 @@
+"""
+Compact per-room trial state.
+
+Slotted objects instead of nested dicts, voters as a sorted list (an O(log n) duplicate-vote
+check at 8 B per voter; a set costs ~80) and logs in a bounded deque. `wire()`/`to_wire()`
+produce the JSON shape the client expects.
+"""
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Deque, Iterable, List, Optional
+
+MAX_LOGS = 50
+TRIAL_SECONDS = 60
+
+
+class Party:
+    """The accused or the witness."""
+    __slots__ = ("id", "username", "avatar")
+
+    def __init__(self, id: Optional[str] = None, username: Optional[str] = None, avatar: Optional[str] = None):
+        self.id = id
+        self.username = username
+        self.avatar = avatar
+
+    @classmethod
+    def from_wire(cls, data: Optional[dict], default_username: Optional[str] = None) -> "Party":
+        data = data or {}
+        return cls(data.get("id"), data.get("username", default_username), data.get("avatar"))
+
+    def to_wire(self) -> dict:
+        return {"id": self.id, "username": self.username, "avatar": self.avatar}
+
+
+class Voters(list):
+    """User ids that voted, kept sorted so membership is a binary search."""
+    __slots__ = ()
+
+    def __init__(self, user_ids: Iterable[str] = ()):
+        super().__init__(sorted(set(user_ids)))
+
+    def __contains__(self, user_id: object) -> bool:
+        if not isinstance(user_id, str): return False # e.g. None for a socket that already left
+        i = bisect_left(self, user_id)
+        return i < len(self) and self[i] == user_id
+
+    def add(self, user_id: str):
+        i = bisect_left(self, user_id)
+        if i == len(self) or self[i] != user_id: self.insert(i, user_id)
+
+
+class RoomState:
+    __slots__ = ("guilty", "innocent", "crime", "verdict", "judge_id", "accused", "witness",
+                 "voters", "evidence", "logs", "timer", "deadline", "sentence")
+
+    WIRE_KEYS = ("votes", "crime", "verdict", "judge_id", "accused", "witness",
+                 "voters", "evidence", "logs", "timer", "deadline", "sentence")
+
+    def __init__(self):
+        self.guilty = 0
+        self.innocent = 0
+        self.crime = ""
+        self.verdict: Optional[str] = None # 'guilty' | 'innocent' | None
+        self.judge_id: Optional[str] = None
+        self.accused = Party(username="Unknown")
+        self.witness = Party()
+        self.voters = Voters()
+        self.evidence: List[dict] = [] # List of {id, text, author}
+        self.logs: Deque[dict] = deque(maxlen=MAX_LOGS) # List of {message, type}
+        self.timer = TRIAL_SECONDS # Voting timer in seconds
+        self.deadline: Optional[float] = None # Epoch seconds when voting closes (clients count down locally)
+        self.sentence: Optional[str] = None # The punishment if guilty
+
+    def reset_votes(self):
+        self.guilty = self.innocent = 0
+        self.voters = Voters()
+
+    def wire(self, key: str) -> Any:
+        """One top-level key in the client's format (for patches)."""
+        if key == "votes": return {"guilty": self.guilty, "innocent": self.innocent}
+        value = getattr(self, key)
+        if key == "voters" or key == "logs" or key == "evidence": return list(value) # Copies: patches must not see later appends
+        if key == "accused" or key == "witness": return value.to_wire()
+        return value
+
+    def to_wire(self) -> dict:
+        return {key: self.wire(key) for key in self.WIRE_KEYS}
+
+    def to_audience_wire(self, user_id: Optional[str]) -> dict:
+        """Snapshot for a room in audience mode: the voters list becomes a count plus this client's own flag."""
+        data = {key: self.wire(key) for key in self.WIRE_KEYS if key != "voters"}
+        data["voters"] = [] # Kept (empty) for clients that predate audience mode
+        data["voter_count"], data["you_voted"] = len(self.voters), user_id in self.voters
+        return data
+
+    @classmethod
+    def from_wire(cls, data: dict) -> "RoomState":
+        """Rebuilds a state from (possibly partial) wire data, e.g. a journal snapshot."""
+        state = cls()
+        votes = data.get("votes") or {}
+        state.guilty, state.innocent = votes.get("guilty", 0), votes.get("innocent", 0)
+        for key in ("crime", "verdict", "judge_id", "timer", "deadline", "sentence"):
+            if key in data: setattr(state, key, data[key])
+        if "accused" in data: state.accused = Party.from_wire(data["accused"], "Unknown")
+        if "witness" in data: state.witness = Party.from_wire(data["witness"])
+        state.voters = Voters(data.get("voters") or ())
+        state.evidence = list(data.get("evidence") or ())
+        state.logs.extend(data.get("logs") or ())
+        return state
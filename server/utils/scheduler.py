@@ -0,0 +1,81 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from utils.error_handler import handle_error
+
+
+class DeadlineScheduler:
+    """
+    Process-wide deadline scheduler.
+    Keeps every room's deadline in one heap and arms a single loop timer for the
+    earliest one, so the loop only wakes up when a deadline is actually due.
+    Deadlines are absolute wall-clock timestamps (time.time()).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._entries: Dict[Any, Tuple[float, int, Callable[[], Awaitable]]] = {} # key -> (deadline, seq, callback)
+        self._seq = itertools.count()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_for: Optional[float] = None
+        self._running: Set[asyncio.Task] = set() # The loop only keeps weak references to tasks
+        self.wakeups = 0 # Number of times the loop timer fired
+        self.fired = 0   # Number of deadlines executed
+
+    def schedule(self, key: Any, deadline: float, callback: Callable[[], Awaitable]):
+        """Sets (or replaces) the deadline for `key`. Must be called from inside the event loop."""
+        seq = next(self._seq)
+        self._entries[key] = (deadline, seq, callback)
+        heapq.heappush(self._heap, (deadline, seq, key))
+        if self._armed_for is None or deadline < self._armed_for: self._arm()
+
+    def cancel(self, key: Any):
+        # Heap entries are dropped lazily when they reach the top
+        self._entries.pop(key, None)
+
+    def deadline_of(self, key: Any) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _is_live(self, item: Tuple[float, int, Any]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[1] == item[1]
+
+    def _arm(self):
+        while self._heap and not self._is_live(self._heap[0]): heapq.heappop(self._heap)
+        if self._handle: self._handle.cancel()
+        if not self._heap:
+            self._handle, self._armed_for = None, None
+            return
+        deadline = self._heap[0][0]
+        loop = asyncio.get_running_loop()
+        self._handle = loop.call_later(max(0.0, deadline - time.time()), self._fire)
+        self._armed_for = deadline
+
+    def _fire(self):
+        self.wakeups += 1
+        self._handle, self._armed_for = None, None
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            item = heapq.heappop(self._heap)
+            if not self._is_live(item): continue
+            _, _, callback = self._entries.pop(item[2])
+            self.fired += 1
+            task = asyncio.ensure_future(self._run(callback))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        self._arm()
+
+    @staticmethod
+    async def _run(callback: Callable[[], Awaitable]):
+        try: await callback()
+        except Exception as e: handle_error(e, "scheduler_callback")
+
+
+scheduler = DeadlineScheduler()
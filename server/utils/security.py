@@ -1,4 +1,9 @@
+import os
 import re
+import threading
+import time
+from typing import Iterable, Optional
+from utils.moderation import WordMatcher
 
 class SecurityService:
     # Basic filter - in a real prod app, use a comprehensive library
@@ -6,18 +11,62 @@ class SecurityService:
         "badword1", "badword2", "spam", "toxic" # Add common profanity here
     ]
 
+    # Optional word list file (one term per line, '#' for comments). Reloaded when it changes.
+    WORD_LIST_PATH = os.getenv("KC_BANNED_WORDS_FILE")
+    RELOAD_CHECK_INTERVAL = 5.0 # Seconds between mtime checks
+
+    _matcher: Optional[WordMatcher] = None
+    _loaded_mtime: Optional[float] = None
+    _next_reload_check = 0.0
+    _reloading = False
+
     @classmethod
     def is_clean(cls, text: str) -> bool:
         """Checks if text contains banned words."""
         if not text:
             return True
-        
-        # Simple case-insensitive check
-        text_lower = text.lower()
-        for word in cls.BANNED_WORDS:
-            if re.search(rf"\b{word}\b", text_lower):
-                return False
-        return True
+
+        return cls.matcher().search(text) is None
+
+    @classmethod
+    def matcher(cls) -> WordMatcher:
+        """Returns the compiled matcher, picking up word list changes without a restart."""
+        now = time.monotonic()
+        if cls._matcher is None or (cls.WORD_LIST_PATH and now >= cls._next_reload_check):
+            cls._next_reload_check = now + cls.RELOAD_CHECK_INTERVAL
+            cls._reload_if_changed()
+        return cls._matcher
+
+    @classmethod
+    def load_words(cls, words: Iterable[str]):
+        """Swaps in a new word list (the matcher is replaced atomically)."""
+        cls._matcher = WordMatcher(words)
+
+    @classmethod
+    def _reload_if_changed(cls):
+        path = cls.WORD_LIST_PATH
+        if not path or not os.path.exists(path):
+            if cls._matcher is None: cls.load_words(cls.BANNED_WORDS)
+            return
+        mtime = os.path.getmtime(path)
+        if cls._matcher is not None and (mtime == cls._loaded_mtime or cls._reloading): return
+
+        if cls._matcher is None:
+            cls._load_file(path, mtime) # First load: nothing to fall back on yet
+        else:
+            # Large lists take a while to compile, so rebuild off the event loop and swap when ready
+            cls._reloading = True
+            threading.Thread(target=cls._load_file, args=(path, mtime), daemon=True).start()
+
+    @classmethod
+    def _load_file(cls, path: str, mtime: float):
+        try:
+            with open(path, encoding="utf-8") as f:
+                words = [line.split("#", 1)[0].strip() for line in f]
+            cls.load_words(cls.BANNED_WORDS + words)
+            cls._loaded_mtime = mtime
+        finally:
+            cls._reloading = False
 
     @classmethod
     def sanitize(cls, text: str) -> str:
@@ -0,0 +1,46 @@
+"""
+Cold start (Render sleeps idle instances and wakes them on the next request).
+
+Everything between `uvicorn main:app` and the first WebSocket accept is paid by the
+player who launched the Activity, so:
+  - Modules that only some requests need (httpx and its TLS context, nacl) are imported
+    on first use, and warmed in the background right after startup (see main.warm_up).
+  - .env is only parsed when there is one (local development). Hosted instances get real
+    environment variables and never import python-dotenv.
+  - main.py measures its own import time against KC_IMPORT_BUDGET_MS, and
+    benchmarks/bench_startup.py fails when the budget or time-to-first-accept regresses.
+  - Readiness collects the checks behind /readyz (caches loaded, HTTP pools created).
+"""
+import os
+from typing import Callable, Dict, Tuple
+
+
+def load_env():
+    """Loads the nearest .env (server/ or a parent), like python-dotenv's find_dotenv, if there is one."""
+    directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+        parent = os.path.dirname(directory)
+        if parent == directory: return
+        directory = parent
+
+
+class Readiness:
+    """Named warm-up checks for /readyz; each returns True once its part is warm."""
+
+    def __init__(self):
+        self._checks: Dict[str, Callable[[], bool]] = {}
+
+    def check(self, name: str, fn: Callable[[], bool]):
+        self._checks[name] = fn
+
+    def report(self) -> Tuple[bool, Dict[str, bool]]:
+        checks = {name: bool(fn()) for name, fn in self._checks.items()}
+        return all(checks.values()), checks
+
+
+readiness = Readiness()
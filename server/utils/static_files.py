@@ -0,0 +1,230 @@
+"""
+Static serving for the built client (../client/dist), tuned for Activity launch storms.
+
+At startup every file is indexed once: size, content type, a strong ETag from its content
+hash (one per encoding: "<hash>", "<hash>-br", "<hash>-gz") and its cache policy. Text assets (JS, CSS, HTML, JSON, SVG) then get brotli and gzip
+variants, compressed once on a background thread (or taken from prebuilt `.br`/`.gz`
+files next to them). Per request there is no compression and, for files in the in-memory
+cache, no disk I/O:
+  - Content negotiation picks br > gzip > identity from Accept-Encoding.
+  - Vite's hashed assets (assets/name-<hash>.js) are `immutable` for a year; everything
+    else revalidates with If-None-Match (304).
+  - Range requests (single range, If-Range) for audio seeking: 206 / 416.
+  - Identity bodies are kept in an LRU up to KC_STATIC_CACHE_MB; compressed variants are
+    always in memory. Files that don't fit are streamed from disk in chunks.
+The dist folder is treated as immutable for the life of the process (it's replaced by a deploy).
+"""
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from utils.error_handler import handle_error, log_info
+
+try:
+    import brotli
+except ImportError: # pragma: no cover - optional, gzip only without it
+    brotli = None
+
+CACHE_BYTES = int(float(os.getenv("KC_STATIC_CACHE_MB", "64")) * 1024 * 1024) # In-memory budget for file bodies
+CHUNK_SIZE = 64 * 1024
+COMPRESSIBLE = re.compile(r"^(text/|application/(javascript|json|manifest\+json|xml|wasm)|image/svg\+xml)")
+HASHED_ASSET = re.compile(r"(^|/)assets/.+-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$") # Vite: assets/index-B2x9Qk1a.js
+MIN_COMPRESS_BYTES = 512
+ETAG_SUFFIX = {"br": "-br", "gzip": "-gz"} # Each representation is its own strong validator
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"              # index.html: always check the ETag so a deploy is picked up at once
+SHORT_LIVED = "public, max-age=3600" # Unhashed files (sounds, manifest): an hour, then revalidate
+
+
+class StaticEntry:
+    __slots__ = ("path", "size", "etag", "content_type", "cache_control", "compressible", "variants")
+    # etag is the identity representation's; etag_for() gives a compressed variant's
+
+    def __init__(self, path: str, size: int, etag: str, content_type: str, cache_control: str, compressible: bool):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.compressible = compressible
+        self.variants: Dict[str, bytes] = {} # "br" / "gzip" -> body, once compressed
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        return self.etag if encoding is None else self.etag[:-1] + ETAG_SUFFIX[encoding] + '"'
+
+
+class BodyCache:
+    """LRU of identity file bodies, bounded by total bytes."""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.used = 0
+        self._bodies: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, path: str) -> Optional[bytes]:
+        body = self._bodies.get(path)
+        if body is not None: self._bodies.move_to_end(path)
+        return body
+
+    def put(self, path: str, body: bytes):
+        if len(body) > self.budget // 4 or path in self._bodies: return # Big files would evict everything else
+        self._bodies[path] = body
+        self.used += len(body)
+        while self.used > self.budget:
+            _, evicted = self._bodies.popitem(last=False)
+            self.used -= len(evicted)
+
+
+class StaticAssets:
+    """ASGI app for app.mount("/", ...): GET/HEAD on files under `directory`, index.html for directories."""
+
+    def __init__(self, directory: str, cache_bytes: int = CACHE_BYTES):
+        self.directory = os.path.realpath(directory)
+        self.entries: Dict[str, StaticEntry] = {} # URL path without the leading slash -> entry
+        self.cache = BodyCache(cache_bytes)
+        self.ready = False # Index built and every variant compressed
+        self._indexer: Optional[asyncio.Task] = None
+        self._compressor: Optional[asyncio.Task] = None
+
+    # --- STARTUP ---
+    async def start(self):
+        """Indexes the files (read + hash) and then compresses them, both in the background.
+        Requests that arrive before the index is built wait for it; the WebSocket doesn't."""
+        self._indexer = asyncio.create_task(asyncio.to_thread(self._index))
+        self._compressor = asyncio.create_task(self._compress_all())
+
+    def _index(self):
+        mimetypes.add_type("application/javascript", ".js") # Reads the system mime tables: not at import time
+        mimetypes.add_type("application/manifest+json", ".webmanifest")
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith((".br", ".gz")) and os.path.exists(os.path.join(root, name[:-3])): continue # A prebuilt variant
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, self.directory).replace(os.sep, "/")
+                with open(full, "rb") as f: body = f.read()
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if content_type.startswith("text/"): content_type += "; charset=utf-8"
+                cache_control = IMMUTABLE if HASHED_ASSET.search(rel) else REVALIDATE if name.endswith(".html") else SHORT_LIVED
+                entry = StaticEntry(full, len(body), '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"', content_type, cache_control,
+                                    bool(COMPRESSIBLE.match(content_type)) and len(body) >= MIN_COMPRESS_BYTES)
+                self.entries[rel] = entry
+                self.cache.put(rel, body)
+        log_info(f"Indexed {len(self.entries)} static files", "static_index", cached_mb=round(self.cache.used / 1e6, 1))
+
+    async def _compress_all(self):
+        try:
+            await self._indexer
+            for rel, entry in list(self.entries.items()):
+                if not entry.compressible: continue
+                try: entry.variants = await asyncio.to_thread(self._compress, entry)
+                except Exception as e: handle_error(e, "static_compress", path=rel) # This one is served uncompressed
+            saved = sum(e.size - min(len(v) for v in e.variants.values()) for e in self.entries.values() if e.variants)
+            log_info("Static variants compressed", "static_compressed", saved_kb=saved // 1024, brotli=brotli is not None)
+        except Exception as e: handle_error(e, "static_compress")
+        finally: self.ready = True # Whatever failed falls back to identity; /readyz mustn't wait on it forever
+
+    @staticmethod
+    def _compress(entry: StaticEntry) -> Dict[str, bytes]:
+        with open(entry.path, "rb") as f: body = f.read()
+        variants = {}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if os.path.exists(entry.path + suffix): # Prebuilt by the bundler
+                with open(entry.path + suffix, "rb") as f: variants[encoding] = f.read()
+            elif encoding == "br" and brotli is not None: variants[encoding] = brotli.compress(body, quality=11)
+            elif encoding == "gzip": variants[encoding] = gzip.compress(body, compresslevel=9, mtime=0)
+        return {k: v for k, v in variants.items() if len(v) < entry.size}
+
+    def stats(self) -> Dict[str, int]:
+        return {"files": len(self.entries), "cached_bytes": self.cache.used,
+                "variant_bytes": sum(len(v) for e in self.entries.values() for v in e.variants.values())}
+
+    # --- SERVING ---
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        response = await self.respond(scope)
+        await response(scope, receive, send)
+
+    async def respond(self, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"): return Response(status_code=405, headers={"Allow": "GET, HEAD"})
+        if self._indexer is not None and not self._indexer.done(): await asyncio.shield(self._indexer)
+        path = scope["path"].lstrip("/")
+        if path not in self.entries: path = (path.rstrip("/") + "/index.html").lstrip("/")
+        entry = self.entries.get(path)
+        if entry is None: return Response("Not Found", status_code=404, media_type="text/plain")
+
+        headers = dict((k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"])
+        encoding = self._negotiate(entry, headers.get("accept-encoding", ""))
+        etag = entry.etag_for(encoding)
+        base = {"ETag": etag, "Cache-Control": entry.cache_control}
+        if entry.compressible: base["Vary"] = "Accept-Encoding"
+
+        # Compared against the representation we would send: a cached gzip body never validates a br one
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=base)
+
+        if encoding is not None:
+            return Response(entry.variants[encoding], headers={**base, "Content-Encoding": encoding}, media_type=entry.content_type)
+
+        # Identity: the only representation ranges apply to
+        base["Accept-Ranges"] = "bytes"
+        span = None
+        if "range" in headers and headers.get("if-range", entry.etag) == entry.etag:
+            span = parse_range(headers["range"], entry.size)
+            if span == "unsatisfiable":
+                return Response(status_code=416, headers={**base, "Content-Range": f"bytes */{entry.size}"})
+        start, end = span if isinstance(span, tuple) else (0, entry.size - 1)
+        status = 206 if isinstance(span, tuple) else 200
+        if status == 206: base["Content-Range"] = f"bytes {start}-{end}/{entry.size}"
+
+        body = self.cache.get(path)
+        if body is not None: return Response(body[start:end + 1], status_code=status, headers=base, media_type=entry.content_type)
+        base["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(read_chunks(entry.path, start, end), status_code=status, headers=base, media_type=entry.content_type)
+
+    @staticmethod
+    def _negotiate(entry: StaticEntry, accept_encoding: str) -> Optional[str]:
+        if not entry.variants or not accept_encoding: return None
+        accepted = set()
+        for token in accept_encoding.split(","):
+            name, _, params = token.strip().partition(";")
+            if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"): accepted.add(name.strip())
+        for encoding in ("br", "gzip"):
+            if encoding in entry.variants and encoding in accepted: return encoding
+        return None
+
+
+def parse_range(value: str, size: int):
+    """(start, end) for a single satisfiable byte range, "unsatisfiable", or None to ignore the header."""
+    unit, _, spec = value.partition("=")
+    if unit.strip() != "bytes" or "," in spec: return None # Multiple ranges: a full 200 is allowed
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first: # Suffix: the last N bytes
+            length = int(last)
+            if length <= 0: return "unsatisfiable"
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError: return None
+    if start >= size or start > end: return "unsatisfiable"
+    return start, end
+
+
+async def read_chunks(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        await asyncio.to_thread(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+            if not chunk: break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Dict with a per-entry time-to-live and a hard size cap.
+    Entries expire `ttl` seconds after they were last written; when full, the least
+    recently written entry is evicted. Expired entries are dropped on access and by `sweep()`.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict() # key -> (expires_at, value), oldest write first
+        self.evicted = 0 # Entries dropped by the size cap
+        self.expired = 0 # Entries dropped by the TTL
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evicted += 1
+
+    __setitem__ = set
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None: return default
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            self.expired += 1
+            return default
+        return entry[1]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING: return default
+        del self._data[key]
+        return value
+
+    def sweep(self) -> int:
+        """Drops expired entries. Writes keep the dict in expiry order, so this stops at the first live one."""
+        now, dropped = time.monotonic(), 0
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now: break
+            del self._data[key]
+            dropped += 1
+        self.expired += dropped
+        return dropped
+
@@ -0,0 +1,45 @@
+"""
+Outbound wire encodings for /ws, picked per connection with `?encoding=`:
+  json     stdlib json in text frames (default, what existing clients expect)
+  orjson   the same JSON produced by orjson, in text frames
+  msgpack  MessagePack in binary frames
+Clients can always tell them apart by frame type: text frames are JSON, binary frames are
+MessagePack. Missing optional packages degrade to the next best encoding (msgpack -> orjson
+-> json), so a client that asks for msgpack must still accept text frames.
+
+Inbound frames stay JSON text in every mode. permessage-deflate is negotiated by uvicorn
+(on by default, `--ws-per-message-deflate`) for any client that offers it.
+"""
+import json
+from typing import Callable, Dict, Union
+
+try:
+    import orjson
+except ImportError: # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError: # pragma: no cover - optional encoding
+    msgpack = None
+
+Payload = Union[str, bytes]
+
+
+class Codec:
+    __slots__ = ("name", "encode")
+
+    def __init__(self, name: str, encode: Callable[[dict], Payload]):
+        self.name = name
+        self.encode = encode
+
+
+JSON = Codec("json", json.dumps)
+CODECS: Dict[str, Codec] = {"json": JSON}
+CODECS["orjson"] = Codec("orjson", lambda message: orjson.dumps(message).decode()) if orjson else JSON
+CODECS["msgpack"] = Codec("msgpack", lambda message: msgpack.packb(message, use_bin_type=True)) if msgpack else CODECS["orjson"]
+
+
+def get_codec(name: str) -> Codec:
+    """Codec for a client's `encoding` parameter; unknown names get plain JSON."""
+    return CODECS.get(name, JSON)